@@ -0,0 +1,4 @@
+"""
+基准测试脚本 (离线运行，不访问任何外部服务)
+用法示例: python -m benchmarks.bench_search --papers 100000
+"""
@@ -0,0 +1,76 @@
+"""
+读缓存基准：模拟论文浏览页一次重跑需要的全部读取 (领域、最早日期、论文列表、逐篇评论、看板统计、热门榜单)
+连续重跑若干次，记录每次耗时与 SQL 语句数；之后模拟一次收藏写入，确认缓存失效并重新查询
+对照组设置 CACHE_ENABLED=0 运行
+用法: python -m benchmarks.bench_cache --papers 2000 [--reruns 5]
+"""
+import argparse
+import json
+import time
+
+from benchmarks.synthetic import use_temp_database, insert_papers, insert_users
+
+
+def main():
+    parser = argparse.ArgumentParser(description="读缓存基准")
+    parser.add_argument("--papers", type=int, default=2000)
+    parser.add_argument("--reruns", type=int, default=5)
+    parser.add_argument("--json", help="结果输出路径 (JSON)")
+    args = parser.parse_args()
+
+    use_temp_database("cache")
+    from sqlalchemy import event
+    from database import Session, get_db_engine
+    import services
+    from cache import cache_stats, CACHE_ENABLED
+
+    session = Session()
+    insert_papers(session, args.papers)
+    insert_users(session, 10)
+    session.close()
+
+    statements = [0]
+
+    def count_statement(*_):
+        statements[0] += 1
+
+    event.listen(get_db_engine(), "before_cursor_execute", count_statement)
+
+    def page_reads():
+        services.get_all_categories()
+        services.get_earliest_paper_date()
+        papers = services.get_papers_by_category(category=None, target_date=None)
+        for p in papers:
+            services.get_paper_comments(p.id)
+        services.get_dashboard_stats()
+        services.get_trending_papers(limit=5)
+        return papers
+
+    def measure():
+        statements[0] = 0
+        t0 = time.perf_counter()
+        page_reads()
+        return {"ms": round((time.perf_counter() - t0) * 1000, 1), "queries": statements[0]}
+
+    runs = [measure() for _ in range(args.reruns)]
+
+    # 一次收藏写入 (含版本递增) 之后的重跑
+    paper_id = services.get_papers_by_category()[0].id
+    services.toggle_favorite("bench_user_1@example.com", paper_id)
+    after_write = measure()
+
+    result = {
+        "papers": args.papers,
+        "cache_enabled": CACHE_ENABLED,
+        "runs": runs,
+        "after_write": after_write,
+        "hit_rate": {name: s["hit_rate"] for name, s in cache_stats().items() if s["hits"] or s["misses"]},
+    }
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+论文目录基准：N 篇已完成论文
+- 全量加载耗时与内存占用 (tracemalloc 统计目录本身分配的内存，折算为每 10 万篇)
+- 列表/领域/日期筛选与计数：内存目录 vs get_papers_by_category 查库 (关闭读缓存)
+- 新增一批论文并递增数据版本后的增量刷新耗时
+用法: python -m benchmarks.bench_catalog --papers 100000
+"""
+import argparse
+import json
+import os
+import statistics
+import time
+import tracemalloc
+
+from benchmarks.synthetic import use_temp_database, insert_papers, make_paper_rows
+
+
+def _median_ms(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    return round(statistics.median(samples) * 1000, 2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="论文目录基准")
+    parser.add_argument("--papers", type=int, default=100000)
+    parser.add_argument("--new", type=int, default=200, help="增量刷新时新增的论文数")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", help="结果输出路径 (JSON)")
+    args = parser.parse_args()
+
+    # 对照组直接查库，不走读缓存
+    os.environ["CACHE_ENABLED"] = "0"
+    use_temp_database("catalog")
+    from database import Session, Paper, get_utc_now
+    import services
+    from cache import bump_version, PAPERS
+    from catalog import PaperCatalog
+
+    session = Session()
+    insert_papers(session, args.papers)
+    session.close()
+
+    t0 = time.perf_counter()
+    PaperCatalog().refresh()
+    load_s = time.perf_counter() - t0
+
+    # 内存单独测一次 (tracemalloc 会明显拖慢加载)
+    tracemalloc.start()
+    catalog = PaperCatalog()
+    catalog.refresh()
+    catalog_bytes, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    sample = catalog.papers()[len(catalog) // 2]
+    category, day = sample.category, sample.created_at.date()
+
+    queries = {
+        "list_all": (lambda: catalog.papers(), lambda: services.get_papers_by_category()),
+        "by_category": (lambda: catalog.papers(category=category),
+                        lambda: services.get_papers_by_category(category=category)),
+        "by_category_and_date": (lambda: catalog.papers(category=category, target_date=day),
+                                 lambda: services.get_papers_by_category(category=category, target_date=day)),
+        "count_by_category": (lambda: catalog.count(category=category),
+                              lambda: len(services.get_papers_by_category(category=category))),
+    }
+    timings = {}
+    for name, (in_memory, database) in queries.items():
+        timings[name] = {
+            "catalog_ms": _median_ms(in_memory, args.repeat),
+            "database_ms": _median_ms(database, max(1, args.repeat // 2)),
+        }
+
+    # 新论文由分析阶段刚刚完成：completed_at / analyzed_at / updated_at 为当前时间
+    session = Session()
+    rows = make_paper_rows(args.new, seed=999, start_id=args.papers + 1)
+    for row in rows:
+        row["completed_at"] = row["analyzed_at"] = row["updated_at"] = get_utc_now().replace(tzinfo=None)
+    session.execute(Paper.__table__.insert(), rows)
+    session.commit()
+    session.close()
+    bump_version(PAPERS)
+    t0 = time.perf_counter()
+    changed = catalog.refresh()
+    incremental_s = time.perf_counter() - t0
+
+    result = {
+        "papers": args.papers,
+        "load_s": round(load_s, 2),
+        "catalog_mb": round(catalog_bytes / 2 ** 20, 1),
+        "mb_per_100k": round(catalog_bytes / 2 ** 20 * 100000 / args.papers, 1),
+        "timings": timings,
+        "incremental": {"new_papers": changed, "ms": round(incremental_s * 1000, 1), "total": len(catalog)},
+    }
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
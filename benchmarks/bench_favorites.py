@@ -0,0 +1,86 @@
+"""
+收藏点击基准：论文浏览页 (AppTest) 点击一次收藏按钮
+- click_run：点击后这次运行的耗时与 SQL 语句数 (旧实现点击后还会 st.rerun() 再跑一遍整页，一并计入)
+- toggle_write：toggle_favorite 本身的 SQL 语句数
+- rerun：未点击时的一次整页重跑
+AppTest 不支持片段级重跑，点击后总是重跑整页；真实服务中新实现点击只重跑收藏按钮片段，
+该片段从会话状态读取收藏集合，不再查库，因此每次点击的数据库往返即 toggle_write。
+用法: python -m benchmarks.bench_favorites --papers 200 [--app /path/to/app.py]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PAPER_PAGE = "📑 论文浏览"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="收藏点击基准")
+    parser.add_argument("--papers", type=int, default=200)
+    parser.add_argument("--app", default=os.path.join(ROOT, "app.py"), help="被测的 app.py 路径")
+    parser.add_argument("--json", help="结果输出路径 (JSON)")
+    args = parser.parse_args()
+
+    # 被测版本的模块优先 (对比旧版本时)
+    sys.path.insert(0, os.path.dirname(os.path.abspath(args.app)))
+    from benchmarks.synthetic import use_temp_database, insert_papers, insert_users
+
+    use_temp_database("favorites")
+    from sqlalchemy import event
+    from streamlit.testing.v1 import AppTest
+    from database import Session, get_db_engine
+    import services
+
+    session = Session()
+    insert_papers(session, args.papers)
+    insert_users(session, 10)
+    session.close()
+
+    statements = [0]
+
+    def count_statement(*_):
+        statements[0] += 1
+
+    event.listen(get_db_engine(), "before_cursor_execute", count_statement)
+
+    def measure(fn) -> dict:
+        statements[0] = 0
+        t0 = time.perf_counter()
+        fn()
+        return {"ms": round((time.perf_counter() - t0) * 1000, 1), "queries": statements[0]}
+
+    email = "bench_user_1@example.com"
+    at = AppTest.from_file(args.app, default_timeout=300)
+    at.session_state["authenticated"] = True
+    at.session_state["user_email"] = email
+    at.session_state["nav_page"] = PAPER_PAGE
+    at.run()
+    rerun = measure(at.run)
+
+    paper_id = services.get_papers_by_category()[0].id
+    at.button(key=f"fav_{paper_id}").click()
+    click_run = measure(at.run)
+    label = at.button(key=f"fav_{paper_id}").label
+
+    toggle_write = measure(lambda: services.toggle_favorite(email, paper_id))
+
+    result = {
+        "papers": args.papers,
+        "app": args.app,
+        "rerun": rerun,
+        "click_run": click_run,
+        "toggle_write": toggle_write,
+        "button_after_click": label,
+        "exceptions": [str(e.value)[:200] for e in at.exception],
+    }
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
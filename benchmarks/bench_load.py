@@ -0,0 +1,372 @@
+"""
+前端并发压测：启动真实的 Streamlit 服务 (app.py)，用 websocket 协议模拟 N 个同时在线的会话
+每个会话先走验证码登录 (验证码邮件发往本地模拟 Resend，再从数据库读出验证码)，然后循环浏览：
+看板 → 论文浏览 (按领域筛选) → 收藏/取消收藏 (片段重跑) → 发表评论 (表单提交) → 热门榜单 → 我的收藏
+按并发级别逐级加压，报告每次渲染的 P50/P95/P99 延迟、服务进程的 SQL 语句数/秒与内存 (RSS)
+服务进程由本脚本以 --serve 模式启动：同一进程内统计 SQL 语句数与内存并定期写入状态文件
+用法: python -m benchmarks.bench_load --papers 300 --users 100 --levels 1,4,8,16 --duration 30
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PAGES = {
+    "dashboard": "📊 论文看板",
+    "browse": "📑 论文浏览",
+    "trending": "🔥 热门榜单",
+    "favorites": "⭐ 我的收藏",
+}
+
+
+# ---------------- 服务进程 (--serve) ----------------
+
+def _rss_mb() -> float:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # 非 Linux：退化为峰值 RSS (macOS 单位为字节)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 / (1024 if sys.platform == "darwin" else 1)
+
+
+def serve(port: int, stats_path: str):
+    """在本进程内统计 SQL 语句数与内存，然后启动 Streamlit 服务 (阻塞)"""
+    from sqlalchemy import event
+    from database import get_db_engine
+
+    statements = [0]
+    event.listen(get_db_engine(), "before_cursor_execute", lambda *_: statements.__setitem__(0, statements[0] + 1))
+
+    def report():
+        peak = 0.0
+        while True:
+            rss = _rss_mb()
+            peak = max(peak, rss)
+            tmp = f"{stats_path}.tmp"
+            with open(tmp, "w") as f:
+                json.dump({"time": time.time(), "queries": statements[0], "rss_mb": round(rss, 1),
+                           "peak_rss_mb": round(peak, 1)}, f)
+            os.replace(tmp, stats_path)
+            time.sleep(0.2)
+
+    threading.Thread(target=report, daemon=True).start()
+
+    from streamlit.web import bootstrap
+    flags = {"server.port": port, "server.headless": True, "server.fileWatcherType": "none",
+             "browser.gatherUsageStats": False, "logger.level": "warning"}
+    bootstrap.load_config_options(flag_options=flags)
+    bootstrap.run(os.path.join(ROOT, "app.py"), False, [], flags)
+
+
+# ---------------- 模拟浏览器会话 ----------------
+
+class StreamlitSession:
+    """
+    极简的 Streamlit 前端：维护控件状态，发送 rerun_script，读取 ForwardMsg 直到本次运行结束
+    控件按 proto 记录 (类型、ID、标签、表单、所属片段)，点击按钮时把触发值与其余控件的当前值一并发送
+    """
+
+    def __init__(self, url: str):
+        self.url = url
+        self.ws = None
+        self.widgets = {}
+        self.values = {}
+        self.page_script_hash = ""
+        self.errors = []
+
+    async def connect(self):
+        from websockets.asyncio.client import connect
+        self.ws = await connect(self.url, subprotocols=["streamlit"], max_size=None, open_timeout=60)
+
+    async def close(self):
+        if self.ws:
+            await self.ws.close()
+
+    async def rerun(self, triggers: dict = None, fragment_id: str = "") -> float:
+        """发起一次运行 (首次加载、切换页面、点击按钮)，返回渲染耗时 (毫秒)"""
+        from streamlit.proto.BackMsg_pb2 import BackMsg
+        from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+        msg = BackMsg()
+        state = msg.rerun_script
+        state.page_script_hash = self.page_script_hash
+        state.fragment_id = fragment_id
+        for widget_id, (field, value) in {**self.values, **(triggers or {})}.items():
+            w = state.widget_states.widgets.add()
+            w.id = widget_id
+            setattr(w, field, value)
+        if not fragment_id:
+            # 整页重跑会重新发送全部控件；片段重跑保留片段外已记录的控件
+            self.widgets = {}
+
+        t0 = time.perf_counter()
+        await self.ws.send(msg.SerializeToString())
+        while True:
+            fwd = ForwardMsg()
+            fwd.ParseFromString(await self.ws.recv())
+            kind = fwd.WhichOneof("type")
+            if kind == "new_session":
+                self.page_script_hash = fwd.new_session.page_script_hash
+            elif kind == "delta" and fwd.delta.WhichOneof("type") == "new_element":
+                self._record(fwd.delta.new_element, fwd.delta.fragment_id)
+            elif kind == "script_finished":
+                if fwd.script_finished != ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+                    return (time.perf_counter() - t0) * 1000
+
+    def _record(self, element, fragment_id: str):
+        kind = element.WhichOneof("type")
+        if kind == "exception":
+            self.errors.append(element.exception.message[:200])
+            return
+        proto = getattr(element, kind)
+        widget_id = getattr(proto, "id", "")
+        if widget_id and hasattr(proto, "label"):
+            self.widgets[widget_id] = {"kind": kind, "proto": proto, "fragment_id": fragment_id}
+
+    def find(self, kind: str, label: str = None, key_suffix: str = None, form_id: str = None) -> list[tuple[str, dict]]:
+        return [(wid, w) for wid, w in self.widgets.items()
+                if w["kind"] == kind
+                and (label is None or w["proto"].label == label)
+                and (key_suffix is None or wid.endswith(key_suffix))
+                and (form_id is None or getattr(w["proto"], "form_id", None) == form_id)]
+
+    def set_value(self, widget_id: str, field: str, value):
+        self.values[widget_id] = (field, value)
+
+    async def click(self, widget_id: str) -> float:
+        return await self.rerun({widget_id: ("trigger_value", True)},
+                                fragment_id=self.widgets[widget_id]["fragment_id"])
+
+
+def _latest_code(email: str) -> str | None:
+    from database import Session, VerificationCode
+    session = Session()
+    try:
+        row = session.query(VerificationCode.code).filter(VerificationCode.email == email) \
+            .order_by(VerificationCode.id.desc()).first()
+        return row.code if row else None
+    finally:
+        session.close()
+
+
+async def login(s: StreamlitSession, email: str) -> float:
+    """验证码登录，返回总耗时 (毫秒)"""
+    total = await s.rerun()
+    (email_id, _), = s.find("text_input", label="📧 邮箱地址")
+    s.set_value(email_id, "string_value", email)
+    (send_id, _), = s.find("button", label="📨 获取验证码")
+    total += await s.click(send_id)
+    (code_id, _), = s.find("text_input", label="🔐 验证码")
+    s.set_value(code_id, "string_value", await asyncio.to_thread(_latest_code, email))
+    (enter_id, _), = s.find("button", label="立即进入系统")
+    total += await s.click(enter_id)
+    if not s.find("radio", key_suffix="nav_page"):
+        raise RuntimeError(f"登录失败: {email} {s.errors[-1:]}")
+    # 登录页的控件不再出现，避免之后每次都发送
+    s.values.clear()
+    return total
+
+
+async def navigate(s: StreamlitSession, page: str) -> float:
+    (nav_id, _), = s.find("radio", key_suffix="nav_page")
+    s.set_value(nav_id, "string_value", page)
+    return await s.rerun()
+
+
+async def scenario(s: StreamlitSession, rng: random.Random, categories: list[str], record):
+    """一轮典型的浏览路径"""
+    record("dashboard", await navigate(s, PAGES["dashboard"]))
+    record("browse", await navigate(s, PAGES["browse"]))
+
+    # 侧边栏按领域筛选 (只在论文浏览页出现)
+    selects = s.find("selectbox", label="选择领域")
+    if selects:
+        s.set_value(selects[0][0], "string_value", rng.choice(categories))
+        record("filter", await s.rerun())
+
+    # 收藏按钮 (key=fav_<id>) 在片段内，点击只重跑该片段
+    favorites = [wid for wid, w in s.widgets.items() if w["kind"] == "button" and wid.rsplit("-", 1)[-1].startswith("fav_")]
+    if favorites:
+        record("favorite", await s.click(rng.choice(favorites)))
+
+    forms = [(wid, w) for wid, w in s.widgets.items() if w["kind"] == "text_area" and w["proto"].form_id]
+    if forms:
+        area_id, area = rng.choice(forms)
+        submit = [wid for wid, w in s.widgets.items()
+                  if w["kind"] == "button" and w["proto"].is_form_submitter and w["proto"].form_id == area["proto"].form_id]
+        s.set_value(area_id, "string_value", f"压测评论 {rng.randint(1, 10 ** 6)}")
+        record("comment", await s.click(submit[0]))
+        s.values.pop(area_id, None)
+
+    record("trending", await navigate(s, PAGES["trending"]))
+    record("favorites", await navigate(s, PAGES["favorites"]))
+
+
+def _percentiles(samples: list[float]) -> dict:
+    from benchmarks.synthetic import percentile
+    return {
+        "count": len(samples),
+        "p50_ms": round(percentile(samples, 50), 1),
+        "p95_ms": round(percentile(samples, 95), 1),
+        "p99_ms": round(percentile(samples, 99), 1),
+    }
+
+
+def _read_stats(path: str) -> dict:
+    with open(path) as f:
+        return json.load(f)
+
+
+async def run_level(url: str, stats_path: str, sessions: int, duration: float, think: float,
+                    categories: list[str], seed: int) -> dict:
+    """sessions 个会话同时登录，然后在 duration 秒内循环执行浏览路径"""
+    samples, errors, logins = {}, [], []
+
+    def record(action, ms):
+        samples.setdefault(action, []).append(ms)
+
+    async def user(i: int):
+        rng = random.Random(seed + i)
+        s = StreamlitSession(url)
+        try:
+            await s.connect()
+            logins.append(await login(s, f"bench_user_{i + 1}@example.com"))
+            await start.wait()
+            while time.perf_counter() < deadline:
+                await scenario(s, rng, categories, record)
+                if think:
+                    await asyncio.sleep(rng.uniform(0, 2 * think))
+        except Exception as e:
+            errors.append(f"会话 {i + 1}: {type(e).__name__}: {e}"[:300])
+        finally:
+            errors.extend(s.errors)
+            await s.close()
+
+    start = asyncio.Event()
+    deadline = float("inf")
+    tasks = [asyncio.create_task(user(i)) for i in range(sessions)]
+    # 等全部会话登录完成后再统一开始计时
+    while len(logins) + len(errors) < sessions:
+        await asyncio.sleep(0.05)
+    before = _read_stats(stats_path)
+    t0 = time.perf_counter()
+    deadline = t0 + duration
+    start.set()
+    await asyncio.gather(*tasks)
+    wall = time.perf_counter() - t0
+    await asyncio.sleep(0.3)
+    after = _read_stats(stats_path)
+
+    renders = [ms for values in samples.values() for ms in values]
+    return {
+        "sessions": sessions,
+        "seconds": round(wall, 1),
+        "renders": len(renders),
+        "renders_per_s": round(len(renders) / wall, 2) if wall else 0.0,
+        **_percentiles(renders),
+        "db_queries_per_s": round((after["queries"] - before["queries"]) / wall, 1) if wall else 0.0,
+        "db_queries_per_render": round((after["queries"] - before["queries"]) / len(renders), 1) if renders else None,
+        "rss_mb": after["rss_mb"],
+        "peak_rss_mb": after["peak_rss_mb"],
+        "login": _percentiles(logins),
+        "actions": {action: _percentiles(values) for action, values in sorted(samples.items())},
+        "errors": errors[:20],
+    }
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_healthy(port: int, proc: subprocess.Popen, timeout: float = 120):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"Streamlit 服务启动失败 (退出码 {proc.returncode})")
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/_stcore/health", timeout=2) as resp:
+                if resp.status == 200:
+                    return
+        except OSError:
+            time.sleep(0.5)
+    raise TimeoutError("Streamlit 服务启动超时")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="前端并发压测")
+    parser.add_argument("--papers", type=int, default=300)
+    parser.add_argument("--users", type=int, default=100, help="合成用户数 (需不少于最大并发数)")
+    parser.add_argument("--levels", default="1,4,8,16", help="逐级加压的并发会话数，逗号分隔")
+    parser.add_argument("--duration", type=float, default=30, help="每个并发级别的持续时间 (秒)")
+    parser.add_argument("--think", type=float, default=0.5, help="每轮浏览之间的平均思考时间 (秒)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", help="结果输出路径 (JSON)")
+    parser.add_argument("--serve", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--stats", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve, args.stats)
+        return
+
+    levels = [int(n) for n in args.levels.split(",")]
+    if max(levels) > args.users:
+        parser.error("--users 需不少于最大并发数")
+
+    from benchmarks.fake_resend import FakeResend
+    from benchmarks.synthetic import use_temp_database, build_corpus, CATEGORIES
+
+    with FakeResend(latency=0.05) as fake:
+        # 验证码邮件发往本地模拟服务 (服务进程继承这些环境变量)
+        os.environ.update({"RESEND_API_URL": fake.url, "RESEND_API_KEY": "re_bench"})
+        use_temp_database("load")
+        corpus = build_corpus(args.papers, args.users)
+        print(f"语料生成完成: {corpus}", file=sys.stderr)
+
+        port = _free_port()
+        stats_path = os.path.join(tempfile.mkdtemp(prefix="arxivmind_load_"), "server.json")
+        proc = subprocess.Popen([sys.executable, "-m", "benchmarks.bench_load", "--serve", str(port),
+                                 "--stats", stats_path], cwd=ROOT, env=os.environ.copy())
+        results = []
+        try:
+            _wait_healthy(port, proc)
+            url = f"ws://127.0.0.1:{port}/_stcore/stream"
+            for n in levels:
+                print(f"并发 {n} 个会话，持续 {args.duration}s ...", file=sys.stderr)
+                level = asyncio.run(run_level(url, stats_path, n, args.duration, args.think, CATEGORIES,
+                                              args.seed + 1000 * n))
+                results.append(level)
+                print(f"  P50 {level['p50_ms']}ms  P95 {level['p95_ms']}ms  P99 {level['p99_ms']}ms  "
+                      f"SQL {level['db_queries_per_s']}/s  RSS {level['rss_mb']}MB  错误 {len(level['errors'])}",
+                      file=sys.stderr)
+        finally:
+            proc.terminate()
+            proc.wait(timeout=30)
+
+    result = {"papers": args.papers, "users": args.users, "duration": args.duration,
+              "think": args.think, "corpus": corpus, "levels": results}
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Streamlit 页面基准：每个页面在独立的新进程中用 AppTest 运行，
+记录首次运行 (冷启动，含模块导入) 与再次运行 (页面重跑) 的耗时、重跑的 SQL 语句数，以及加载了哪些重依赖
+用法: python -m benchmarks.bench_pages --papers 2000 [--app app.py]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+LOGIN = "🔐 登录页"
+PAGES = [LOGIN, "📊 论文看板", "🔥 热门榜单", "📑 论文浏览", "⭐ 我的收藏", "📬 订阅设置", "💰 打赏支持"]
+HEAVY_MODULES = ["plotly.express", "pandas", "numpy", "openai", "arxiv", "fitz", "resend"]
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run_page(app_path: str, page: str, reruns: int) -> dict:
+    """子进程内执行：冷启动运行一次，再重跑 reruns 次"""
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(app_path, default_timeout=300)
+    if page != LOGIN:
+        at.session_state["authenticated"] = True
+        at.session_state["user_email"] = "bench_user_1@example.com"
+        at.session_state["nav_page"] = page
+
+    t0 = time.perf_counter()
+    at.run()
+    cold = time.perf_counter() - t0
+
+    # 重跑时执行的 SQL 语句数 (冷启动阶段的建表检查不计入)
+    from sqlalchemy import event
+    from database import get_db_engine
+    statements = [0]
+    event.listen(get_db_engine(), "before_cursor_execute", lambda *_: statements.__setitem__(0, statements[0] + 1))
+
+    samples = []
+    for _ in range(reruns):
+        t0 = time.perf_counter()
+        at.run()
+        samples.append(time.perf_counter() - t0)
+
+    return {
+        "page": page,
+        "cold_ms": round(cold * 1000, 1),
+        "rerun_ms": round(statistics.median(samples) * 1000, 1) if samples else None,
+        "rerun_queries": round(statements[0] / reruns, 1) if reruns else None,
+        "exceptions": [str(e.value)[:200] for e in at.exception],
+        "heavy_modules": [m for m in HEAVY_MODULES if m in sys.modules],
+    }
+
+
+def measure_pages(app_path: str, reruns: int) -> list[dict]:
+    """逐个页面在新进程中运行 run_page (数据库沿用当前环境变量 DATABASE_URL)"""
+    results = []
+    for page in PAGES:
+        proc = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_pages", "--child", page,
+             "--app", app_path, "--reruns", str(reruns)],
+            cwd=ROOT, capture_output=True, text=True, env=os.environ.copy()
+        )
+        lines = [line for line in proc.stdout.splitlines() if line.startswith("{")]
+        results.append(json.loads(lines[-1]) if lines else {"page": page, "error": proc.stderr[-500:]})
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Streamlit 页面基准")
+    parser.add_argument("--papers", type=int, default=2000)
+    parser.add_argument("--reruns", type=int, default=5)
+    parser.add_argument("--app", default=os.path.join(ROOT, "app.py"), help="被测的 app.py 路径")
+    parser.add_argument("--json", help="结果输出路径 (JSON)")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        sys.path.insert(0, os.path.dirname(os.path.abspath(args.app)))
+        print(json.dumps(run_page(args.app, args.child, args.reruns), ensure_ascii=False))
+        return
+
+    from benchmarks.synthetic import use_temp_database, insert_papers, insert_users
+
+    use_temp_database("pages")
+    from database import Session
+
+    session = Session()
+    insert_papers(session, args.papers)
+    insert_users(session, 10)
+    session.close()
+
+    result = {"papers": args.papers, "app": args.app, "pages": measure_pages(args.app, args.reruns)}
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
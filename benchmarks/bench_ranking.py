@@ -0,0 +1,69 @@
+"""
+个性化排序基准：N 位订阅用户 × M 篇候选论文
+用法: python -m benchmarks.bench_ranking --users 5000 --papers 5000 --favorites 10
+"""
+import argparse
+import json
+import time
+
+from benchmarks.synthetic import use_temp_database, insert_papers, insert_users, insert_favorites
+
+
+def main():
+    parser = argparse.ArgumentParser(description="个性化排序基准")
+    parser.add_argument("--users", type=int, default=5000)
+    parser.add_argument("--papers", type=int, default=5000)
+    parser.add_argument("--favorites", type=int, default=10, help="每位用户的收藏数")
+    parser.add_argument("--json", help="结果输出路径 (JSON)")
+    args = parser.parse_args()
+
+    use_temp_database("ranking")
+    from database import Session, Paper, User
+    import ranking
+    import vector_index
+
+    session = Session()
+    insert_papers(session, args.papers)
+    insert_users(session, args.users)
+    n_favorites = insert_favorites(session, per_user=args.favorites)
+
+    t0 = time.perf_counter()
+    vector_index.build_similarity_index()
+    index_s = time.perf_counter() - t0
+    index = vector_index.get_index()
+
+    t0 = time.perf_counter()
+    users = session.query(User.id).filter(User.is_subscribed == True).all()
+    papers = session.query(Paper.id, Paper.category, Paper.citation_count, Paper.created_at) \
+        .filter(Paper.batch_status == "completed").all()
+    candidates = [ranking.Candidate(p.id, p.category or "其他", p.citation_count or 0, p.created_at.timestamp())
+                  for p in papers]
+    user_ids = [u.id for u in users]
+    subscriptions = ranking.load_subscriptions(session, {c.category for c in candidates})
+    load_s = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    profiles = ranking.build_user_profiles(session, user_ids, index)
+    profile_s = time.perf_counter() - t0
+
+    ranked = ranking.rank_digest(user_ids, subscriptions, candidates, profiles, index)
+    session.close()
+
+    result = {
+        "users": args.users,
+        "papers": args.papers,
+        "favorites": n_favorites,
+        "vector_index_build_s": round(index_s, 2),
+        "load_candidates_s": round(load_s, 3),
+        "build_profiles_s": round(profile_s, 3),
+        "rank_s": round(ranked.seconds, 3),
+        "users_ranked": len(ranked.by_user),
+    }
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+订阅匹配基准：N 位订阅用户 × M 篇候选论文，确定每位用户可接收哪些论文
+对照组为旧实现：加载全部 User/Paper 对象，逐用户切分 subscribed_categories 并用列表推导过滤论文
+用法: python -m benchmarks.bench_subscriptions --users 50000 --papers 5000
+"""
+import argparse
+import json
+import time
+
+from benchmarks.synthetic import use_temp_database, insert_papers, insert_users
+
+
+def main():
+    parser = argparse.ArgumentParser(description="订阅匹配基准")
+    parser.add_argument("--users", type=int, default=50000)
+    parser.add_argument("--papers", type=int, default=5000)
+    parser.add_argument("--json", help="结果输出路径 (JSON)")
+    args = parser.parse_args()
+
+    use_temp_database("subscriptions")
+    from database import Session, Paper, User
+    import ranking
+
+    session = Session()
+    insert_papers(session, args.papers)
+    insert_users(session, args.users)
+    session.close()
+
+    # 旧实现：O(用户数 × 论文数) 的 Python 交叉过滤
+    session = Session()
+    t0 = time.perf_counter()
+    users = session.query(User).filter(User.is_subscribed == True).all()
+    papers = session.query(Paper).filter(Paper.batch_status == "completed").all()
+    legacy_pairs = 0
+    for user in users:
+        cats = [c.strip() for c in (user.subscribed_categories or "").split(",") if c.strip()]
+        target = [p for p in papers if not cats or p.category in cats]
+        legacy_pairs += len(target)
+    legacy_s = time.perf_counter() - t0
+    session.close()
+
+    # 新实现：一次联表取订阅者，候选论文按领域分组一次，生成 用户 × 领域 掩码
+    session = Session()
+    t0 = time.perf_counter()
+    user_ids = [uid for (uid,) in session.query(User.id).filter(User.is_subscribed == True).order_by(User.id)]
+    rows = session.query(Paper.category).filter(Paper.batch_status == "completed").all()
+    per_category = {}
+    for (category,) in rows:
+        per_category[category or "其他"] = per_category.get(category or "其他", 0) + 1
+    categories = sorted(per_category)
+    subscriptions = ranking.load_subscriptions(session, categories)
+    query_s = time.perf_counter() - t0
+    mask = ranking.subscription_mask(user_ids, categories, subscriptions)
+    join_s = time.perf_counter() - t0
+    join_pairs = int((mask * [per_category[c] for c in categories]).sum())
+    session.close()
+
+    result = {
+        "users": args.users,
+        "papers": args.papers,
+        "legacy_python_filter_s": round(legacy_s, 3),
+        "join_and_mask_s": round(join_s, 3),
+        "join_query_s": round(query_s, 3),
+        "speedup": round(legacy_s / join_s, 1) if join_s else None,
+        "matched_pairs_equal": legacy_pairs == join_pairs,
+        "matched_pairs": join_pairs,
+    }
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+两级分析基准：同一批待分析论文分别按基线 (全部 qwen-plus 深度分析) 与初筛级联处理，
+对比分析吞吐 (篇/小时) 与大模型费用 (按模拟接口返回的 token 用量与 LLM_PRICES 计价)
+大模型为本地模拟服务 (benchmarks/fake_llm.py)，初筛模型与深度分析模型可设置不同延迟
+用法: python -m benchmarks.bench_triage --papers 60 --full-latency 1.0 --triage-latency 0.2 --threshold 0.5
+"""
+import argparse
+import json
+import os
+import random
+import time
+
+from benchmarks.fake_llm import FakeLLM
+from benchmarks.synthetic import use_temp_database, EN_VOCAB, EN_WEIGHTS
+
+
+def _words(rng: random.Random, n: int) -> str:
+    return " ".join(rng.choices(EN_VOCAB, weights=EN_WEIGHTS, k=n))
+
+
+def insert_pending(session, n: int, seed: int = 21) -> list[int]:
+    """写入 n 篇待分析论文 (标题、摘要与数千词的正文)"""
+    from database import Paper
+
+    rng = random.Random(seed)
+    papers = [Paper(title=_words(rng, 8).title(), url=f"https://arxiv.org/pdf/triage.{i:05d}",
+                    abstract=_words(rng, 150), full_text_tmp=_words(rng, 4000), batch_status="pending")
+              for i in range(n)]
+    session.add_all(papers)
+    session.commit()
+    return [p.id for p in papers]
+
+
+def run_mode(core_batch, threshold: float, paper_ids: list[int], daily_papers: int) -> dict:
+    import metrics
+    from database import Session, Paper
+
+    session = Session()
+    session.query(Paper).filter(Paper.id.in_(paper_ids)).update({Paper.batch_status: "pending"}, synchronize_session=False)
+    session.commit()
+    session.close()
+
+    core_batch.TRIAGE_THRESHOLD = threshold
+    metrics.reset()
+    t0 = time.perf_counter()
+    core_batch.process_pending_papers_parallel()
+    seconds = time.perf_counter() - t0
+
+    snapshot = metrics.snapshot()
+    total = {}
+    for c in snapshot["counters"]:
+        total[c["name"]] = total.get(c["name"], 0) + c["value"]
+    full = sum(c["value"] for c in snapshot["counters"]
+               if c["name"] == "papers_triaged_total" and c["labels"].get("outcome") == "full")
+    cost = total.get("llm_cost_yuan_total", 0.0)
+    return {
+        "threshold": threshold,
+        "seconds": round(seconds, 2),
+        "papers_per_hour": round(len(paper_ids) / seconds * 3600, 1),
+        "full_analyses": int(full) if threshold > 0 else len(paper_ids),
+        "llm_tokens": int(total.get("llm_tokens_total", 0)),
+        "cost_yuan": round(cost, 4),
+        "cost_per_day_yuan": round(cost / len(paper_ids) * daily_papers, 4),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="两级分析基准")
+    parser.add_argument("--papers", type=int, default=60)
+    parser.add_argument("--full-latency", type=float, default=1.0, help="深度分析模型每次请求的延迟 (秒)")
+    parser.add_argument("--triage-latency", type=float, default=0.2, help="初筛模型每次请求的延迟 (秒)")
+    parser.add_argument("--threshold", type=float, default=0.5, help="初筛相关度阈值")
+    parser.add_argument("--daily-papers", type=int, default=200, help="折算每日费用时的每日论文数")
+    parser.add_argument("--json", help="结果输出路径 (JSON)")
+    args = parser.parse_args()
+
+    use_temp_database("triage")
+    triage_model = os.getenv("TRIAGE_MODEL", "qwen-turbo")
+    with FakeLLM(latency=args.full_latency, model_latency={triage_model: args.triage_latency}) as fake:
+        os.environ.update({"DASHSCOPE_BASE_URL": fake.url, "DASHSCOPE_API_KEY": "sk-bench"})
+        import core_batch
+        from database import Session
+
+        session = Session()
+        paper_ids = insert_pending(session, args.papers)
+        session.close()
+
+        baseline = run_mode(core_batch, 0.0, paper_ids, args.daily_papers)
+        cascade = run_mode(core_batch, args.threshold, paper_ids, args.daily_papers)
+
+    result = {
+        "papers": args.papers,
+        "workers": core_batch.MAX_WORKERS,
+        "triage_model": triage_model,
+        "baseline": baseline,
+        "cascade": cascade,
+        "throughput_ratio": round(cascade["papers_per_hour"] / baseline["papers_per_hour"], 2),
+        "cost_ratio": round(cascade["cost_yuan"] / baseline["cost_yuan"], 2) if baseline["cost_yuan"] else None,
+    }
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+本地模拟的 arXiv 检索接口 (/api/query，Atom 格式) 与 PDF 托管 (/pdf/<id>)，供基准与测试使用
+检索结果按 start / max_results 分页返回 papers 篇论文，PDF 链接指向本服务；
+PDF 由 PyMuPDF 现场生成 (每页一段合成正文)，首次请求后缓存
+可配置检索与下载的延迟，并记录请求数与下载字节数
+用法: 设置 ARXIV_API_URL=fake.api_url 后再导入 core_batch
+"""
+import random
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from html import escape
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import fitz
+
+from benchmarks.synthetic import EN_VOCAB, EN_WEIGHTS
+
+
+class FakeArxiv:
+    def __init__(self, papers: int = 10, latency: float = 0.2, pdf_latency: float = 0.5,
+                 pdf_pages: int = 8, id_prefix: str = "2601", seed: int = 9):
+        self.papers = papers
+        self.latency = latency
+        self.pdf_latency = pdf_latency
+        self.pdf_pages = pdf_pages
+        self.id_prefix = id_prefix
+        self.seed = seed
+        self.feed_requests = 0
+        self.pdf_requests = 0
+        self.bytes_served = 0
+        self._pdfs = {}
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_port}"
+
+    @property
+    def api_url(self) -> str:
+        return f"{self.url}/api/query"
+
+    def _words(self, rng: random.Random, n: int) -> str:
+        return " ".join(rng.choices(EN_VOCAB, weights=EN_WEIGHTS, k=n))
+
+    def _entry(self, i: int) -> str:
+        rng = random.Random(self.seed * 100003 + i)
+        arxiv_id = f"{self.id_prefix}.{i:05d}v1"
+        published = (datetime(2026, 1, 1, tzinfo=timezone.utc) + timedelta(minutes=i)).strftime("%Y-%m-%dT%H:%M:%SZ")
+        return f"""<entry>
+<id>http://arxiv.org/abs/{arxiv_id}</id>
+<updated>{published}</updated>
+<published>{published}</published>
+<title>{escape(self._words(rng, 8).title())}</title>
+<summary>{escape(self._words(rng, 120))}</summary>
+<author><name>Bench Author {i}</name></author>
+<link href="http://arxiv.org/abs/{arxiv_id}" rel="alternate" type="text/html"/>
+<link title="pdf" href="{self.url}/pdf/{arxiv_id}" rel="related" type="application/pdf"/>
+<arxiv:primary_category term="cs.AI" scheme="http://arxiv.org/schemas/atom"/>
+<category term="cs.AI" scheme="http://arxiv.org/schemas/atom"/>
+</entry>"""
+
+    def feed(self, start: int, max_results: int) -> bytes:
+        entries = "\n".join(self._entry(i) for i in range(start, min(self.papers, start + max_results)))
+        return f"""<?xml version="1.0" encoding="UTF-8"?>
+<feed xmlns="http://www.w3.org/2005/Atom" xmlns:opensearch="http://a9.com/-/spec/opensearch/1.1/" xmlns:arxiv="http://arxiv.org/schemas/atom">
+<title>ArXiv Query (fake)</title>
+<opensearch:totalResults>{self.papers}</opensearch:totalResults>
+<opensearch:startIndex>{start}</opensearch:startIndex>
+<opensearch:itemsPerPage>{max_results}</opensearch:itemsPerPage>
+{entries}
+</feed>""".encode()
+
+    def pdf(self, arxiv_id: str) -> bytes:
+        """生成 (并缓存) 一篇论文的 PDF"""
+        with self._lock:
+            if arxiv_id in self._pdfs:
+                return self._pdfs[arxiv_id]
+        rng = random.Random(f"{self.seed}-{arxiv_id}")
+        with fitz.open() as doc:
+            for _ in range(self.pdf_pages):
+                page = doc.new_page()
+                page.insert_textbox(fitz.Rect(50, 50, 550, 800), self._words(rng, 400), fontsize=9)
+            data = doc.tobytes()
+        with self._lock:
+            self._pdfs[arxiv_id] = data
+        return data
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                if parsed.path == "/api/query":
+                    params = parse_qs(parsed.query)
+                    time.sleep(fake.latency)
+                    data, content_type = fake.feed(int(params.get("start", ["0"])[0]),
+                                                   int(params.get("max_results", ["10"])[0])), "application/atom+xml"
+                    with fake._lock:
+                        fake.feed_requests += 1
+                elif parsed.path.startswith("/pdf/"):
+                    time.sleep(fake.pdf_latency)
+                    data, content_type = fake.pdf(parsed.path[len("/pdf/"):]), "application/pdf"
+                    with fake._lock:
+                        fake.pdf_requests += 1
+                        fake.bytes_served += len(data)
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def __enter__(self):
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
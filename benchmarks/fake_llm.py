@@ -0,0 +1,107 @@
+"""
+本地模拟的 OpenAI 兼容对话接口 (/chat/completions)，供基准与测试使用
+要求 JSON 输出 (response_format=json_object) 时返回一份结构完整的论文分析 (含初筛用的 relevance_score)，否则返回一段文本；
+可配置每次请求的延迟 (可按模型单独设置) 与失败率，并记录请求数与 token 数
+用法: 设置 DASHSCOPE_BASE_URL=fake.url 后再导入 core_batch
+"""
+import json
+import random
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from benchmarks.synthetic import CATEGORIES, EN_WORDS, CN_WORDS
+
+
+class FakeLLM:
+    def __init__(self, latency: float = 0.5, error_rate: float = 0.0, seed: int = 5, model_latency: dict = None):
+        self.latency = latency
+        self.model_latency = model_latency or {}
+        self.error_rate = error_rate
+        self.requests = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_port}"
+
+    @staticmethod
+    def analysis(prompt: str) -> dict:
+        """按提示词内容确定性地生成一份论文分析 (同一篇论文每次结果相同)"""
+        rng = random.Random(zlib.crc32(prompt.encode()))
+        return {
+            "category": rng.choice(CATEGORIES),
+            "motivation": "、".join(rng.sample(CN_WORDS, 6)),
+            "method": " ".join(rng.choices(EN_WORDS, k=40)),
+            "result": "，".join(rng.sample(CN_WORDS, 5)),
+            "implementation_example": " ".join(rng.choices(EN_WORDS, k=30)),
+            "popular_science": "这篇论文" + "，".join(rng.sample(CN_WORDS, 10)) + "。",
+            "keywords": ", ".join(rng.sample(EN_WORDS, 4)),
+            "relevance_score": round(rng.random(), 2),
+        }
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                time.sleep(fake.model_latency.get(payload.get("model"), fake.latency))
+                prompt = "\n".join(m.get("content") or "" for m in payload.get("messages", []))
+                if (payload.get("response_format") or {}).get("type") == "json_object":
+                    content = json.dumps(fake.analysis(prompt), ensure_ascii=False)
+                else:
+                    content = "这是模拟的大模型回答：" + "，".join(CN_WORDS[:8]) + "。"
+                # 粗略估算 token 数：中文约 1 字 1 token
+                prompt_tokens, completion_tokens = len(prompt) // 2, len(content)
+                with fake._lock:
+                    fake.requests += 1
+                    failed = fake._rng.random() < fake.error_rate
+                    if not failed:
+                        fake.prompt_tokens += prompt_tokens
+                        fake.completion_tokens += completion_tokens
+
+                if failed:
+                    code, body = 500, {"error": {"message": "fake failure", "type": "server_error"}}
+                else:
+                    code, body = 200, {
+                        "id": f"chatcmpl-fake-{fake.requests}",
+                        "object": "chat.completion",
+                        "created": int(time.time()),
+                        "model": payload.get("model", "fake"),
+                        "choices": [{
+                            "index": 0,
+                            "message": {"role": "assistant", "content": content},
+                            "finish_reason": "stop",
+                        }],
+                        "usage": {
+                            "prompt_tokens": prompt_tokens,
+                            "completion_tokens": completion_tokens,
+                            "total_tokens": prompt_tokens + completion_tokens,
+                        },
+                    }
+                data = json.dumps(body, ensure_ascii=False).encode()
+                self.send_response(code)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def __enter__(self):
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
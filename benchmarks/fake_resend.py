@@ -0,0 +1,70 @@
+"""
+本地模拟的 Resend 接口 (/emails 与 /emails/batch)，供基准与测试使用
+可配置每次请求的延迟与失败率，并记录收到的请求
+"""
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeResend:
+    def __init__(self, latency: float = 0.05, error_rate: float = 0.0, seed: int = 3):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.requests = 0
+        self.messages = 0
+        self.idempotency_keys = set()
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_port}"
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                time.sleep(fake.latency)
+                with fake._lock:
+                    fake.requests += 1
+                    failed = fake._rng.random() < fake.error_rate
+                    key = self.headers.get("Idempotency-Key")
+                    duplicate = key in fake.idempotency_keys
+                    if not failed and key:
+                        fake.idempotency_keys.add(key)
+                    emails = payload if isinstance(payload, list) else [payload]
+                    if not failed and not duplicate:
+                        fake.messages += len(emails)
+
+                if failed:
+                    code, body = 500, {"name": "application_error", "message": "fake failure", "statusCode": 500}
+                elif isinstance(payload, list):
+                    code, body = 200, {"data": [{"id": f"fake_{i}"} for i in range(len(payload))]}
+                else:
+                    code, body = 200, {"id": "fake"}
+                data = json.dumps(body).encode()
+                self.send_response(code)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def __enter__(self):
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
@@ -0,0 +1,279 @@
+"""
+离线基准套件：一次运行覆盖 services.py 的各个查询与写路径、每日流水线的各个步骤与全部 Streamlit 页面，
+结果写为 JSON (附带提交号)，用 compare 子命令对比两次结果找出回退
+- 数据库为临时 sqlite + 合成语料 (论文、用户、收藏、评论、打赏，并补建各类索引)
+- 大模型 (OpenAI 兼容接口)、arXiv 检索与 PDF 下载、Resend 邮件均由本地模拟服务替代，不访问外网
+用法:
+  python -m benchmarks.suite run --papers 10000 --users 1000 [--only services,pages,pipeline] [--out 结果.json]
+  python -m benchmarks.suite compare 基线.json 新结果.json [--threshold 0.2]
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import ExitStack
+from datetime import date, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+SECTIONS = ("services", "pages", "pipeline")
+EMAIL = "bench_user_1@example.com"
+
+
+def _git(*args) -> str:
+    try:
+        return subprocess.run(["git", *args], cwd=ROOT, capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return ""
+
+
+def service_cases() -> list[tuple[str, callable, bool]]:
+    """(名称, 调用, 是否写操作)；读操作分别测冷 (清空读缓存) 与热两种情况"""
+    import services
+    from benchmarks.synthetic import CATEGORIES
+
+    today = date.today()
+    start = today - timedelta(days=30)
+    latest = services.get_papers_by_category()[0]
+    listing = tuple(p.id for p in services.get_papers_by_category()[:50])
+    pid = latest.id
+
+    return [
+        ("get_user_by_email", lambda: services.get_user_by_email(EMAIL), False),
+        ("get_user_favorites", lambda: services.get_user_favorites(EMAIL), False),
+        ("get_user_favorite_count", lambda: services.get_user_favorite_count(EMAIL), False),
+        ("get_user_favorite_ids", lambda: services.get_user_favorite_ids(EMAIL), False),
+        ("is_paper_favorited", lambda: services.is_paper_favorited(EMAIL, pid), False),
+        ("get_papers_by_category", lambda: services.get_papers_by_category(), False),
+        ("get_papers_by_category[category]", lambda: services.get_papers_by_category(CATEGORIES[0]), False),
+        ("get_papers_by_category[date]",
+         lambda: services.get_papers_by_category(target_date=latest.created_at.date()), False),
+        ("get_all_categories", services.get_all_categories, False),
+        ("get_dashboard_stats", services.get_dashboard_stats, False),
+        ("get_top_keywords", services.get_top_keywords, False),
+        ("get_top_keywords[category]", lambda: services.get_top_keywords(category=CATEGORIES[0]), False),
+        ("get_top_cited_papers", lambda: services.get_top_cited_papers(CATEGORIES[0]), False),
+        ("get_daily_category_series", lambda: services.get_daily_category_series(start, today), False),
+        ("get_daily_keyword_series", lambda: services.get_daily_keyword_series(start, today), False),
+        ("get_daily_engagement_series", lambda: services.get_daily_engagement_series(start, today), False),
+        ("search_papers[en]", lambda: services.search_papers("language model"), False),
+        ("search_papers[zh]", lambda: services.search_papers("大语言模型"), False),
+        ("get_similar_papers", lambda: services.get_similar_papers(pid), False),
+        ("get_paper_full_text", lambda: services.get_paper_full_text(pid), False),
+        ("get_earliest_paper_date", services.get_earliest_paper_date, False),
+        ("get_recent_donations", services.get_recent_donations, False),
+        ("get_paper_comments", lambda: services.get_paper_comments(pid), False),
+        ("get_comments_for_papers", lambda: services.get_comments_for_papers(listing), False),
+        ("get_trending_papers", services.get_trending_papers, False),
+        ("verify_code", lambda: services.verify_code(EMAIL, "000000"), False),
+        ("toggle_favorite", lambda: services.toggle_favorite(EMAIL, pid), True),
+        ("add_comment", lambda: services.add_comment(EMAIL, pid, "基准测试评论"), True),
+        ("update_user_subscription", lambda: services.update_user_subscription(EMAIL, CATEGORIES[:2]), True),
+        ("add_donation_record", lambda: services.add_donation_record(EMAIL, "6.66", "基准"), True),
+        ("send_verification_code", lambda: services.send_verification_code(EMAIL), True),
+    ]
+
+
+def bench_services(repeat: int) -> dict:
+    from cache import clear_caches
+    from query_stats import track
+
+    def timed(fn) -> tuple[float, int]:
+        with track("bench") as stats:
+            t0 = time.perf_counter()
+            fn()
+            ms = (time.perf_counter() - t0) * 1000
+        return ms, stats.queries
+
+    results = {}
+    for name, fn, write in service_cases():
+        if write:
+            samples = [timed(fn) for _ in range(repeat)]
+            results[name] = {
+                "write_ms": round(statistics.median(ms for ms, _ in samples), 2),
+                "queries": max(q for _, q in samples),
+            }
+            continue
+        clear_caches()
+        cold_ms, queries = timed(fn)
+        warm = [timed(fn)[0] for _ in range(repeat)]
+        results[name] = {
+            "cold_ms": round(cold_ms, 2),
+            "warm_ms": round(statistics.median(warm), 3),
+            "queries": queries,
+        }
+    return results
+
+
+def bench_pages(reruns: int) -> dict:
+    from benchmarks.bench_pages import measure_pages
+
+    return {r["page"]: {k: v for k, v in r.items() if k != "page"}
+            for r in measure_pages(os.path.join(ROOT, "app.py"), reruns)}
+
+
+def bench_pipeline(fakes: dict) -> dict:
+    from pipeline import run_daily_pipeline
+
+    t0 = time.perf_counter()
+    stages = run_daily_pipeline(run_key=f"suite-{int(time.time())}", force=True)
+    return {
+        "total_s": round(time.perf_counter() - t0, 2),
+        "stages": stages,
+        "llm_requests": fakes["llm"].requests,
+        "llm_prompt_tokens": fakes["llm"].prompt_tokens,
+        "pdf_downloads": fakes["arxiv"].pdf_requests,
+        "emails_sent": fakes["resend"].messages,
+    }
+
+
+def run(args):
+    from benchmarks.fake_arxiv import FakeArxiv
+    from benchmarks.fake_llm import FakeLLM
+    from benchmarks.fake_resend import FakeResend
+
+    only = set(args.only.split(",")) if args.only else set(SECTIONS)
+    workdir = tempfile.mkdtemp(prefix="arxivmind_suite_")
+    with ExitStack() as stack:
+        fakes = {
+            "llm": stack.enter_context(FakeLLM(latency=args.llm_latency)),
+            "arxiv": stack.enter_context(FakeArxiv(papers=args.new_papers, latency=args.fetch_latency,
+                                                   pdf_latency=args.fetch_latency)),
+            "resend": stack.enter_context(FakeResend(latency=args.email_latency)),
+        }
+        # 必须在导入 database / services / core_batch 之前设置 (模块导入时读取)
+        os.environ.update({
+            "DASHSCOPE_BASE_URL": fakes["llm"].url,
+            "DASHSCOPE_API_KEY": "sk-bench",
+            "ARXIV_API_URL": fakes["arxiv"].api_url,
+            "ARXIV_MAX_RESULTS": str(args.new_papers),
+            "RESEND_API_URL": fakes["resend"].url,
+            "RESEND_API_KEY": "re_bench",
+            "METRICS_DIR": os.path.join(workdir, "metrics"),
+        })
+
+        from benchmarks.synthetic import use_temp_database, build_corpus
+
+        use_temp_database("suite")
+        t0 = time.perf_counter()
+        corpus = build_corpus(args.papers, args.users, args.favorites, args.comments)
+        corpus["build_s"] = round(time.perf_counter() - t0, 2)
+        print(f"语料生成完成: {corpus}", file=sys.stderr)
+
+        result = {
+            "meta": {
+                "commit": _git("rev-parse", "--short", "HEAD"),
+                "dirty": bool(_git("status", "--porcelain", "--untracked-files=no")),
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "args": vars(args),
+                "corpus": corpus,
+            }
+        }
+        # 流水线会写入新论文与推送记录，放在最后
+        if "services" in only:
+            result["services"] = bench_services(args.repeat)
+        if "pages" in only:
+            result["pages"] = bench_pages(args.page_reruns)
+        if "pipeline" in only:
+            result["pipeline"] = bench_pipeline(fakes)
+
+    out = args.out or os.path.join(RESULTS_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{result['meta']['commit'] or 'nogit'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(result, f, ensure_ascii=False, indent=2, default=str)
+    print(json.dumps({k: v for k, v in result.items() if k != "meta"}, ensure_ascii=False, indent=2, default=str))
+    print(f"结果已写入 {out}", file=sys.stderr)
+
+
+def flatten(data, prefix: str = "") -> dict[str, float]:
+    """把结果展开成 {"services.get_dashboard_stats.warm_ms": 1.2, ...}，只保留数值"""
+    flat = {}
+    for key, value in data.items():
+        path = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            flat.update(flatten(value, path))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[path] = value
+    return flat
+
+
+def _is_time(metric: str) -> bool:
+    return metric.endswith(("_ms", "_s", ".seconds"))
+
+
+def compare(args) -> int:
+    """逐项对比，耗时变慢超过阈值 (且绝对差超过 min_ms) 或查询数增加即视为回退；返回退出码"""
+    with open(args.base, encoding="utf-8") as f:
+        base = json.load(f)
+    with open(args.head, encoding="utf-8") as f:
+        head = json.load(f)
+    print(f"基线 {base['meta'].get('commit')} ({base['meta'].get('timestamp')}) → "
+          f"当前 {head['meta'].get('commit')} ({head['meta'].get('timestamp')})")
+
+    old = flatten({k: base[k] for k in SECTIONS if k in base})
+    new = flatten({k: head[k] for k in SECTIONS if k in head})
+    regressions = 0
+    for metric in sorted(old.keys() & new.keys()):
+        a, b = old[metric], new[metric]
+        if _is_time(metric):
+            scale = 1 if metric.endswith("_ms") else 1000
+            delta_ms = (b - a) * scale
+            if abs(delta_ms) < args.min_ms or (a and abs(b - a) / a < args.threshold):
+                continue
+            status = "回退" if b > a else "改进"
+        elif metric.endswith("queries"):
+            if a == b:
+                continue
+            status = "回退" if b > a else "改进"
+        else:
+            continue
+        regressions += status == "回退"
+        change = f"{(b - a) / a:+.0%}" if a else "新增"
+        print(f"  {status}  {metric:<60} {a:>10} → {b:<10} ({change})")
+
+    for metric in sorted(old.keys() - new.keys()):
+        print(f"  缺失  {metric}")
+    print(f"共 {regressions} 项回退")
+    return 1 if regressions else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="离线基准套件")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("run", help="生成语料并运行基准")
+    p.add_argument("--papers", type=int, default=10000)
+    p.add_argument("--users", type=int, default=1000)
+    p.add_argument("--favorites", type=int, default=10, help="每位用户的收藏数")
+    p.add_argument("--comments", type=int, default=None, help="评论总数 (默认论文数的 1/5)")
+    p.add_argument("--new-papers", type=int, default=10, help="流水线本次抓取的新论文数")
+    p.add_argument("--repeat", type=int, default=5, help="查询的热缓存重复次数 / 写操作重复次数")
+    p.add_argument("--page-reruns", type=int, default=2, help="每个页面冷启动后的重跑次数")
+    p.add_argument("--llm-latency", type=float, default=0.5)
+    p.add_argument("--fetch-latency", type=float, default=0.2)
+    p.add_argument("--email-latency", type=float, default=0.05)
+    p.add_argument("--only", help=f"只运行部分基准，逗号分隔: {','.join(SECTIONS)}")
+    p.add_argument("--out", help="结果输出路径 (默认 benchmarks/results/<时间>-<提交号>.json)")
+
+    c = sub.add_parser("compare", help="对比两次结果")
+    c.add_argument("base")
+    c.add_argument("head")
+    c.add_argument("--threshold", type=float, default=0.2, help="耗时变化超过该比例才报告")
+    c.add_argument("--min-ms", type=float, default=5, help="耗时绝对变化小于该值 (毫秒) 时忽略")
+
+    args = parser.parse_args()
+    if args.command == "run":
+        run(args)
+    else:
+        sys.exit(compare(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,259 @@
+"""
+合成数据生成器：按需向当前 DATABASE_URL 指向的数据库批量写入模拟论文、用户、收藏、评论与打赏
+(单表分批写入，1 万 ~ 100 万篇论文规模均可)；build_corpus() 一次生成整套数据并补建各类索引
+基准脚本应在导入 database 之前调用 use_temp_database()，避免污染真实数据
+"""
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+EN_WORDS = [
+    "language", "model", "reasoning", "agent", "vision", "multimodal", "transformer", "diffusion",
+    "retrieval", "recommendation", "driving", "planning", "reinforcement", "learning", "graph", "sparse",
+    "attention", "mixture", "experts", "alignment", "benchmark", "efficient", "scaling", "distillation",
+    "robust", "federated", "contrastive", "embedding", "tokenizer", "memory", "tool", "search",
+]
+CN_WORDS = [
+    "大语言模型", "推理", "智能体", "多模态", "视觉", "扩散模型", "检索增强", "推荐系统", "自动驾驶",
+    "强化学习", "图神经网络", "稀疏注意力", "混合专家", "对齐", "评测基准", "高效训练", "知识蒸馏",
+    "鲁棒性", "联邦学习", "对比学习", "向量表示", "长上下文", "工具调用", "规划", "记忆机制",
+]
+# 长尾词表：基础词表之外再补充合成词，并按 Zipf 分布抽样，贴近真实语料的词频
+EN_VOCAB = EN_WORDS + [f"{w}{i}" for i in range(1, 200) for w in ("neuro", "meta", "quant")]
+CN_VOCAB = CN_WORDS + [f"{a}{b}" for a in "量子神经元语义时空因果符号概率" for b in ("网络", "推断", "建模", "编码", "优化", "框架")]
+EN_WEIGHTS = [1 / (rank + 1) for rank in range(len(EN_VOCAB))]
+CN_WEIGHTS = [1 / (rank + 1) for rank in range(len(CN_VOCAB))]
+
+CATEGORIES = [
+    "语言模型/推理模型", "视觉模型/多模态", "AI Agent/智能体", "推荐搜索", "自动驾驶", "传统机器学习", "其他"
+]
+
+
+def use_temp_database(name: str = "bench") -> str:
+    """把 DATABASE_URL 指向一个临时 sqlite 文件并建表 (必须在首次访问数据库之前调用)"""
+    workdir = tempfile.mkdtemp(prefix="arxivmind_")
+    path = os.path.join(workdir, f"{name}.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+    # 向量索引也放到临时目录
+    os.environ["VECTOR_INDEX_DIR"] = os.path.join(workdir, "vector_index")
+
+    from database import migrate
+    migrate()
+    return path
+
+
+def _sentence(rng: random.Random, words: list[str], n: int, sep: str = " ") -> str:
+    weights = EN_WEIGHTS if words is EN_VOCAB else CN_WEIGHTS if words is CN_VOCAB else None
+    return sep.join(rng.choices(words, weights=weights, k=n))
+
+
+def make_paper_rows(n: int, seed: int = 42, start_id: int = 1, days: int = 90) -> list[dict]:
+    """生成 n 篇已完成分析的论文字典 (可直接用于批量 INSERT)"""
+    rng = random.Random(seed)
+    now = datetime.now()
+    rows = []
+    for i in range(start_id, start_id + n):
+        created = now - timedelta(days=rng.randint(0, days - 1), seconds=rng.randint(0, 86399))
+        keywords = ", ".join(dict.fromkeys(rng.choices(EN_VOCAB, weights=EN_WEIGHTS, k=4)))
+        rows.append({
+            "id": i,
+            "title": _sentence(rng, EN_VOCAB, 8).title(),
+            "chinese_title": _sentence(rng, CN_VOCAB, 3, sep=""),
+            "url": f"https://arxiv.org/pdf/bench.{i:07d}",
+            "publish_date": created,
+            "created_at": created,
+            "category": rng.choice(CATEGORIES),
+            "keywords": keywords,
+            "popular_science": "这篇论文" + _sentence(rng, CN_VOCAB, 12, sep="，") + "。",
+            "analysis_json": {
+                "motivation": _sentence(rng, CN_VOCAB, 8, sep="、"),
+                "method": _sentence(rng, EN_VOCAB, 20),
+                "result": _sentence(rng, CN_VOCAB, 6, sep="，"),
+            },
+            "citation_count": rng.randint(0, 500),
+            "influential_citation_count": 0,
+            "batch_status": "completed",
+            "completed_at": created,
+            "analyzed_at": created,
+            "updated_at": created,
+        })
+    return rows
+
+
+def insert_papers(session, n: int, seed: int = 42, chunk: int = 5000) -> int:
+    """分批写入 n 篇合成论文，返回写入数量"""
+    from database import Paper
+
+    start_id = (session.query(Paper.id).order_by(Paper.id.desc()).limit(1).scalar() or 0) + 1
+    for offset in range(0, n, chunk):
+        rows = make_paper_rows(min(chunk, n - offset), seed=seed + offset, start_id=start_id + offset)
+        session.execute(Paper.__table__.insert(), rows)
+        session.commit()
+    return n
+
+
+def insert_users(session, n: int, seed: int = 7, chunk: int = 5000) -> int:
+    """写入 n 位订阅用户，每人随机订阅 0~3 个领域 (0 个表示接收全领域)"""
+    from database import User, UserCategory
+
+    rng = random.Random(seed)
+    start_id = (session.query(User.id).order_by(User.id.desc()).limit(1).scalar() or 0) + 1
+    for offset in range(0, n, chunk):
+        rows, category_rows = [], []
+        for i in range(start_id + offset, start_id + min(n, offset + chunk)):
+            categories = rng.sample(CATEGORIES, rng.randint(0, 3))
+            rows.append({
+                "id": i,
+                "email": f"bench_user_{i}@example.com",
+                "subscribed_categories": ",".join(categories),
+                "is_subscribed": True,
+                "created_at": datetime.now(),
+            })
+            category_rows.extend({"user_id": i, "category": c} for c in categories)
+        session.execute(User.__table__.insert(), rows)
+        if category_rows:
+            session.execute(UserCategory.__table__.insert(), category_rows)
+        session.commit()
+    return n
+
+
+def insert_favorites(session, per_user: int = 10, seed: int = 11, chunk: int = 20000) -> int:
+    """为每位用户随机收藏 per_user 篇论文 (偏好集中在少数领域，贴近真实兴趣)，返回写入条数"""
+    from database import User, Paper, user_favorites
+
+    rng = random.Random(seed)
+    user_ids = [uid for (uid,) in session.query(User.id)]
+    papers_by_cat = {}
+    for pid, cat in session.query(Paper.id, Paper.category):
+        papers_by_cat.setdefault(cat, []).append(pid)
+    cats = list(papers_by_cat)
+
+    rows, total = [], 0
+    now = datetime.now()
+    for uid in user_ids:
+        favorite_cats = rng.sample(cats, min(2, len(cats)))
+        picked = set()
+        for _ in range(per_user):
+            picked.add(rng.choice(papers_by_cat[rng.choice(favorite_cats)]))
+        rows.extend({"user_id": uid, "paper_id": pid,
+                     "created_at": now - timedelta(days=rng.randint(0, 60))} for pid in picked)
+        if len(rows) >= chunk:
+            session.execute(user_favorites.insert(), rows)
+            session.commit()
+            total += len(rows)
+            rows = []
+    if rows:
+        session.execute(user_favorites.insert(), rows)
+        session.commit()
+        total += len(rows)
+    return total
+
+
+def insert_comments(session, n: int, seed: int = 13, chunk: int = 20000) -> int:
+    """随机写入 n 条评论 (少数热门论文集中了大部分评论)，返回写入条数"""
+    from database import User, Paper, Comment
+
+    rng = random.Random(seed)
+    user_ids = [uid for (uid,) in session.query(User.id)]
+    paper_ids = [pid for (pid,) in session.query(Paper.id)]
+    if not user_ids or not paper_ids:
+        return 0
+    weights = [1 / (rank + 1) for rank in range(len(paper_ids))]
+    now = datetime.now()
+    for offset in range(0, n, chunk):
+        size = min(chunk, n - offset)
+        papers = rng.choices(paper_ids, weights=weights, k=size)
+        rows = [{
+            "user_id": rng.choice(user_ids),
+            "paper_id": pid,
+            "content": "评论：" + _sentence(rng, CN_VOCAB, 6, sep="，"),
+            "created_at": now - timedelta(days=rng.randint(0, 60), seconds=rng.randint(0, 86399)),
+        } for pid in papers]
+        session.execute(Comment.__table__.insert(), rows)
+        session.commit()
+    return n
+
+
+def insert_donations(session, n: int, seed: int = 17) -> int:
+    """写入 n 条打赏记录"""
+    from database import Donation
+
+    rng = random.Random(seed)
+    now = datetime.now()
+    session.execute(Donation.__table__.insert(), [{
+        "email": f"bench_user_{rng.randint(1, 1000)}@example.com",
+        "amount": f"{rng.choice([6.66, 8.88, 18.8, 66])}",
+        "message": _sentence(rng, CN_VOCAB, 4, sep=""),
+        "created_at": now - timedelta(days=rng.randint(0, 90)),
+    } for _ in range(n)])
+    session.commit()
+    return n
+
+
+def build_corpus(papers: int, users: int, favorites_per_user: int = 10, comments: int = None,
+                 donations: int = 50, indexes: bool = True) -> dict:
+    """
+    向当前数据库写入一整套合成数据 (论文、用户、收藏、评论、打赏)，
+    indexes=True 时再补建关键词、全文检索、每日汇总、热度分与相似度索引，使各查询路径与线上一致
+    返回各部分数量与耗时
+    """
+    from database import Session
+
+    comments = papers // 5 if comments is None else comments
+    stats, t0 = {}, time.perf_counter()
+    session = Session()
+    try:
+        stats["papers"] = insert_papers(session, papers)
+        stats["users"] = insert_users(session, users)
+        stats["favorites"] = insert_favorites(session, favorites_per_user) if users and favorites_per_user else 0
+        stats["comments"] = insert_comments(session, comments) if users else 0
+        stats["donations"] = insert_donations(session, donations) if donations else 0
+    finally:
+        session.close()
+    stats["insert_s"] = round(time.perf_counter() - t0, 2)
+
+    if indexes:
+        from services import (backfill_paper_keywords, backfill_search_index,
+                              refresh_daily_rollups, rebuild_paper_scores)
+        from vector_index import build_similarity_index
+        t0 = time.perf_counter()
+        backfill_paper_keywords()
+        backfill_search_index()
+        refresh_daily_rollups()
+        rebuild_paper_scores()
+        build_similarity_index()
+        stats["index_s"] = round(time.perf_counter() - t0, 2)
+        check_index_coverage()
+    return stats
+
+
+def check_index_coverage():
+    """核对关键词、全文检索与向量索引覆盖了全部已完成论文，否则直接报错 (不在部分索引上测量)"""
+    from sqlalchemy import func, text
+    from database import Session, Paper, PaperKeyword
+    from vector_index import get_index
+
+    session = Session()
+    try:
+        completed = session.query(func.count(Paper.id)).filter(Paper.batch_status == "completed").scalar()
+        coverage = {
+            "paper_keywords": session.query(func.count(func.distinct(PaperKeyword.paper_id))).scalar(),
+            "paper_search": session.execute(text("SELECT count(*) FROM paper_search")).scalar(),
+            "vector_index": get_index().count,
+        }
+    finally:
+        session.close()
+    missing = {name: count for name, count in coverage.items() if count < completed}
+    if missing:
+        raise RuntimeError(f"索引不完整 (已完成论文 {completed} 篇): {missing}")
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    """简单分位数 (毫秒/秒等单位由调用方决定)"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    idx = min(len(ordered) - 1, max(0, int(round(pct / 100 * (len(ordered) - 1)))))
+    return ordered[idx]
@@ -0,0 +1,159 @@
+"""
+services 读函数的进程级共享缓存 (同一进程内所有 Streamlit 会话共用)
+- 缓存键 = 函数参数 + 所依赖数据范围 (scope) 的当前版本号
+- 写路径 (收藏/评论/打赏) 与每日流水线修改数据后调用 bump_version()，递增 data_versions 表中的版本号，
+  旧版本的缓存项不再命中，随 LRU 淘汰；其他进程最多 CACHE_VERSION_CHECK_SECONDS 秒后感知
+- 每个函数一份缓存，条目数不超过 maxsize；cache_stats() 返回各函数的命中率
+缓存的论文对象已脱离 session，各会话只读共享；返回的列表/字典是浅拷贝，调用方可以随意排序过滤。
+"""
+import copy
+import functools
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import update
+
+from database import Session, DataVersion, logger, get_utc_now
+
+# 数据范围
+PAPERS = "papers"          # 论文、关键词、向量索引、每日汇总 (每日流水线写入)
+ENGAGEMENT = "engagement"  # 收藏、评论、热度分
+DONATIONS = "donations"
+
+CACHE_ENABLED = os.getenv("CACHE_ENABLED", "1") != "0"
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "256"))
+CACHE_VERSION_CHECK_SECONDS = float(os.getenv("CACHE_VERSION_CHECK_SECONDS", "5"))
+
+_versions = {}
+_versions_checked = None
+_versions_lock = threading.Lock()
+_caches = {}
+
+
+class ReadCache:
+    """线程安全的 LRU 缓存，附带命中统计"""
+
+    def __init__(self, name: str, maxsize: int):
+        self.name = name
+        self.maxsize = maxsize
+        self.hits = self.misses = self.evictions = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key) -> tuple[bool, object]:
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return True, self._data[key]
+            self.misses += 1
+            return False, None
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": len(self._data),
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+def current_versions() -> dict:
+    """各 scope 的版本号 (进程内最多每 CACHE_VERSION_CHECK_SECONDS 秒查询一次 data_versions 表)"""
+    global _versions, _versions_checked
+    if _versions_checked is not None and time.monotonic() - _versions_checked < CACHE_VERSION_CHECK_SECONDS:
+        return _versions
+    with _versions_lock:
+        if _versions_checked is None or time.monotonic() - _versions_checked >= CACHE_VERSION_CHECK_SECONDS:
+            session = Session()
+            try:
+                _versions = dict(session.query(DataVersion.scope, DataVersion.version).all())
+            finally:
+                session.close()
+            _versions_checked = time.monotonic()
+    return _versions
+
+
+def bump_version(*scopes: str):
+    """
+    递增数据版本号 (独立事务，应在数据修改提交之后调用)
+    本进程立即生效；失败只记录日志，不影响已经完成的写操作
+    """
+    global _versions_checked
+    session = Session()
+    try:
+        for scope in scopes:
+            updated = session.execute(
+                update(DataVersion)
+                .where(DataVersion.scope == scope)
+                .values(version=DataVersion.version + 1, updated_at=get_utc_now())
+            ).rowcount
+            if not updated:
+                session.add(DataVersion(scope=scope, version=1, updated_at=get_utc_now()))
+        session.commit()
+    except Exception as e:
+        session.rollback()
+        logger.warning(f"数据版本递增失败 ({', '.join(scopes)}): {e}")
+    finally:
+        session.close()
+        _versions_checked = None
+
+
+def cached(*scopes: str, maxsize: int = CACHE_MAX_ENTRIES):
+    """
+    读函数缓存装饰器，scopes 为函数结果所依赖的数据范围
+    参数必须可哈希；读取版本号失败 (例如尚未建表) 时直接查询数据库，不缓存
+    """
+    def decorator(func):
+        cache = _caches[func.__name__] = ReadCache(func.__name__, maxsize)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not CACHE_ENABLED:
+                return func(*args, **kwargs)
+            try:
+                versions = current_versions()
+            except Exception as e:
+                logger.warning(f"读取数据版本失败，跳过缓存 ({func.__name__}): {e}")
+                return func(*args, **kwargs)
+
+            key = (args, tuple(sorted(kwargs.items())), tuple(versions.get(s, 0) for s in scopes))
+            hit, value = cache.get(key)
+            if not hit:
+                value = func(*args, **kwargs)
+                cache.put(key, value)
+            return copy.copy(value)
+
+        wrapper.cache = cache
+        return wrapper
+    return decorator
+
+
+def cache_stats() -> dict:
+    """{函数名: {hits, misses, evictions, size, hit_rate}}"""
+    return {name: cache.stats() for name, cache in _caches.items()}
+
+
+def clear_caches():
+    """清空全部缓存与统计 (测试或切换数据库时使用)"""
+    global _versions_checked
+    for cache in _caches.values():
+        cache.clear()
+    _versions_checked = None
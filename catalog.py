@@ -0,0 +1,147 @@
+"""
+进程内的论文目录 (所有 Streamlit 会话共享一份，由 views/common.py 的 get_paper_catalog 通过 st.cache_resource 持有)
+- 只保存已完成论文的展示字段 (__slots__ 记录，不含全文)，启动时全量加载一次
+- 预先按发布时间排好序，并建立 领域 -> 论文、入库日期 -> 论文 两个索引
+- 论文数据版本 (cache.PAPERS) 变化后增量刷新：只查询 updated_at 晚于水位线的论文 (新完成、重新分析、引用数更新等)；
+  已完成论文的 ID 集合对不上 (有论文被删除或回退) 时全量重建
+列表、按领域/日期筛选、计数都是纯内存操作。
+"""
+import sys
+import threading
+import time
+from datetime import date, datetime
+
+from cache import PAPERS, current_versions
+from database import Session, Paper, logger
+
+_FIELDS = (
+    "id", "title", "chinese_title", "url", "category", "publish_date", "created_at", "completed_at",
+    "updated_at", "citation_count", "keywords", "popular_science", "analysis_json", "analysis_tier",
+)
+
+
+class PaperRecord:
+    """论文展示字段 (只读)"""
+    __slots__ = _FIELDS
+
+    def __init__(self, *values):
+        for name, value in zip(_FIELDS, values):
+            setattr(self, name, value)
+        # 领域只有少数几个取值，共享同一个字符串对象
+        if self.category:
+            self.category = sys.intern(self.category)
+
+
+class _Snapshot:
+    """目录的一个不可变版本：刷新时整体替换，读取方无需加锁"""
+
+    def __init__(self, records: dict):
+        self.records = records
+        # 与 get_papers_by_category 一致：按发布时间降序 (无发布时间的排在最后)
+        self.order = sorted(
+            records,
+            key=lambda pid: (records[pid].publish_date is not None, records[pid].publish_date or datetime.min, pid),
+            reverse=True
+        )
+        self.by_category, self.by_day = {}, {}
+        for pid in self.order:
+            r = records[pid]
+            self.by_category.setdefault(r.category, []).append(pid)
+            if r.created_at:
+                self.by_day.setdefault(r.created_at.date(), []).append(pid)
+        self.watermark = max((r.updated_at for r in records.values() if r.updated_at), default=None)
+
+
+class PaperCatalog:
+    """论文目录：读取时检查数据版本，必要时刷新后返回当前快照"""
+
+    def __init__(self):
+        self._snapshot = _Snapshot({})
+        self._version = None
+        self._lock = threading.Lock()
+        self.loaded_at = None
+
+    # --- 刷新 ---
+
+    def _query(self, session):
+        return session.query(*(getattr(Paper, f) for f in _FIELDS)).filter(Paper.batch_status == "completed")
+
+    def refresh(self, force: bool = False) -> int:
+        """数据版本变化 (或 force) 时刷新，返回新增/更新的论文数"""
+        try:
+            version = current_versions().get(PAPERS, 0)
+        except Exception as e:
+            logger.warning(f"论文目录: 读取数据版本失败，继续使用旧数据: {e}")
+            return 0
+        if not force and self.loaded_at is not None and version == self._version:
+            return 0
+
+        with self._lock:
+            if not force and self.loaded_at is not None and version == self._version:
+                return 0
+            t0 = time.perf_counter()
+            snapshot = self._snapshot
+            session = Session()
+            try:
+                if force or self.loaded_at is None or snapshot.watermark is None:
+                    rows = self._query(session).all()
+                    records = {}
+                    mode = "全量"
+                else:
+                    rows = self._query(session).filter(Paper.updated_at > snapshot.watermark).all()
+                    records = dict(snapshot.records)
+                    mode = "增量"
+                for row in rows:
+                    records[row.id] = PaperRecord(*row)
+
+                completed_ids = {pid for (pid,) in session.query(Paper.id).filter(Paper.batch_status == "completed")}
+                if records.keys() != completed_ids:
+                    # 有论文被删除或状态回退：增量无法感知，全量重建
+                    records = {row.id: PaperRecord(*row) for row in self._query(session)}
+                    rows, mode = records.values(), "全量"
+            finally:
+                session.close()
+
+            self._snapshot = _Snapshot(records)
+            self._version = version
+            self.loaded_at = time.time()
+            logger.info(f"论文目录{mode}刷新: {len(rows)} 篇变更，共 {len(records)} 篇，"
+                        f"耗时 {time.perf_counter() - t0:.2f}s")
+            return len(rows)
+
+    def _current(self) -> _Snapshot:
+        self.refresh()
+        return self._snapshot
+
+    # --- 查询 (纯内存) ---
+
+    def _ids(self, snapshot: _Snapshot, category: str = None, target_date: date = None) -> list[int]:
+        if category in (None, "", "全部"):
+            category = None
+        if target_date is not None:
+            ids = snapshot.by_day.get(target_date, [])
+            if category is not None:
+                ids = [pid for pid in ids if snapshot.records[pid].category == category]
+            return ids
+        if category is not None:
+            return snapshot.by_category.get(category, [])
+        return snapshot.order
+
+    def papers(self, category: str = None, target_date: date = None) -> list[PaperRecord]:
+        """按领域/入库日期筛选，按发布时间降序"""
+        snapshot = self._current()
+        return [snapshot.records[pid] for pid in self._ids(snapshot, category, target_date)]
+
+    def count(self, category: str = None, target_date: date = None) -> int:
+        snapshot = self._current()
+        return len(self._ids(snapshot, category, target_date))
+
+    def get(self, paper_id: int) -> PaperRecord | None:
+        return self._current().records.get(paper_id)
+
+    def categories(self) -> list[str]:
+        return sorted(c for c in self._current().by_category if c)
+
+    def __len__(self):
+        return len(self._current().records)
+
@@ -1,22 +1,111 @@
 import os
+import re
 import json
 import time
+import hashlib
+import threading
 import arxiv
 import requests
 import fitz
 import backoff
 from pathlib import Path
-from openai import OpenAI
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from database import Session, Paper, logger
+from concurrent.futures import ThreadPoolExecutor
+from database import Session, Paper, logger, get_utc_now
+from services import sync_paper_keywords
+from search import index_paper
+from cache import bump_version, PAPERS
+import metrics
 from dotenv import load_dotenv
 
 load_dotenv()
 
-client = OpenAI(
-    api_key=os.getenv("DASHSCOPE_API_KEY"),
-    base_url="https://dashscope.aliyuncs.com/compatible-mode/v1",
-)
+_client = None
+_client_lock = threading.Lock()
+
+# 外部服务地址 (本地基准测试可指向模拟服务，见 benchmarks/)
+DASHSCOPE_BASE_URL = os.getenv("DASHSCOPE_BASE_URL", "https://dashscope.aliyuncs.com/compatible-mode/v1")
+ARXIV_API_URL = os.getenv("ARXIV_API_URL", "https://export.arxiv.org/api/query")
+ARXIV_MAX_RESULTS = int(os.getenv("ARXIV_MAX_RESULTS", "10"))
+SEMANTIC_SCHOLAR_API_URL = os.getenv("SEMANTIC_SCHOLAR_API_URL", "https://api.semanticscholar.org/graph/v1")
+
+# 分析结果的版本信息随论文一起保存，reanalysis.py 据此找出需要重新分析的论文：
+# 修改 ANALYSIS_PROMPT 时递增 ANALYSIS_PROMPT_VERSION；修改 extract_text (页数、清洗方式) 时递增 EXTRACTION_VERSION
+ANALYSIS_PROMPT_VERSION = "v1"
+ANALYSIS_MODEL = os.getenv("ANALYSIS_MODEL", "qwen-plus")
+EXTRACTION_VERSION = "v1"
+EXTRACT_PAGES = 8
+# 送入模型的正文上限 (字符)
+ANALYSIS_TEXT_LIMIT = 30000
+# 没有实际用量可参考时，一次深度分析输出 token 的估计值
+ANALYSIS_OUTPUT_TOKENS = 1500
+
+# 两级分析：先用便宜模型根据标题+摘要初筛 (领域、关键词、相关度)，相关度不低于 TRIAGE_THRESHOLD 的论文才做全文深度分析；
+# 初筛论文被用户收藏后排入重新分析队列，由流水线的 escalate 步骤升级为深度分析 (见 reanalysis.py)
+# TRIAGE_MODEL=local 使用本地关键词启发式，不调用大模型；TRIAGE_THRESHOLD=0 关闭初筛 (全部深度分析)
+TRIAGE_MODEL = os.getenv("TRIAGE_MODEL") or "qwen-turbo"
+TRIAGE_THRESHOLD = float(os.getenv("TRIAGE_THRESHOLD") or "0.5")
+TRIAGE_PROMPT_VERSION = "v1"
+# 成本基线：全部论文都用 qwen-plus 做深度分析
+BASELINE_MODEL = "qwen-plus"
+# 每千 token 价格 (元，输入/输出)，可用 LLM_PRICES='{"qwen-max": [0.0024, 0.0096]}' 补充或覆盖
+LLM_PRICES = {
+    "qwen-plus": (0.0008, 0.002),
+    "qwen-turbo": (0.0003, 0.0006),
+    "local": (0.0, 0.0),
+    **{model: tuple(price) for model, price in json.loads(os.getenv("LLM_PRICES") or "{}").items()},
+}
+
+ANALYSIS_PROMPT = """你是一个资深的 AI 领域科普专家。请阅读论文全文，输出一份详细的 JSON 报告。
+要求：内容完整详细，使用中文。
+
+1. category: 从以下选项中选择最匹配的领域（只能选一个）：语言模型/推理模型、视觉模型/多模态、AI Agent/智能体、推荐搜索、自动驾驶、传统机器学习、其他
+2. motivation: 详细说明研究动机，解决了什么痛点？
+3. method: 深入浅出描述研究方法。
+4. result: 列出关键实验结果和性能指标。
+5. implementation_example: 【具体实现思路举例】请用一个简单的例子说明论文的方法是如何一步步实现的，就像向开发者演示 Demo 逻辑一样。
+6. popular_science: 【论文科普】请用非常通俗易懂的语言（例如：打比方）向非专业人士解释这篇论文到底做了什么，它的意义在哪里。
+7. keywords: 3-5个英文关键词(逗号分隔)。
+
+论文标题: {title}
+内容正文: {text}
+"""
+
+CATEGORY_OPTIONS = "语言模型/推理模型、视觉模型/多模态、AI Agent/智能体、推荐搜索、自动驾驶、传统机器学习、其他"
+
+TRIAGE_PROMPT = """你是 AI 论文的初筛编辑。请根据标题和摘要快速判断这篇论文，输出 JSON。
+
+1. category: 从以下选项中选择最匹配的领域（只能选一个）：""" + CATEGORY_OPTIONS + """
+2. keywords: 3-5个英文关键词(逗号分隔)。
+3. relevance_score: 0~1 之间的小数，表示论文对关注 AI 前沿的读者的价值（新方法、重要结果、实用工具越高；偏题或增量很小的越低）。
+
+论文标题: {title}
+摘要: {abstract}
+"""
+
+# 本地初筛的领域词表 (TRIAGE_MODEL=local)
+TRIAGE_TOPICS = {
+    "语言模型/推理模型": ("language model", "llm", "reasoning", "transformer", "instruction", "chain-of-thought"),
+    "视觉模型/多模态": ("vision", "image", "video", "multimodal", "diffusion", "visual"),
+    "AI Agent/智能体": ("agent", "tool use", "planning", "multi-agent", "embodied"),
+    "推荐搜索": ("recommend", "retrieval", "search", "ranking"),
+    "自动驾驶": ("driving", "autonomous vehicle", "trajectory", "lidar"),
+    "传统机器学习": ("regression", "clustering", "kernel", "bayesian", "gradient boosting"),
+}
+
+
+def get_llm_client():
+    """DashScope 的 OpenAI 兼容客户端，首次调用时才导入 openai 并创建 (没有待分析论文的运行不付这部分启动开销)"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                from openai import OpenAI
+                _client = OpenAI(
+                    api_key=os.getenv("DASHSCOPE_API_KEY"),
+                    base_url=DASHSCOPE_BASE_URL,
+                )
+    return _client
+
 
 # 控制并发线程数，建议根据 DashScope 的 TPM/RPM 限制调整
 MAX_WORKERS = 3
@@ -28,7 +117,7 @@ def get_semantic_scholar_free(arxiv_id: str) -> dict | None:
     免费版 Semantic Scholar 调用逻辑
     """
     paper_id = f"ArXiv:{arxiv_id}"
-    url = f"https://api.semanticscholar.org/graph/v1/paper/{paper_id}"
+    url = f"{SEMANTIC_SCHOLAR_API_URL}/paper/{paper_id}"
     params = {'fields': 'citationCount,influentialCitationCount'}
 
     try:
@@ -52,13 +141,63 @@ def clean_text_for_db(text: str) -> str:
         return text
     return text.replace("\x00", "")
 
-def fetch_new_papers():
-    """抓取 Arxiv 最新论文"""
+
+def extract_text(pdf_bytes: bytes) -> str:
+    """从 PDF 提取正文 (前 EXTRACT_PAGES 页)"""
+    with fitz.open(stream=pdf_bytes, filetype="pdf") as doc:
+        return clean_text_for_db("".join([p.get_text() for p in doc[:EXTRACT_PAGES]]))
+
+
+def download_text(pdf_url: str) -> str:
+    """下载 PDF 并提取正文"""
+    with metrics.span("paper_download"):
+        resp = requests.get(pdf_url, timeout=60)
+    resp.raise_for_status()
+    metrics.counter("paper_download_bytes_total", len(resp.content))
+    with metrics.span("pdf_extract"):
+        return extract_text(resp.content)
+
+
+def analysis_input(title: str, text: str) -> str:
+    """实际送入模型的论文内容 (提示词模板之外的部分)"""
+    return f"{title}\n{(text or '')[:ANALYSIS_TEXT_LIMIT]}"
+
+
+def analysis_input_hash(title: str, text: str) -> str:
+    return hashlib.sha256(analysis_input(title, text).encode("utf-8")).hexdigest()
+
+
+_CJK = re.compile(r"[\u3000-\u9fff\uff00-\uffef]")
+
+
+def estimate_tokens(text: str) -> int:
+    """粗略估算 token 数：中文约 1 字 1 token，其余约 4 字符 1 token"""
+    if not text:
+        return 0
+    cjk = len(_CJK.findall(text))
+    return cjk + (len(text) - cjk) // 4
+
+
+def llm_cost(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    """按 LLM_PRICES 计算一次调用的费用 (元)，未配置价格的模型按 0 计"""
+    price_in, price_out = LLM_PRICES.get(model, (0.0, 0.0))
+    return (prompt_tokens * price_in + completion_tokens * price_out) / 1000
+
+
+def baseline_cost(title: str, text: str) -> float:
+    """基线 (qwen-plus 深度分析) 处理一篇论文的预估费用"""
+    prompt_tokens = estimate_tokens(ANALYSIS_PROMPT) + estimate_tokens(analysis_input(title, text))
+    return llm_cost(BASELINE_MODEL, prompt_tokens, ANALYSIS_OUTPUT_TOKENS)
+
+
+def iter_new_papers():
+    """抓取 Arxiv 最新论文，每成功入库一篇就产出它的 ID (流水线据此边抓取边分析)"""
     session = Session()
     arxiv_client = arxiv.Client()
+    arxiv_client.query_url_format = f"{ARXIV_API_URL}?{{}}"
     search = arxiv.Search(
         query="cat:cs.AI",
-        max_results=10,
+        max_results=ARXIV_MAX_RESULTS,
         sort_by=arxiv.SortCriterion.SubmittedDate
     )
 
@@ -68,15 +207,14 @@ def fetch_new_papers():
     for result in arxiv_client.results(search):
         if session.query(Paper).filter(Paper.url == result.pdf_url).first():
             logger.debug(f"论文已存在，跳过: {result.title[:50]}...")
+            metrics.counter("papers_fetched_total", status="skipped")
             continue
 
         try:
             logger.info(f"处理中: {result.title[:60]}...")
 
             # 1. 抓取正文
-            resp = requests.get(result.pdf_url, timeout=60)
-            with fitz.open(stream=resp.content, filetype="pdf") as doc:
-                text = "".join([p.get_text() for p in doc[:8]])
+            text = download_text(result.pdf_url)
 
             # 2. 调用免费版 SS 获取引用
             arxiv_id = result.entry_id.split('/')[-1]
@@ -87,7 +225,9 @@ def fetch_new_papers():
                 title=result.title,
                 url=result.pdf_url,
                 publish_date=result.published,
-                full_text_tmp=clean_text_for_db(text),
+                abstract=clean_text_for_db(result.summary),
+                full_text_tmp=text,
+                extraction_version=EXTRACTION_VERSION,
                 citation_count=ss_data.get('citationCount', 0),
                 influential_citation_count=ss_data.get('influentialCitationCount', 0),
                 # 标记该字段为空，表示待分析（或者你可以保留 batch_status 字段并设为 pending）
@@ -97,45 +237,105 @@ def fetch_new_papers():
             session.add(new_p)
             session.commit()
             new_count += 1
+            metrics.counter("papers_fetched_total", status="success")
             logger.info(f"论文入库成功: {result.title[:50]}...")
+            yield new_p.id
 
         except Exception as e:
             logger.error(f"论文处理失败 ({result.title[:30]}...): {e}")
+            metrics.counter("papers_fetched_total", status="failed")
             session.rollback()
 
     logger.info(f">>> 本次成功入库 {new_count} 篇论文")
     session.close()
+    if new_count:
+        bump_version(PAPERS)
+
+
+@metrics.span("fetch_new_papers")
+def fetch_new_papers():
+    """抓取 Arxiv 最新论文"""
+    for _ in iter_new_papers():
+        pass
+
+
+def _on_llm_retry(details):
+    metrics.counter("llm_retries_total", purpose="analysis")
+
+
+def _on_triage_retry(details):
+    metrics.counter("llm_retries_total", purpose="triage")
+
+
+def _record_llm_usage(response, purpose: str, model: str = "qwen-plus"):
+    """记录大模型输入/输出 token 数与费用 (接口未返回 usage 时跳过)"""
+    usage = getattr(response, "usage", None)
+    if usage:
+        prompt_tokens, completion_tokens = usage.prompt_tokens or 0, usage.completion_tokens or 0
+        metrics.counter("llm_tokens_total", prompt_tokens, direction="in", purpose=purpose)
+        metrics.counter("llm_tokens_total", completion_tokens, direction="out", purpose=purpose)
+        metrics.counter("llm_cost_yuan_total", llm_cost(model, prompt_tokens, completion_tokens),
+                        model=model, purpose=purpose)
+
+
+def _triage_local(title: str, abstract: str) -> dict:
+    """本地初筛：按领域词表命中数估计领域与相关度"""
+    content = f"{title} {abstract}".lower()
+    hits = {category: [w for w in words if w in content] for category, words in TRIAGE_TOPICS.items()}
+    category, matched = max(hits.items(), key=lambda kv: len(kv[1]))
+    return {
+        "category": category if matched else "其他",
+        "keywords": ", ".join(matched[:5]),
+        "relevance_score": min(1.0, sum(len(m) for m in hits.values()) / 4),
+    }
+
+
+@metrics.span("triage_paper")
+@backoff.on_exception(backoff.expo, Exception, max_tries=3, on_backoff=_on_triage_retry)
+def triage_paper(paper_id: int, title: str, abstract: str) -> dict:
+    """
+    初筛 (便宜模型，只看标题与摘要)：返回 category、keywords 与 relevance_score (0~1)
+    """
+    if TRIAGE_MODEL == "local":
+        return _triage_local(title, abstract)
+
+    with metrics.span("llm_request", purpose="triage"):
+        response = get_llm_client().chat.completions.create(
+            model=TRIAGE_MODEL,
+            messages=[{"role": "user", "content": TRIAGE_PROMPT.format(title=title, abstract=abstract[:4000])}],
+            response_format={"type": "json_object"},
+            temperature=0
+        )
+    _record_llm_usage(response, "triage", TRIAGE_MODEL)
+
+    try:
+        data = json.loads(response.choices[0].message.content)
+        data["relevance_score"] = min(1.0, max(0.0, float(data.get("relevance_score", 0))))
+    except (json.JSONDecodeError, TypeError, ValueError):
+        logger.error(f"初筛结果解析失败 [ID:{paper_id}]")
+        raise Exception("LLM triage output is not valid JSON")
+    return data
 
 
-@backoff.on_exception(backoff.expo, Exception, max_tries=3)
+@metrics.span("analyze_paper")
+@backoff.on_exception(backoff.expo, Exception, max_tries=3, on_backoff=_on_llm_retry)
 def analyze_single_paper(paper_id: int, title: str, text: str) -> dict:
     """
     单篇论文分析逻辑 (LLM 调用)
     """
     logger.info(f"正在分析论文 [ID:{paper_id}]: {title[:30]}...")
 
-    prompt = f"""你是一个资深的 AI 领域科普专家。请阅读论文全文，输出一份详细的 JSON 报告。
-要求：内容完整详细，使用中文。
+    prompt = ANALYSIS_PROMPT.format(title=title, text=text[:ANALYSIS_TEXT_LIMIT])
 
-1. category: 从以下选项中选择最匹配的领域（只能选一个）：语言模型/推理模型、视觉模型/多模态、AI Agent/智能体、推荐搜索、自动驾驶、传统机器学习、其他
-2. motivation: 详细说明研究动机，解决了什么痛点？
-3. method: 深入浅出描述研究方法。
-4. result: 列出关键实验结果和性能指标。
-5. implementation_example: 【具体实现思路举例】请用一个简单的例子说明论文的方法是如何一步步实现的，就像向开发者演示 Demo 逻辑一样。
-6. popular_science: 【论文科普】请用非常通俗易懂的语言（例如：打比方）向非专业人士解释这篇论文到底做了什么，它的意义在哪里。
-7. keywords: 3-5个英文关键词(逗号分隔)。
-
-论文标题: {title}
-内容正文: {text[:30000]}
-"""
-
-    response = client.chat.completions.create(
-        model="qwen-plus",
-        messages=[{"role": "user", "content": prompt}],
-        response_format={"type": "json_object"},
-        # 可以适当增加 temperature 让解释更生动
-        temperature=0.3
-    )
+    with metrics.span("llm_request", purpose="analysis"):
+        response = get_llm_client().chat.completions.create(
+            model=ANALYSIS_MODEL,
+            messages=[{"role": "user", "content": prompt}],
+            response_format={"type": "json_object"},
+            # 可以适当增加 temperature 让解释更生动
+            temperature=0.3
+        )
+    _record_llm_usage(response, "analysis", ANALYSIS_MODEL)
 
     result_text = response.choices[0].message.content
     try:
@@ -145,6 +345,94 @@ def analyze_single_paper(paper_id: int, title: str, text: str) -> dict:
         raise Exception("LLM output is not valid JSON")
 
 
+def load_analysis_task(session, paper: Paper) -> dict | None:
+    """提取待分析论文的数据 (与 Session 解绑)；没有正文的论文标记为 failed_no_text 并返回 None"""
+    if paper.full_text_tmp:
+        return {"id": paper.id, "title": paper.title, "text": paper.full_text_tmp, "abstract": paper.abstract}
+    # 如果没有文本但状态是 pending，标记为 failed 防止死循环
+    paper.batch_status = "failed_no_text"
+    session.commit()
+    return None
+
+
+def analyze_and_store(task: dict) -> bool:
+    """分析一篇论文并写回结果 (独立 Session，可在工作线程中调用)，返回是否成功"""
+    p_id = task["id"]
+    try:
+        # 首次分析先初筛，相关度达到阈值才做深度分析；重新分析 (含收藏升级) 直接深度分析
+        triage = None
+        if not task.get("reanalysis") and TRIAGE_THRESHOLD > 0:
+            triage = triage_paper(p_id, task["title"], task.get("abstract") or task["text"][:4000])
+        full = triage is None or triage["relevance_score"] >= TRIAGE_THRESHOLD
+        data = analyze_single_paper(p_id, task["title"], task["text"]) if full else triage
+        if not task.get("reanalysis"):
+            metrics.counter("llm_baseline_cost_yuan_total", baseline_cost(task["title"], task["text"]))
+        if triage is not None:
+            metrics.counter("papers_triaged_total", outcome="full" if full else "skipped")
+
+        # 独立 Session 更新，避免 SQLite 锁冲突
+        update_session = Session()
+        try:
+            p = update_session.query(Paper).get(p_id)
+            if not p:
+                return False
+            p.category = data.get('category', 'AI')
+            p.popular_science = data.get('popular_science', '')
+            keywords = data.get('keywords', '')
+            # 模型偶尔会以列表形式返回关键词
+            p.keywords = ", ".join(keywords) if isinstance(keywords, list) else keywords
+            p.analysis_json = data
+            if triage is not None:
+                p.relevance_score = triage["relevance_score"]
+            # 记录本次分析所用的提示词版本、模型与输入哈希 (见 reanalysis.py)
+            escalated = full and p.analysis_tier == "triage"
+            if full:
+                p.analysis_tier = "full"
+                p.analysis_prompt_version = ANALYSIS_PROMPT_VERSION
+                p.analysis_model = ANALYSIS_MODEL
+                p.analysis_input_hash = analysis_input_hash(task["title"], task["text"])
+            else:
+                p.analysis_tier = "triage"
+                p.analysis_prompt_version = f"triage-{TRIAGE_PROMPT_VERSION}"
+                p.analysis_model = TRIAGE_MODEL
+                p.analysis_input_hash = analysis_input_hash(task["title"], task.get("abstract") or "")
+            p.reanalysis_reason = None
+            # 完成后状态流转；重新分析保留首次完成时间，避免被当作新论文再次推送
+            # 初筛论文不推送，升级为深度分析时更新完成时间，由下一次每日推送发出
+            p.batch_status = "completed"
+            p.analyzed_at = get_utc_now()
+            if not task.get("reanalysis") or escalated:
+                p.completed_at = p.analyzed_at
+            # 同步关键词倒排表与全文检索索引
+            sync_paper_keywords(update_session, p)
+            index_paper(update_session, p)
+            # 清空临时大文本
+            # p.full_text_tmp = None
+
+            update_session.commit()
+            metrics.counter("papers_analyzed_total", status="success")
+            logger.info(f"分析完成 [ID:{p_id}]" if full else f"初筛完成，相关度 {triage['relevance_score']:.2f} 低于阈值，暂不深度分析 [ID:{p_id}]")
+            return True
+        finally:
+            update_session.close()
+
+    except Exception as e:
+        logger.error(f"分析失败 [ID:{p_id}]: {e}")
+        metrics.counter("papers_analyzed_total", status="failed")
+        if task.get("reanalysis"):
+            # 重新分析失败时保留原有结果，论文留在重新分析队列中
+            return False
+        # 可选：记录错误状态
+        err_session = Session()
+        p_err = err_session.query(Paper).get(p_id)
+        if p_err:
+            p_err.batch_status = "failed"
+            err_session.commit()
+        err_session.close()
+        return False
+
+
+@metrics.span("process_pending_papers")
 def process_pending_papers_parallel():
     """并发处理 Pending 状态的论文"""
     session = Session()
@@ -160,69 +448,29 @@ def process_pending_papers_parallel():
 
     logger.info(f">>> [Step 2] 开始并发分析，待处理: {len(papers)} 篇")
 
-    # 提取数据到内存，与 Session 解绑
-    tasks = []
-    for p in papers:
-        # 只有当有文本时才分析
-        if p.full_text_tmp:
-            tasks.append({"id": p.id, "title": p.title, "text": p.full_text_tmp})
-        else:
-            # 如果没有文本但状态是 pending，标记为 failed 防止死循环
-            p.batch_status = "failed_no_text"
-            session.commit()
-
+    # 提取数据到内存，与 Session 解绑 (只有当有文本时才分析)
+    tasks = [t for t in (load_analysis_task(session, p) for p in papers) if t]
     session.close()  # 关闭主 Session
 
-    success_count = 0
     with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
-        future_to_id = {
-            executor.submit(analyze_single_paper, t["id"], t["title"], t["text"]): t["id"]
-            for t in tasks
-        }
-
-        for future in as_completed(future_to_id):
-            p_id = future_to_id[future]
-            try:
-                data = future.result()
-
-                # 独立 Session 更新，避免 SQLite 锁冲突
-                update_session = Session()
-                p = update_session.query(Paper).get(p_id)
-                if p:
-                    p.category = data.get('category', 'AI')
-                    p.popular_science = data.get('popular_science', '')
-                    p.keywords = data.get('keywords', '')
-                    p.analysis_json = data
-                    # 完成后状态流转
-                    p.batch_status = "completed"
-                    # 清空临时大文本
-                    # p.full_text_tmp = None
-
-                    update_session.commit()
-                    success_count += 1
-                    logger.info(f"分析完成 [ID:{p_id}]")
-                update_session.close()
-
-            except Exception as e:
-                logger.error(f"分析失败 [ID:{p_id}]: {e}")
-                # 可选：记录错误状态
-                err_session = Session()
-                p_err = err_session.query(Paper).get(p_id)
-                if p_err:
-                    p_err.batch_status = "failed"
-                    err_session.commit()
-                err_session.close()
+        success_count = sum(executor.map(analyze_and_store, tasks))
 
     logger.info(f">>> 分析流程结束，成功: {success_count}/{len(tasks)}")
+    if success_count:
+        # 让 Web 端的读缓存失效
+        bump_version(PAPERS)
+
 
 def call_qwen_ai_sync(prompt: str) -> str:
     """用于趋势分析的即时同步调用"""
     try:
-        response = client.chat.completions.create(
-            model="qwen-plus",
-            messages=[{"role": "user", "content": prompt + " (请以 JSON 格式输出结果)"}],
-            response_format={"type": "json_object"}
-        )
+        with metrics.span("llm_request", purpose="trend"):
+            response = get_llm_client().chat.completions.create(
+                model="qwen-plus",
+                messages=[{"role": "user", "content": prompt + " (请以 JSON 格式输出结果)"}],
+                response_format={"type": "json_object"}
+            )
+        _record_llm_usage(response, "trend")
         logger.info("即时 AI 分析完成")
         return response.choices[0].message.content
     except Exception as e:
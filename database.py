@@ -1,15 +1,17 @@
 import logging
 import os
-import streamlit as st 
+import threading
 # 1. 引入 timezone
 from datetime import datetime, timezone, timedelta
-from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime, JSON, Boolean, ForeignKey, Table
+from sqlalchemy import create_engine, inspect, text, Column, Integer, Float, String, Text, Date, DateTime, JSON, Boolean, ForeignKey, Table, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship
 from dotenv import load_dotenv
 
 load_dotenv()
 
+import query_stats  # noqa: E402  (读取 .env 中的阈值配置)
+
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
@@ -30,7 +32,9 @@ user_favorites = Table(
     Column('user_id', Integer, ForeignKey('users.id'), primary_key=True),
     Column('paper_id', Integer, ForeignKey('papers.id'), primary_key=True),
     # 3. 修改 default
-    Column('created_at', DateTime, default=get_utc_now)
+    Column('created_at', DateTime, default=get_utc_now),
+    # 按论文统计收藏 (热度分更新) 时使用
+    Index('ix_user_favorites_paper_id', 'paper_id')
 )
 
 
@@ -51,8 +55,31 @@ class Paper(Base):
     # 修改 default
     created_at = Column(DateTime, default=get_utc_now)
     chinese_title = Column(String)  # 新增字段
+    # 分析完成时间：每日推送按它增量选取新论文
+    completed_at = Column(DateTime)
+    # 最近一次写入分析结果的时间 (重新分析与初筛升级也会更新)：论文目录与向量索引据此找出需要刷新的论文
+    analyzed_at = Column(DateTime)
+    # 最近一次修改时间 (任何经 SQLAlchemy 的 UPDATE 都会刷新，例如引用数更新)：论文目录按它增量刷新
+    updated_at = Column(DateTime, default=get_utc_now, onupdate=get_utc_now)
+    # 分析结果的来源：提示词版本、模型、送入模型的标题+正文哈希，以及正文提取逻辑的版本 (见 reanalysis.py)
+    analysis_prompt_version = Column(String)
+    analysis_model = Column(String)
+    analysis_input_hash = Column(String(64))
+    extraction_version = Column(String)
+    # 已排入重新分析队列的原因 (逗号分隔)，重新分析成功后清空
+    reanalysis_reason = Column(String)
+    abstract = Column(Text)
+    # 两级分析：初筛给出的相关度 (0~1)；analysis_tier 为 triage (仅初筛) 或 full (全文深度分析)
+    relevance_score = Column(Float)
+    analysis_tier = Column(String)
     favorited_by = relationship("User", secondary=user_favorites, back_populates="favorite_papers")
 
+    __table_args__ = (
+        Index('ix_papers_status_completed_at', 'batch_status', 'completed_at'),
+        Index('ix_papers_status_analyzed_at', 'batch_status', 'analyzed_at'),
+        Index('ix_papers_status_updated_at', 'batch_status', 'updated_at'),
+    )
+
 
 class User(Base):
     __tablename__ = 'users'
@@ -67,6 +94,20 @@ class User(Base):
     favorite_papers = relationship("Paper", secondary=user_favorites, back_populates="favorited_by")
 
 
+class UserCategory(Base):
+    """
+    用户订阅领域 (users.subscribed_categories 的规范化索引，由 update_user_subscription 同步维护)
+    没有任何记录的订阅用户表示接收全部领域
+    """
+    __tablename__ = 'user_categories'
+    user_id = Column(Integer, ForeignKey('users.id'), primary_key=True)
+    category = Column(String, primary_key=True)
+
+    __table_args__ = (
+        Index('ix_user_categories_category_user', 'category', 'user_id'),
+    )
+
+
 class VerificationCode(Base):
     __tablename__ = 'verification_codes'
     id = Column(Integer, primary_key=True)
@@ -96,35 +137,272 @@ class Comment(Base):
 
     # 外键关联
     user_id = Column(Integer, ForeignKey('users.id'))
-    paper_id = Column(Integer, ForeignKey('papers.id'))
+    paper_id = Column(Integer, ForeignKey('papers.id'), index=True)
 
     # 关系属性 (方便查询)
     user = relationship("User", backref="comments")
     paper = relationship("Paper", backref="comments")
 
 
+class PaperKeyword(Base):
+    """论文关键词倒排表：由分析阶段写入，关键词已统一为小写并去除多余空白"""
+    __tablename__ = 'paper_keywords'
+    paper_id = Column(Integer, ForeignKey('papers.id'), primary_key=True)
+    keyword = Column(String, primary_key=True)
+    # 冗余论文的分类与日期，按领域/时间窗口统计时无需回表
+    category = Column(String)
+    paper_date = Column(DateTime)
+
+    __table_args__ = (
+        Index('ix_paper_keywords_keyword_date', 'keyword', 'paper_date'),
+        Index('ix_paper_keywords_date_keyword', 'paper_date', 'keyword'),
+        Index('ix_paper_keywords_category_date', 'category', 'paper_date', 'keyword'),
+    )
+
+
+class PaperScore(Base):
+    """
+    论文热度分 (物化表)
+    score 为对数空间下、相对固定纪元的时间衰减分，数值越大越热门；
+    由收藏/评论写路径增量更新，按 score 索引即可直接取 Top-K
+    """
+    __tablename__ = 'paper_scores'
+    paper_id = Column(Integer, ForeignKey('papers.id'), primary_key=True)
+    score = Column(Float, index=True)
+    favorite_count = Column(Integer, default=0)
+    comment_count = Column(Integer, default=0)
+    last_event_at = Column(DateTime)
+    updated_at = Column(DateTime, default=get_utc_now)
+
+
+class DigestDelivery(Base):
+    """每位用户的推送水位线：只推送 completed_at 晚于 last_completed_at 的论文"""
+    __tablename__ = 'digest_deliveries'
+    user_id = Column(Integer, ForeignKey('users.id'), primary_key=True)
+    last_completed_at = Column(DateTime)
+    last_sent_at = Column(DateTime)
+    papers_sent = Column(Integer, default=0)
+
+
+class EmailBody(Base):
+    """邮件正文 (按内容哈希去重，同一份正文被多位收件人共享)"""
+    __tablename__ = 'email_bodies'
+    body_hash = Column(String(64), primary_key=True)
+    html = Column(Text, nullable=False)
+    created_at = Column(DateTime, default=get_utc_now)
+
+
+class EmailOutbox(Base):
+    """
+    待投递邮件 (发件箱)：推送构建阶段写入，投递进程 (mailer.py) 按状态消费
+    status: pending -> sending -> sent / failed
+    idempotency_key 唯一，重复入队同一封邮件会被数据库拒绝
+    batch_key 是领取时分配的批次幂等键，进程崩溃后按原批次原样重发，服务商会去重
+    """
+    __tablename__ = 'email_outbox'
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey('users.id'))
+    to_email = Column(String, nullable=False)
+    subject = Column(String, nullable=False)
+    body_hash = Column(String(64), ForeignKey('email_bodies.body_hash'), nullable=False)
+    idempotency_key = Column(String, unique=True, nullable=False)
+    status = Column(String, default="pending")
+    attempts = Column(Integer, default=0)
+    next_attempt_at = Column(DateTime)
+    batch_key = Column(String, index=True)
+    claimed_at = Column(DateTime)
+    provider_id = Column(String)
+    last_error = Column(Text)
+    created_at = Column(DateTime, default=get_utc_now)
+    sent_at = Column(DateTime)
+
+    __table_args__ = (
+        Index('ix_email_outbox_status_next_attempt', 'status', 'next_attempt_at'),
+    )
+
+
+class DataVersion(Base):
+    """数据版本号：写路径与每日流水线修改数据后递增，各进程的读缓存 (cache.py) 据此失效"""
+    __tablename__ = 'data_versions'
+    scope = Column(String, primary_key=True)
+    version = Column(Integer, default=0, nullable=False)
+    updated_at = Column(DateTime, default=get_utc_now)
+
+
+class PipelineCheckpoint(Base):
+    """
+    每日流水线的步骤检查点 (pipeline.py)：按运行批次 (默认为当天日期) 记录每个步骤的状态
+    status: running / done / failed；同一批次重跑时跳过 done 的步骤
+    """
+    __tablename__ = 'pipeline_checkpoints'
+    run_key = Column(String, primary_key=True)
+    stage = Column(String, primary_key=True)
+    status = Column(String, nullable=False)
+    items = Column(Integer, default=0)
+    seconds = Column(Float)
+    stats = Column(JSON)
+    error = Column(Text)
+    started_at = Column(DateTime)
+    finished_at = Column(DateTime)
+
+
+# --- 每日汇总表 (由流水线最后一步增量维护，供看板趋势图使用) ---
+
+class DailyCategoryStat(Base):
+    """每日各领域新增论文数"""
+    __tablename__ = 'daily_category_stats'
+    day = Column(Date, primary_key=True)
+    category = Column(String, primary_key=True)
+    paper_count = Column(Integer, default=0)
+
+
+class DailyKeywordStat(Base):
+    """每日关键词出现次数"""
+    __tablename__ = 'daily_keyword_stats'
+    day = Column(Date, primary_key=True)
+    keyword = Column(String, primary_key=True)
+    count = Column(Integer, default=0)
+
+
+class DailyEngagementStat(Base):
+    """每日新增收藏数与评论数"""
+    __tablename__ = 'daily_engagement_stats'
+    day = Column(Date, primary_key=True)
+    favorites = Column(Integer, default=0)
+    comments = Column(Integer, default=0)
+
+
 # engine = create_engine('sqlite:///arxiv_mind_qwen.db')
 # Base.metadata.create_all(engine)
 # Session = sessionmaker(bind=engine)
 # logger.info("Database & Models initialized.")
 # 优先读取环境变量中的 DATABASE_URL，如果没有则回退到本地 SQLite (方便本地测试)
-DATABASE_URL = os.getenv("DATABASE_URL")
+# engine 在第一次真正访问数据库时才创建：导入本模块不连接数据库、不执行 DDL，也不依赖 Streamlit
+_engine = None
+_engine_lock = threading.Lock()
 
-@st.cache_resource  # <--- 关键：告诉 Streamlit 把这个连接缓存起来，不要每次都重建
-def get_db_engine():
+
+def _create_engine_from_env():
     url = os.getenv("DATABASE_URL")
     if url and url.startswith("postgres"):
         url = url.replace("postgres://", "postgresql://")
         # 加上 pool_pre_ping=True 防止连接因为长时间空闲断开
         return create_engine(url, pool_pre_ping=True)
+    elif url:
+        # 其他 SQLAlchemy URL (例如基准测试使用的临时 sqlite 文件)
+        return create_engine(url)
     else:
         print("⚠️ 使用本地 SQLite 模式")
         return create_engine('sqlite:///arxiv_mind_qwen.db')
 
-# 获取全局唯一的 engine
-engine = get_db_engine()
 
-# 确保表存在
-Base.metadata.create_all(engine)
-Session = sessionmaker(bind=engine)
-logger.info("Database & Models initialized.")
+def get_db_engine():
+    """进程内唯一的 engine (首次调用时按当前环境变量创建)"""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                engine = _create_engine_from_env()
+                # 查询统计钩子：页面渲染与流水线步骤的查询次数、慢查询与 N+1 告警 (见 query_stats.py)
+                query_stats.install(engine)
+                _engine = engine
+    return _engine
+
+
+def __getattr__(name):
+    # 兼容 `from database import engine` 的旧写法
+    if name == "engine":
+        return get_db_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+class _LazySessionmaker(sessionmaker):
+    """第一次创建 Session 时才绑定 engine"""
+
+    def __call__(self, **local_kw):
+        if self.kw.get("bind") is None:
+            self.configure(bind=get_db_engine())
+        return super().__call__(**local_kw)
+
+
+def upgrade_schema(bind):
+    """
+    建表并补齐老库缺失的列与索引 (create_all 只会创建不存在的表)
+    新增列一律可为空，直接 ALTER TABLE ADD COLUMN 即可
+    """
+    existing_tables = set(inspect(bind).get_table_names())
+    Base.metadata.create_all(bind)
+    inspector = inspect(bind)
+
+    if 'user_categories' not in existing_tables and 'users' in existing_tables:
+        # 首次创建订阅领域表：从逗号分隔的 subscribed_categories 回填
+        with bind.begin() as conn:
+            rows = [
+                {"user_id": user_id, "category": c}
+                for user_id, subs in conn.execute(text("SELECT id, subscribed_categories FROM users"))
+                for c in dict.fromkeys(x.strip() for x in (subs or "").split(","))
+                if c
+            ]
+            if rows:
+                conn.execute(UserCategory.__table__.insert(), rows)
+                logger.info(f"数据库升级: 回填 user_categories {len(rows)} 条")
+
+    with bind.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            existing = {c["name"] for c in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                col_type = column.type.compile(dialect=bind.dialect)
+                conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {col_type}'))
+                logger.info(f"数据库升级: {table.name} 新增列 {column.name}")
+
+                if table.name == "papers" and column.name == "completed_at":
+                    # 历史论文的完成时间未知，用入库时间近似，避免被当作新论文重新推送
+                    conn.execute(text(
+                        "UPDATE papers SET completed_at = created_at "
+                        "WHERE batch_status = 'completed' AND completed_at IS NULL"
+                    ))
+                elif table.name == "papers" and column.name == "analyzed_at":
+                    conn.execute(text("UPDATE papers SET analyzed_at = completed_at WHERE batch_status = 'completed'"))
+                elif table.name == "papers" and column.name == "updated_at":
+                    conn.execute(text("UPDATE papers SET updated_at = COALESCE(analyzed_at, completed_at, created_at)"))
+                elif table.name == "papers" and column.name == "analysis_prompt_version":
+                    # 引入版本记录之前的分析都来自第一版提示词与 qwen-plus
+                    conn.execute(text("UPDATE papers SET analysis_prompt_version = 'v1' WHERE batch_status = 'completed'"))
+                elif table.name == "papers" and column.name == "analysis_model":
+                    conn.execute(text("UPDATE papers SET analysis_model = 'qwen-plus' WHERE batch_status = 'completed'"))
+                elif table.name == "papers" and column.name == "analysis_tier":
+                    # 引入初筛之前的论文都做过深度分析
+                    conn.execute(text("UPDATE papers SET analysis_tier = 'full' WHERE batch_status = 'completed'"))
+                elif table.name == "papers" and column.name == "extraction_version":
+                    conn.execute(text("UPDATE papers SET extraction_version = 'v1' WHERE full_text_tmp IS NOT NULL"))
+
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind, checkfirst=True)
+
+
+def migrate():
+    """显式的建表/升级步骤：部署或每日任务开始前运行 `python database.py`"""
+    engine = get_db_engine()
+    existing_tables = set(inspect(engine).get_table_names())
+    upgrade_schema(engine)
+
+    # 检索表 (FTS5 虚表 / tsvector + GIN) 不在 ORM 元数据里，随迁移一起创建，查询路径不再执行 DDL
+    from search import ensure_search_index
+    with engine.begin() as conn:
+        ensure_search_index(conn)
+
+    if 'paper_scores' not in existing_tables and 'papers' in existing_tables:
+        # 首次创建热度分表：按已有的收藏与评论回填 (计分规则在 services.py)
+        from services import rebuild_paper_scores
+        rebuild_paper_scores()
+    logger.info("Database & Models initialized.")
+
+
+Session = _LazySessionmaker()
+
+
+if __name__ == "__main__":
+    migrate()
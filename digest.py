@@ -0,0 +1,89 @@
+"""
+每日推送邮件的 HTML 渲染
+论文卡片、领域标题在所有用户之间完全相同，不同用户只是选中的论文不同：
+- 每篇论文卡片、每个领域标题在一次推送中只渲染一次
+- 领域区块按 (领域, 论文 ID 序列) 缓存，订阅相同、排序结果相同的用户直接复用
+- 整封邮件按用户的完整选择缓存，选择完全相同的用户共享同一份正文
+"""
+
+_HEADER = """
+            <div style='background:#fdfcf0; padding:20px; font-family:serif;'>
+                <h1 style='text-align:center; color:#1a1a1a; border-bottom:2px solid #D4A373; padding-bottom:15px;'>
+                    ArxivMind 每日精选
+                </h1>
+                <p style='text-align:center; color:#666; font-size:14px;'>今天为您精选了以下论文</p>
+            """
+
+_FOOTER = """
+                <div style='text-align:center; margin-top:40px; border-top:1px solid #ddd; padding-top:20px;'>
+                    <p style='color:#999; font-size:12px;'>ArxivMind AI Daily</p>
+                </div>
+            </div>
+            """
+
+
+def render_category_header(category: str) -> str:
+    return f"""
+                <div style='margin-top: 30px;'>
+                    <h2 style='color:#D4A373; font-size:18px; border-bottom:1px dashed #D4A373; padding-bottom:5px; margin-bottom:15px;'>
+                        📂 {category}
+                    </h2>
+                """
+
+
+def render_paper_card(paper) -> str:
+    # 处理标题显示：优先中文，其次英文
+    display_title = paper.chinese_title if paper.chinese_title else paper.title
+    subtitle = paper.title if paper.chinese_title else ""
+
+    card = f"""
+                    <div style='padding: 15px; margin: 15px 0; background: rgba(255,255,255,0.8); border-radius: 8px; box-shadow: 0 2px 4px rgba(0,0,0,0.05);'>
+                        <h3 style='margin:0 0 5px 0; color:#1a1a1a; font-size: 16px;'>{display_title}</h3>
+                        """
+    if subtitle:
+        card += f"<p style='margin:0 0 10px 0; color:#888; font-size:12px; font-style:italic;'>{subtitle}</p>"
+
+    card += f"""
+                        <p style='color:#333; line-height:1.6; font-size:14px; margin-bottom:10px;'>{paper.popular_science}</p>
+                        <div style='text-align:right;'>
+                            <a href='{paper.url}' style='color:#fff; background:#D4A373; text-decoration:none; padding:4px 12px; border-radius:4px; font-size:12px;'>阅读原文 →</a>
+                        </div>
+                    </div>
+                    """
+    return card
+
+
+class DigestRenderer:
+    """单次推送内有效的片段缓存 (论文内容在一次推送过程中不会变化)"""
+
+    def __init__(self, papers_by_id: dict):
+        self.papers_by_id = papers_by_id
+        self._cards = {}
+        self._headers = {}
+        self._sections = {}
+        self._bodies = {}
+
+    def card(self, paper_id: int) -> str:
+        if paper_id not in self._cards:
+            self._cards[paper_id] = render_paper_card(self.papers_by_id[paper_id])
+        return self._cards[paper_id]
+
+    def section(self, category: str, paper_ids: tuple) -> str:
+        key = (category, paper_ids)
+        if key not in self._sections:
+            if category not in self._headers:
+                self._headers[category] = render_category_header(category)
+            self._sections[key] = (
+                self._headers[category] + "".join(self.card(pid) for pid in paper_ids) + "</div>"
+            )
+        return self._sections[key]
+
+    def render(self, selection: dict) -> str:
+        """selection: {领域: [paper_id, ...]} (保持领域顺序)，返回整封邮件 HTML"""
+        key = tuple((cat, tuple(pids)) for cat, pids in selection.items() if pids)
+        if key not in self._bodies:
+            self._bodies[key] = _HEADER + "".join(self.section(cat, pids) for cat, pids in key) + _FOOTER
+        return self._bodies[key]
+
+    def stats(self) -> dict:
+        return {"cards": len(self._cards), "sections": len(self._sections), "bodies": len(self._bodies)}
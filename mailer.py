@@ -0,0 +1,323 @@
+"""
+邮件投递 (发件箱模式)
+- 推送构建阶段只把邮件写入 email_outbox (正文按哈希存入 email_bodies)，不直接调用发送接口
+- deliver_outbox() 领取待发邮件，按批次交给线程池调用 Resend 批量发送接口 (单次最多 100 封)
+- 全局令牌桶限制请求速率 (MAILER_RATE_LIMIT 次/秒)，可重试错误按指数退避重新排队，同一次投递中等到重试时间再发
+- 每封邮件独立记录状态；进程中途退出后再次运行即可从断点继续
+本地测试可设置 RESEND_API_URL 指向一个模拟服务。
+"""
+import hashlib
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+import resend
+from sqlalchemy import func
+
+import metrics
+from database import Session, EmailBody, EmailOutbox, logger, get_utc_now
+
+MAIL_FROM = os.getenv("MAIL_FROM", "ArxivMind <onboarding@resend.dev>")
+MAILER_WORKERS = int(os.getenv("MAILER_WORKERS", "4"))
+MAILER_BATCH_SIZE = min(int(os.getenv("MAILER_BATCH_SIZE", "100")), 100)
+# Resend 默认每秒 2 次请求
+MAILER_RATE_LIMIT = float(os.getenv("MAILER_RATE_LIMIT", "2"))
+MAILER_MAX_ATTEMPTS = int(os.getenv("MAILER_MAX_ATTEMPTS", "5"))
+MAILER_BACKOFF_SECONDS = float(os.getenv("MAILER_BACKOFF_SECONDS", "30"))
+# 一次投递最多运行多久 (秒) 还会等待退避重试；超过后返回，剩余的待重试邮件留给下次投递
+MAILER_RETRY_DEADLINE_SECONDS = float(os.getenv("MAILER_RETRY_DEADLINE_SECONDS", "60"))
+# 领取后超过这个时间仍处于 sending 状态，视为投递进程已崩溃
+MAILER_LEASE_SECONDS = int(os.getenv("MAILER_LEASE_SECONDS", "600"))
+
+if os.getenv("RESEND_API_URL"):
+    resend.api_url = os.getenv("RESEND_API_URL")
+
+
+def _now():
+    # 与其他时间列保持一致：北京时间，去掉时区后存储
+    return get_utc_now().replace(tzinfo=None)
+
+
+class TokenBucket:
+    """线程安全的令牌桶：rate 个/秒，最多积攒 capacity 个"""
+
+    def __init__(self, rate: float, capacity: float = None):
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+def _is_retryable(error: Exception) -> bool:
+    """限流、服务端错误与网络错误可以重试；参数/鉴权错误重试也没用"""
+    if isinstance(error, (resend.exceptions.RateLimitError, resend.exceptions.ApplicationError)):
+        return True
+    return not isinstance(error, resend.exceptions.ResendError)
+
+
+def enqueue_emails(session, messages: list[dict]) -> int:
+    """
+    批量写入发件箱 (不提交，由调用方与其他状态一起提交)
+    messages: [{"user_id", "to_email", "subject", "html", "idempotency_key"}, ...]
+    正文按哈希去重；idempotency_key 已存在的邮件跳过。返回实际入队数量
+    """
+    if not messages:
+        return 0
+
+    bodies = {}
+    for m in messages:
+        m["body_hash"] = hashlib.sha256(m["html"].encode("utf-8")).hexdigest()
+        bodies.setdefault(m["body_hash"], m["html"])
+    known = {h for (h,) in session.query(EmailBody.body_hash).filter(EmailBody.body_hash.in_(list(bodies)))}
+    new_bodies = [{"body_hash": h, "html": html, "created_at": get_utc_now()}
+                  for h, html in bodies.items() if h not in known]
+    if new_bodies:
+        session.execute(EmailBody.__table__.insert(), new_bodies)
+
+    keys = [m["idempotency_key"] for m in messages]
+    existing = {k for (k,) in session.query(EmailOutbox.idempotency_key)
+                .filter(EmailOutbox.idempotency_key.in_(keys))}
+    now = _now()
+    rows = [{
+        "user_id": m["user_id"],
+        "to_email": m["to_email"],
+        "subject": m["subject"],
+        "body_hash": m["body_hash"],
+        "idempotency_key": m["idempotency_key"],
+        "status": "pending",
+        "attempts": 0,
+        "next_attempt_at": now,
+        "created_at": get_utc_now(),
+    } for m in messages if m["idempotency_key"] not in existing]
+    if rows:
+        session.execute(EmailOutbox.__table__.insert(), rows)
+    return len(rows)
+
+
+def enqueue_email(session, user_id: int, to_email: str, subject: str, html: str, idempotency_key: str) -> bool:
+    """写入单封邮件 (不提交)，idempotency_key 已存在时返回 False"""
+    return enqueue_emails(session, [{
+        "user_id": user_id,
+        "to_email": to_email,
+        "subject": subject,
+        "html": html,
+        "idempotency_key": idempotency_key,
+    }]) == 1
+
+
+def _recover_stale(session):
+    """租约过期的 sending 邮件重新进入待发状态 (保留 batch_key，按原批次重发)"""
+    expired = _now() - timedelta(seconds=MAILER_LEASE_SECONDS)
+    count = session.query(EmailOutbox).filter(
+        EmailOutbox.status == "sending",
+        EmailOutbox.claimed_at < expired
+    ).update({EmailOutbox.status: "pending"}, synchronize_session=False)
+    session.commit()
+    if count:
+        logger.warning(f"发件箱: {count} 封邮件租约过期，重新排队")
+
+
+def _claim_batches(session, limit: int) -> list[tuple[str, list[int]]]:
+    """
+    领取最多 limit 封到期的待发邮件，返回 [(batch_key, [outbox_id, ...]), ...]
+    崩溃遗留的批次 (已有 batch_key) 原样保留，其余按 id 顺序切成新批次
+    """
+    now = _now()
+    rows = session.query(EmailOutbox.id, EmailOutbox.batch_key).filter(
+        EmailOutbox.status == "pending",
+        EmailOutbox.next_attempt_at <= now
+    ).order_by(EmailOutbox.id).limit(limit).all()
+
+    batches, fresh = {}, []
+    for outbox_id, batch_key in rows:
+        if batch_key:
+            batches.setdefault(batch_key, []).append(outbox_id)
+        else:
+            fresh.append(outbox_id)
+
+    for i in range(0, len(fresh), MAILER_BATCH_SIZE):
+        ids = fresh[i:i + MAILER_BATCH_SIZE]
+        batch_key = "batch-" + hashlib.sha256(",".join(map(str, ids)).encode()).hexdigest()[:32]
+        batches[batch_key] = ids
+
+    for batch_key, ids in batches.items():
+        # 条件更新：只有仍处于 pending 的行会被本进程领取，避免多个投递进程重复发送
+        session.query(EmailOutbox).filter(
+            EmailOutbox.id.in_(ids), EmailOutbox.status == "pending"
+        ).update({
+            EmailOutbox.status: "sending",
+            EmailOutbox.batch_key: batch_key,
+            EmailOutbox.claimed_at: now,
+        }, synchronize_session=False)
+    session.commit()
+
+    claimed = []
+    for batch_key in batches:
+        ids = [i for (i,) in session.query(EmailOutbox.id).filter(
+            EmailOutbox.batch_key == batch_key, EmailOutbox.status == "sending"
+        ).order_by(EmailOutbox.id)]
+        if ids:
+            claimed.append((batch_key, ids))
+    return claimed
+
+
+def _record_failure(rows: list, error: Exception, retryable: bool) -> int:
+    """发送失败：可重试且未超过次数的邮件按指数退避重新排队，其余标记为最终失败，返回最终失败数"""
+    now = _now()
+    failed = 0
+    for r in rows:
+        r.attempts = (r.attempts or 0) + 1
+        r.last_error = str(error)[:1000]
+        r.batch_key = None
+        if retryable and r.attempts < MAILER_MAX_ATTEMPTS:
+            r.status = "pending"
+            r.next_attempt_at = now + timedelta(seconds=MAILER_BACKOFF_SECONDS * 2 ** (r.attempts - 1))
+        else:
+            r.status = "failed"
+            failed += 1
+    metrics.counter("emails_total", len(rows) - failed, status="retry")
+    metrics.counter("emails_total", failed, status="failed")
+    return failed
+
+
+def _record_sent(rows: list, provider_ids: list):
+    now = _now()
+    for r, provider_id in zip(rows, provider_ids):
+        r.attempts = (r.attempts or 0) + 1
+        r.status = "sent"
+        r.sent_at = now
+        r.last_error = None
+        r.provider_id = provider_id
+    metrics.counter("emails_total", len(rows), status="sent")
+
+
+def _send_one_by_one(rows: list, params: list[dict], bucket: TokenBucket) -> tuple[int, int]:
+    """批次因参数错误被整体拒绝 (例如其中一个地址无效) 时逐封重发，只让自身出错的邮件失败"""
+    sent = failed = 0
+    for r, param in zip(rows, params):
+        bucket.acquire()
+        try:
+            with metrics.span("email_send"):
+                response = resend.Emails.send(param, {"idempotency_key": r.idempotency_key})
+        except Exception as e:
+            failed += _record_failure([r], e, _is_retryable(e))
+            logger.error(f"单封发送失败 ({r.to_email}): {e}")
+            continue
+        _record_sent([r], [response.get("id") if isinstance(response, dict) else None])
+        sent += 1
+    return sent, failed
+
+
+def _send_batch(batch_key: str, ids: list[int], bucket: TokenBucket) -> tuple[int, int]:
+    """发送一个批次并更新每封邮件的状态，返回 (成功数, 失败数)"""
+    session = Session()
+    try:
+        rows = session.query(EmailOutbox).filter(EmailOutbox.id.in_(ids)).order_by(EmailOutbox.id).all()
+        bodies = {b.body_hash: b.html for b in session.query(EmailBody).filter(
+            EmailBody.body_hash.in_({r.body_hash for r in rows}))}
+
+        params = [{
+            "from": MAIL_FROM,
+            "to": [r.to_email],
+            "subject": r.subject,
+            "html": bodies[r.body_hash],
+        } for r in rows]
+
+        bucket.acquire()
+        try:
+            with metrics.span("email_batch_send"):
+                response = resend.Batch.send(params, {"idempotency_key": batch_key})
+        except Exception as e:
+            retryable = _is_retryable(e)
+            if not retryable and len(rows) > 1:
+                logger.warning(f"批量发送被拒绝 ({len(rows)} 封)，改为逐封发送: {e}")
+                sent, failed = _send_one_by_one(rows, params, bucket)
+            else:
+                sent, failed = 0, _record_failure(rows, e, retryable)
+                logger.error(f"批量发送失败 ({len(rows)} 封, {'将重试' if retryable else '不可重试'}): {e}")
+            session.commit()
+            return sent, failed
+
+        data = response.get("data", []) if isinstance(response, dict) else []
+        _record_sent(rows, [data[i].get("id") if i < len(data) else None for i in range(len(rows))])
+        session.commit()
+        return len(rows), 0
+    finally:
+        session.close()
+
+
+def deliver_outbox(max_messages: int = None, workers: int = MAILER_WORKERS,
+                   rate_limit: float = MAILER_RATE_LIMIT, retry_deadline: float = None) -> dict:
+    """
+    投递发件箱中的邮件，直到没有待发邮件 (或达到 max_messages)；
+    退避中的邮件等到重试时间再发，但重试时间晚于 retry_deadline (默认 MAILER_RETRY_DEADLINE_SECONDS，
+    从开始投递算起的秒数) 时不再等待，留给下次投递
+    返回 {"sent": 成功数, "failed": 本次判定为最终失败的数量, "seconds": 耗时}
+    """
+    if not resend.api_key:
+        logger.warning("未配置 RESEND_API_KEY，发件箱暂不投递")
+        return {"sent": 0, "failed": 0, "seconds": 0.0}
+
+    t0 = time.perf_counter()
+    deadline = t0 + (MAILER_RETRY_DEADLINE_SECONDS if retry_deadline is None else retry_deadline)
+    bucket = TokenBucket(rate_limit)
+    sent = failed = 0
+    session = Session()
+    try:
+        _recover_stale(session)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            while max_messages is None or sent + failed < max_messages:
+                # 每轮领取的量足够所有线程各发一批，未发完的不会被其他轮次重复领取
+                limit = workers * MAILER_BATCH_SIZE
+                if max_messages is not None:
+                    limit = min(limit, max_messages - sent - failed)
+                batches = _claim_batches(session, limit)
+                if not batches:
+                    # 还有等待退避重试的邮件时睡到最早的重试时间 (重试次数受 MAILER_MAX_ATTEMPTS 限制)
+                    next_attempt = session.query(func.min(EmailOutbox.next_attempt_at)) \
+                        .filter(EmailOutbox.status == "pending").scalar()
+                    if next_attempt is None:
+                        break
+                    wait = max(0.0, (next_attempt - _now()).total_seconds())
+                    if time.perf_counter() + wait > deadline:
+                        logger.info(f"发件箱: 仍有邮件等待退避重试 (最早 {next_attempt:%H:%M:%S})，留待下次投递")
+                        break
+                    time.sleep(wait)
+                    continue
+                for ok, bad in pool.map(lambda b: _send_batch(b[0], b[1], bucket), batches):
+                    sent += ok
+                    failed += bad
+    finally:
+        session.close()
+
+    seconds = time.perf_counter() - t0
+    metrics.observe("deliver_outbox_seconds", seconds)
+    if sent:
+        metrics.gauge("email_throughput_per_second", round(sent / seconds, 2))
+    if sent or failed:
+        logger.info(f"发件箱投递完成: 成功 {sent} 封，失败 {failed} 封，耗时 {seconds:.1f}s")
+    return {"sent": sent, "failed": failed, "seconds": seconds}
+
+
+def outbox_status_counts() -> dict:
+    """各状态的邮件数量 (运维查看积压情况)"""
+    session = Session()
+    try:
+        return dict(session.query(EmailOutbox.status, func.count(EmailOutbox.id)).group_by(EmailOutbox.status).all())
+    finally:
+        session.close()
@@ -0,0 +1,223 @@
+"""
+结构化指标与链路追踪 (进程内，无外部依赖)
+- counter / gauge / observe (直方图) 按 名称 + 标签 聚合，线程安全
+- span 计时区间 (上下文管理器或装饰器)：耗时计入 <name>_seconds 直方图，异常计入 <name>_errors_total；
+  开启事件日志后每个 span 结束时追加一行 JSON (含 trace_id / span_id / parent_id)
+- export_prometheus() 写 Prometheus 文本格式 (可交给 node_exporter textfile collector)
+- write_run_report() 写本次运行的汇总 JSON，供 CI 归档
+"""
+import contextvars
+import functools
+import json
+import math
+import os
+import threading
+import time
+import uuid
+
+PREFIX = "arxivmind_"
+# 直方图桶 (秒)：覆盖数据库查询到大模型长请求
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+# 每个直方图最多保留的原始样本数 (用于汇总报告里的分位数)
+MAX_SAMPLES = 10000
+
+_lock = threading.Lock()
+_counters = {}
+_gauges = {}
+_histograms = {}
+_current_span = contextvars.ContextVar("metrics_span", default=None)
+_event_log = os.getenv("METRICS_JSONL")
+_event_lock = threading.Lock()
+
+
+def _key(name: str, labels: dict) -> tuple:
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+class _Histogram:
+    __slots__ = ("buckets", "count", "sum", "max", "samples")
+
+    def __init__(self):
+        self.buckets = [0] * len(BUCKETS)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self.samples = []
+
+    def observe(self, value: float):
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+        for i, bound in enumerate(BUCKETS):
+            if value <= bound:
+                self.buckets[i] += 1
+        if len(self.samples) < MAX_SAMPLES:
+            self.samples.append(value)
+
+    def quantile(self, q: float) -> float:
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, math.ceil(q * len(ordered)) - 1)]
+
+
+def counter(name: str, value: float = 1, **labels):
+    """累加计数器"""
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def gauge(name: str, value: float, **labels):
+    """设置瞬时值"""
+    with _lock:
+        _gauges[_key(name, labels)] = value
+
+
+def observe(name: str, value: float, **labels):
+    """记录一次观测值到直方图"""
+    key = _key(name, labels)
+    with _lock:
+        if key not in _histograms:
+            _histograms[key] = _Histogram()
+        _histograms[key].observe(value)
+
+
+def set_event_log(path: str | None):
+    """设置 span 事件日志 (JSON Lines) 的路径，None 表示关闭"""
+    global _event_log
+    _event_log = path
+    if path:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+
+def _emit(event: dict):
+    if not _event_log:
+        return
+    line = json.dumps(event, ensure_ascii=False, default=str)
+    with _event_lock:
+        with open(_event_log, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+
+class span:
+    """
+    计时区间：with span("fetch_paper", source="arxiv"): ... 或 @span("analyze_paper")
+    嵌套的 span 自动记录父子关系 (同一线程/上下文内)
+    """
+
+    def __init__(self, name: str, **labels):
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.parent = _current_span.get()
+        self.trace_id = self.parent.trace_id if self.parent else uuid.uuid4().hex[:16]
+        self.span_id = uuid.uuid4().hex[:16]
+        self.started = time.time()
+        self._t0 = time.perf_counter()
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        seconds = time.perf_counter() - self._t0
+        _current_span.reset(self._token)
+        observe(f"{self.name}_seconds", seconds, **self.labels)
+        if exc_type:
+            counter(f"{self.name}_errors_total", **self.labels)
+        _emit({
+            "type": "span",
+            "name": self.name,
+            "labels": self.labels,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent.span_id if self.parent else None,
+            "start": self.started,
+            "seconds": round(seconds, 6),
+            "status": "error" if exc_type else "ok",
+            "error": str(exc)[:500] if exc else None,
+        })
+        return False
+
+    def __call__(self, func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(self.name, **self.labels):
+                return func(*args, **kwargs)
+        return wrapper
+
+
+def reset():
+    """清空全部指标 (每次流水线运行开始时调用)"""
+    with _lock:
+        _counters.clear()
+        _gauges.clear()
+        _histograms.clear()
+
+
+def _labels_text(labels: tuple, extra: tuple = ()) -> str:
+    pairs = [f'{k}="{v}"' for k, v in labels + extra]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def export_prometheus(path: str):
+    """
+    以 Prometheus 文本格式写出全部指标 (先写临时文件再替换，避免采集到半截文件)
+    每个指标族先写一行 # TYPE，直方图才会被识别为 histogram
+    """
+    lines = []
+    typed = set()
+
+    def declare(name: str, kind: str):
+        if name not in typed:
+            typed.add(name)
+            lines.append(f"# TYPE {PREFIX}{name} {kind}")
+
+    with _lock:
+        for (name, labels), value in sorted(_counters.items()):
+            declare(name, "counter")
+            lines.append(f"{PREFIX}{name}{_labels_text(labels)} {value}")
+        for (name, labels), value in sorted(_gauges.items()):
+            declare(name, "gauge")
+            lines.append(f"{PREFIX}{name}{_labels_text(labels)} {value}")
+        for (name, labels), h in sorted(_histograms.items()):
+            declare(name, "histogram")
+            for bound, n in zip(BUCKETS, h.buckets):
+                lines.append(f"{PREFIX}{name}_bucket{_labels_text(labels, (('le', bound),))} {n}")
+            lines.append(f"{PREFIX}{name}_bucket{_labels_text(labels, (('le', '+Inf'),))} {h.count}")
+            lines.append(f"{PREFIX}{name}_sum{_labels_text(labels)} {h.sum}")
+            lines.append(f"{PREFIX}{name}_count{_labels_text(labels)} {h.count}")
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+    os.replace(tmp, path)
+
+
+def snapshot() -> dict:
+    """当前全部指标的汇总 (直方图给出次数、总和、均值、P50/P95 与最大值)"""
+    with _lock:
+        return {
+            "counters": [{"name": n, "labels": dict(l), "value": v} for (n, l), v in sorted(_counters.items())],
+            "gauges": [{"name": n, "labels": dict(l), "value": v} for (n, l), v in sorted(_gauges.items())],
+            "histograms": [{
+                "name": n,
+                "labels": dict(l),
+                "count": h.count,
+                "sum": round(h.sum, 4),
+                "mean": round(h.sum / h.count, 4) if h.count else 0.0,
+                "p50": round(h.quantile(0.5), 4),
+                "p95": round(h.quantile(0.95), 4),
+                "max": round(h.max, 4),
+            } for (n, l), h in sorted(_histograms.items())],
+        }
+
+
+def write_run_report(path: str, **extra) -> dict:
+    """写出本次运行的汇总报告 (JSON)，extra 中的字段原样并入"""
+    report = {**extra, **snapshot()}
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2, default=str)
+    return report
@@ -0,0 +1,387 @@
+"""
+每日流水线编排
+- 抓取 → 分析 → 向量化 流式衔接：抓取每入库一篇论文就放入分析队列，分析线程池边抓边分析，
+  分析完成的论文再流入向量化队列，按小批追加进相似度索引
+- 其余步骤按依赖关系执行，互不依赖的步骤并行 (例如推送与每日汇总)；SQLite 上大批量写库的步骤 (writes=True) 逐个执行
+- 每个步骤的状态记录在 pipeline_checkpoints 表 (按运行批次，默认当天日期)：同一批次重跑时跳过已完成的步骤；
+  步骤内部本身幂等 (已入库的论文跳过、只分析 pending 论文、推送按水位线与幂等键)
+- 某个步骤失败只阻断依赖它的步骤，其余照常执行
+- 分析为两级：便宜模型初筛后只对相关度达标的论文做深度分析，被收藏的初筛论文由 escalate 步骤升级；
+  汇总中给出分析吞吐 (篇/小时) 与大模型费用，并对比全部用 qwen-plus 深度分析的基线费用
+- 结束时输出每个步骤的耗时、处理数量、SQL 查询数与队列深度；指标与 span 事件写入 METRICS_DIR/<运行批次>/
+  (metrics.prom、events.jsonl、summary.json)，CI 归档该目录
+- 设置 PROFILE=stage (或 stage:analyze 等) 时对步骤做性能剖析，结果写入 PROFILE_DIR (见 profiling.py)
+用法: python pipeline.py [--run-key 2026-01-01] [--force]
+"""
+import argparse
+import contextvars
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from dataclasses import dataclass
+from typing import Callable
+
+import metrics
+import profiling
+import query_stats
+from database import Session, Paper, PipelineCheckpoint, logger, get_utc_now, get_db_engine
+
+# 向量化阶段每累计多少篇新完成的论文追加一次索引
+EMBED_BATCH = 20
+METRICS_DIR = os.getenv("METRICS_DIR", "metrics")
+
+
+class StageQueue:
+    """步骤之间的流式队列：上游结束 (成功、失败或跳过) 后 close()，下游迭代到关闭为止；记录队列深度"""
+    _CLOSED = object()
+
+    def __init__(self, name: str):
+        self.name = name
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._closed = False
+        self.items = 0
+        self.max_depth = 0
+        self._depth_sum = 0
+        self._samples = 0
+
+    def _sample(self):
+        depth = self._queue.qsize()
+        with self._lock:
+            self.max_depth = max(self.max_depth, depth)
+            self._depth_sum += depth
+            self._samples += 1
+
+    def put(self, item):
+        self._queue.put(item)
+        with self._lock:
+            self.items += 1
+        self._sample()
+
+    def close(self):
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        self._queue.put(self._CLOSED)
+
+    def __iter__(self):
+        while True:
+            item = self._queue.get()
+            if item is self._CLOSED:
+                # 允许多次迭代：把结束标记放回去
+                self._queue.put(self._CLOSED)
+                return
+            self._sample()
+            yield item
+
+    def stats(self) -> dict:
+        return {
+            "items": self.items,
+            "max_depth": self.max_depth,
+            "mean_depth": round(self._depth_sum / self._samples, 2) if self._samples else 0.0,
+        }
+
+
+@dataclass
+class Stage:
+    """
+    流水线步骤
+    func 返回处理数量；after 为必须先成功完成的步骤；
+    upstream 为通过队列流式供数的步骤 (与本步骤同时运行)；output 为本步骤写入的队列；
+    writes=True 表示步骤会大批量写库，SQLite 上这类步骤逐个执行 (SQLite 同一时刻只允许一个写事务)
+    """
+    name: str
+    func: Callable[[], int]
+    after: tuple = ()
+    upstream: tuple = ()
+    output: StageQueue = None
+    writes: bool = False
+
+
+class PipelineRunner:
+    """按依赖关系调度步骤 (stages 需按拓扑顺序给出)，并把每个步骤的结果写入检查点表"""
+
+    def __init__(self, stages: list[Stage], run_key: str = None, force: bool = False, serialize_writers: bool = None):
+        self.stages = stages
+        self.run_key = run_key or get_utc_now().date().isoformat()
+        self.force = force
+        # 默认只在 SQLite 上串行化写库步骤 (Postgres 支持并发写)
+        if serialize_writers is None:
+            serialize_writers = get_db_engine().dialect.name == "sqlite"
+        self._writer_lock = threading.Lock() if serialize_writers else None
+
+    def _checkpoint(self, stage: str, **values):
+        session = Session()
+        try:
+            row = session.get(PipelineCheckpoint, (self.run_key, stage))
+            if row is None:
+                row = PipelineCheckpoint(run_key=self.run_key, stage=stage)
+                session.add(row)
+            for key, value in values.items():
+                setattr(row, key, value)
+            session.commit()
+        except Exception as e:
+            # 检查点写入失败不影响流水线本身
+            session.rollback()
+            logger.warning(f"流水线检查点写入失败 ({stage}): {e}")
+        finally:
+            session.close()
+
+    def _completed_stages(self) -> set[str]:
+        if self.force:
+            return set()
+        session = Session()
+        try:
+            return {stage for (stage,) in session.query(PipelineCheckpoint.stage).filter(
+                PipelineCheckpoint.run_key == self.run_key, PipelineCheckpoint.status == "done")}
+        finally:
+            session.close()
+
+    def _run_stage(self, stage: Stage) -> dict:
+        if stage.writes and self._writer_lock:
+            with self._writer_lock:
+                return self._execute_stage(stage)
+        return self._execute_stage(stage)
+
+    def _execute_stage(self, stage: Stage) -> dict:
+        logger.info(f"[流水线] 步骤开始: {stage.name}")
+        self._checkpoint(stage.name, status="running", started_at=get_utc_now(), finished_at=None, error=None)
+        t0 = time.perf_counter()
+        items, error, db = 0, None, None
+        try:
+            with metrics.span("pipeline_stage", stage=stage.name), query_stats.track(f"stage:{stage.name}") as db, \
+                    profiling.profile(f"stage:{stage.name}"):
+                items = stage.func() or 0
+        except Exception as e:
+            error = str(e)
+            logger.error(f"[流水线] 步骤失败: {stage.name}: {e}")
+        finally:
+            if stage.output:
+                stage.output.close()
+
+        result = {
+            "status": "failed" if error else "done",
+            "seconds": round(time.perf_counter() - t0, 2),
+            "items": items,
+            "queries": db.queries if db else 0,
+        }
+        metrics.counter("pipeline_stage_items_total", items, stage=stage.name)
+        if stage.output:
+            result["queue"] = stage.output.stats()
+            metrics.gauge("pipeline_queue_max_depth", result["queue"]["max_depth"], queue=stage.output.name)
+            metrics.gauge("pipeline_queue_mean_depth", result["queue"]["mean_depth"], queue=stage.output.name)
+        self._checkpoint(stage.name, status=result["status"], items=items, seconds=result["seconds"],
+                         stats=result.get("queue"), error=error, finished_at=get_utc_now())
+        return result
+
+    def run(self) -> dict:
+        """执行全部步骤，返回 {步骤: {status, seconds, items[, queue]}}
+        status: done / failed / resumed (本批次此前已完成) / blocked (依赖的步骤失败)"""
+        completed = self._completed_stages()
+        results = {}
+
+        # 已完成的步骤直接跳过；但上游需要重跑时，流式下游也要重跑 (否则会漏掉上游新产出的数据)
+        for stage in self.stages:
+            if stage.name in completed and all(results.get(d, {}).get("status") == "resumed"
+                                               for d in stage.after + stage.upstream):
+                results[stage.name] = {"status": "resumed", "seconds": 0.0, "items": 0}
+                if stage.output:
+                    stage.output.close()
+
+        pending = [s for s in self.stages if s.name not in results]
+        with ThreadPoolExecutor(max_workers=max(1, len(pending))) as pool:
+            running = {}
+            while pending or running:
+                # 依赖失败的步骤标记为 blocked (可能连锁)，依赖全部满足的步骤提交执行
+                for stage in list(pending):
+                    deps = [results.get(d, {}).get("status") for d in stage.after]
+                    if any(s in ("failed", "blocked") for s in deps):
+                        logger.warning(f"[流水线] 依赖的步骤失败，跳过: {stage.name}")
+                        results[stage.name] = {"status": "blocked", "seconds": 0.0, "items": 0}
+                        if stage.output:
+                            stage.output.close()
+                        pending.remove(stage)
+                    elif all(s in ("done", "resumed") for s in deps):
+                        running[pool.submit(self._run_stage, stage)] = stage.name
+                        pending.remove(stage)
+
+                if not running:
+                    break
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    results[running.pop(future)] = future.result()
+
+        self._log_summary(results)
+        return results
+
+    def _log_summary(self, results: dict):
+        logger.info(f"[流水线] 运行批次 {self.run_key} 汇总:")
+        for stage in self.stages:
+            r = results.get(stage.name, {})
+            line = (f"  {stage.name:<10} {r.get('status', '-'):<8} {r.get('seconds', 0):>8.2f}s  "
+                    f"{r.get('items', 0):>6} 项  SQL {r.get('queries', 0):>6} 条")
+            if "queue" in r:
+                q = r["queue"]
+                line += f"  队列 {stage.output.name}: 最大深度 {q['max_depth']}，平均深度 {q['mean_depth']}"
+            logger.info(line)
+
+
+def daily_stages() -> list[Stage]:
+    """每日流水线的步骤定义"""
+    from cache import bump_version, PAPERS
+    from core_batch import iter_new_papers, load_analysis_task, analyze_and_store, MAX_WORKERS
+    from services import (
+        send_daily_emails,
+        backfill_paper_keywords,
+        backfill_search_index,
+        refresh_daily_rollups,
+        rebuild_paper_scores
+    )
+    from vector_index import build_similarity_index
+
+    analysis_queue = StageQueue("待分析")
+    embed_queue = StageQueue("待向量化")
+
+    def fetch():
+        count = 0
+        for paper_id in iter_new_papers():
+            analysis_queue.put(paper_id)
+            count += 1
+        return count
+
+    def analyze_one(paper_id: int) -> bool:
+        session = Session()
+        try:
+            paper = session.get(Paper, paper_id)
+            if paper is None or paper.batch_status != "pending":
+                return False
+            task = load_analysis_task(session, paper)
+        finally:
+            session.close()
+        if task and analyze_and_store(task):
+            embed_queue.put(paper_id)
+            return True
+        return False
+
+    def analyze():
+        # 先处理此前遗留的 pending 论文，再消费抓取步骤实时送来的新论文
+        session = Session()
+        try:
+            backlog = [pid for (pid,) in session.query(Paper.id).filter(Paper.batch_status == "pending")]
+        finally:
+            session.close()
+
+        seen, futures = set(), []
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+            for source in (backlog, analysis_queue):
+                for paper_id in source:
+                    if paper_id not in seen:
+                        seen.add(paper_id)
+                        # 复制上下文：工作线程里的查询、span 与性能剖析计入本步骤
+                        futures.append(executor.submit(contextvars.copy_context().run,
+                                                       profiling.bind(analyze_one), paper_id))
+        success = sum(f.result() for f in futures)
+        logger.info(f">>> 分析流程结束，成功: {success}/{len(seen)}")
+        if success:
+            bump_version(PAPERS)
+        return success
+
+    def embed():
+        count, batch = 0, 0
+        for _ in embed_queue:
+            batch += 1
+            if batch >= EMBED_BATCH:
+                count += build_similarity_index()
+                batch = 0
+        # 收尾：同时补上历史上尚未入索引的论文
+        count += build_similarity_index()
+        if count:
+            # 相似论文推荐按 PAPERS 版本缓存
+            bump_version(PAPERS)
+        return count
+
+    def escalate():
+        # 只做过初筛、之后被用户收藏的论文升级为深度分析
+        from reanalysis import run_queued
+        return run_queued(reason="favorited")
+
+    def backfill():
+        # 为历史论文补建关键词索引与全文检索索引 (已建立索引的论文会被跳过)
+        return backfill_paper_keywords() + backfill_search_index()
+
+    def digest():
+        return send_daily_emails()["queued"]
+
+    def rollups():
+        refresh_daily_rollups()
+        # 热度分压缩：统一按当前半衰期重算，顺带修正写路径上可能漏掉的更新
+        return rebuild_paper_scores()
+
+    return [
+        Stage("fetch", fetch, output=analysis_queue),
+        Stage("analyze", analyze, upstream=("fetch",), output=embed_queue),
+        Stage("embed", embed, upstream=("analyze",)),
+        Stage("escalate", escalate, after=("analyze",), writes=True),
+        Stage("backfill", backfill, after=("analyze",), writes=True),
+        # 分析失败时不推送旧数据；排序需要完整的候选集与向量，因此等待向量化结束
+        Stage("digest", digest, after=("analyze", "embed"), writes=True),
+        Stage("rollups", rollups, after=("analyze",), writes=True),
+    ]
+
+
+def _counter_total(snapshot: dict, name: str, **labels) -> float:
+    return sum(c["value"] for c in snapshot["counters"]
+               if c["name"] == name and all(c["labels"].get(k) == v for k, v in labels.items()))
+
+
+def analysis_report(results: dict) -> dict:
+    """本次运行的分析吞吐 (篇/小时) 与大模型费用，对比全部用 qwen-plus 深度分析的基线费用 (见 core_batch.py)"""
+    snapshot = metrics.snapshot()
+    analyze = results.get("analyze", {})
+    papers, seconds = analyze.get("items", 0), analyze.get("seconds", 0)
+    report = {
+        "papers": papers,
+        "papers_per_hour": round(papers / seconds * 3600, 1) if seconds else 0.0,
+        "full": int(_counter_total(snapshot, "papers_triaged_total", outcome="full")),
+        "triage_only": int(_counter_total(snapshot, "papers_triaged_total", outcome="skipped")),
+        "cost_yuan": round(_counter_total(snapshot, "llm_cost_yuan_total"), 4),
+        "baseline_cost_yuan": round(_counter_total(snapshot, "llm_baseline_cost_yuan_total"), 4),
+    }
+    metrics.gauge("analysis_papers_per_hour", report["papers_per_hour"])
+    logger.info(f"[流水线] 分析吞吐 {report['papers_per_hour']} 篇/小时 (深度 {report['full']}，仅初筛 {report['triage_only']})，"
+                f"大模型费用 ¥{report['cost_yuan']} (全量 qwen-plus 基线 ¥{report['baseline_cost_yuan']})")
+    return report
+
+
+def run_daily_pipeline(run_key: str = None, force: bool = False) -> dict:
+    """运行每日情报采集流水线，并写出本次运行的指标与汇总报告"""
+    logger.info("=" * 60)
+    logger.info(">>> 启动每日情报采集流水线 (流式版) <<<")
+    logger.info("=" * 60)
+    runner = PipelineRunner(daily_stages(), run_key=run_key, force=force)
+    out_dir = os.path.join(METRICS_DIR, runner.run_key)
+    metrics.reset()
+    metrics.set_event_log(os.path.join(out_dir, "events.jsonl"))
+
+    t0 = time.perf_counter()
+    results = runner.run()
+    seconds = round(time.perf_counter() - t0, 2)
+    analysis = analysis_report(results)
+
+    metrics.export_prometheus(os.path.join(out_dir, "metrics.prom"))
+    metrics.write_run_report(os.path.join(out_dir, "summary.json"), run_key=runner.run_key,
+                             finished_at=get_utc_now(), seconds=seconds, stages=results, analysis=analysis)
+    metrics.set_event_log(None)
+    logger.info(f">>> 每日流水线执行完毕 (耗时 {seconds}s，指标已写入 {out_dir}) <<<")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="每日流水线")
+    parser.add_argument("--run-key", help="运行批次 (默认当天日期)，同一批次重跑时跳过已完成的步骤")
+    parser.add_argument("--force", action="store_true", help="忽略检查点，全部步骤重新执行")
+    args = parser.parse_args()
+    run_daily_pipeline(args.run_key, args.force)
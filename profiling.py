@@ -0,0 +1,192 @@
+"""
+按需性能剖析 (环境变量开启，无需改代码)
+- PROFILE：要剖析的作用域前缀，逗号分隔，例如 "page" (全部页面渲染)、"stage:analyze,page:papers"；为空则关闭
+- PROFILE_MODE：sample (默认，定时采样调用栈，输出 .folded 折叠栈，可直接交给 flamegraph.pl / speedscope 生成火焰图)
+  或 cprofile (确定性剖析，输出 .pstats，可用 snakeviz 或 pstats 查看)
+- PROFILE_SAMPLE_RATE：被剖析的渲染/步骤所占比例 (0~1，默认 1)，生产环境可只抽样一小部分
+- PROFILE_INTERVAL_MS：采样间隔 (默认 5ms)；PROFILE_DIR：输出目录 (默认 profiles/)
+只剖析进入作用域的线程；作用域内提交到线程池的任务用 bind() 包装 (并以 contextvars.copy_context().run 提交) 后一并计入
+"""
+import contextvars
+import cProfile
+import functools
+import itertools
+import logging
+import os
+import pstats
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+logger = logging.getLogger("ArxivMind")
+
+PROFILE = [p.strip() for p in os.getenv("PROFILE", "").split(",") if p.strip()]
+PROFILE_MODE = os.getenv("PROFILE_MODE", "sample")
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "1"))
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+
+_active = contextvars.ContextVar("profiling_session", default=None)
+_seq = itertools.count(1)
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _stack(frame, skip: int = 0) -> list[str]:
+    """调用栈 (最外层在前)，去掉进入作用域之前的 skip 层"""
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    labels.reverse()
+    return labels[skip:]
+
+
+class _Session:
+    """一次剖析：sample 模式由后台线程定时采样已登记线程的调用栈，cprofile 模式每个线程各用一个 Profile 最后合并"""
+
+    def __init__(self, name: str, mode: str):
+        self.name = name
+        self.mode = mode
+        self.stacks = Counter()
+        self.samples = 0
+        self.profiles = []
+        self._threads = {}  # 线程 ID -> 需要去掉的外层栈深度
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._sampler = None
+        self._warned = False
+        self.path = None
+
+    def enter_thread(self, depth: int = 0):
+        """登记当前线程，返回 exit_thread 需要的句柄；cprofile 无法启用时返回 None"""
+        if self.mode == "cprofile":
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+            except ValueError as e:
+                # Python 3.12+ 同一时刻只允许一个 cProfile (并发场景请用 sample 模式)
+                if not self._warned:
+                    self._warned = True
+                    logger.warning(f"[性能剖析] {self.name}: cProfile 无法启用，该线程不计入 ({e})")
+                return None
+            return profile
+        ident = threading.get_ident()
+        with self._lock:
+            self._threads[ident] = depth
+        return ident
+
+    def exit_thread(self, handle):
+        if handle is None:
+            return
+        if self.mode == "cprofile":
+            handle.disable()
+            with self._lock:
+                self.profiles.append(handle)
+        else:
+            with self._lock:
+                self._threads.pop(handle, None)
+
+    def _sample_loop(self):
+        interval = PROFILE_INTERVAL_MS / 1000
+        while not self._stop.wait(interval):
+            frames = sys._current_frames()
+            with self._lock:
+                threads = list(self._threads.items())
+            for ident, depth in threads:
+                frame = frames.get(ident)
+                if frame is not None:
+                    stack = _stack(frame, depth)
+                    if stack:
+                        self.stacks[";".join(stack)] += 1
+            self.samples += 1
+
+    def start(self):
+        if self.mode != "cprofile":
+            self._sampler = threading.Thread(target=self._sample_loop, name=f"profiler-{self.name}", daemon=True)
+            self._sampler.start()
+
+    def stop(self):
+        if self._sampler:
+            self._stop.set()
+            self._sampler.join()
+
+    def save(self, seconds: float) -> str | None:
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        stem = os.path.join(PROFILE_DIR, f"{self.name.replace(':', '-')}-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{next(_seq)}")
+        if self.mode == "cprofile":
+            if not self.profiles:
+                return None
+            stats = pstats.Stats(self.profiles[0])
+            for profile in self.profiles[1:]:
+                stats.add(profile)
+            path = f"{stem}.pstats"
+            stats.dump_stats(path)
+            top = sorted(stats.stats.items(), key=lambda kv: kv[1][3], reverse=True)[:3]
+            hot = ", ".join(f"{func[2]} {v[3]:.2f}s" for func, v in top)
+        else:
+            path = f"{stem}.folded"
+            with open(path, "w", encoding="utf-8") as f:
+                for stack, count in self.stacks.most_common():
+                    f.write(f"{stack} {count}\n")
+            leaves = Counter()
+            for stack, count in self.stacks.items():
+                leaves[stack.rsplit(";", 1)[-1]] += count
+            hot = ", ".join(f"{leaf} {count}" for leaf, count in leaves.most_common(3))
+        logger.info(f"[性能剖析] {self.name} 耗时 {seconds:.2f}s → {path} (热点: {hot or '无'})")
+        self.path = path
+        return path
+
+
+def enabled(name: str) -> bool:
+    """作用域是否在 PROFILE 配置中 (按前缀匹配)"""
+    return any(name == p or name.startswith(p + ":") for p in PROFILE)
+
+
+@contextmanager
+def profile(name: str):
+    """剖析一个作用域 (页面渲染、流水线步骤)；未开启、未被抽中或已处于剖析中时不做任何事"""
+    if not enabled(name) or _active.get() is not None or random.random() >= PROFILE_SAMPLE_RATE:
+        yield None
+        return
+
+    session = _Session(name, PROFILE_MODE)
+    # 采样时去掉作用域外层的调用栈 (Streamlit 脚本运行器、流水线调度等)
+    depth = len(_stack(sys._getframe(2))) - 1
+    handle = session.enter_thread(depth)
+    token = _active.set(session)
+    session.start()
+    t0 = time.perf_counter()
+    try:
+        yield session
+    finally:
+        seconds = time.perf_counter() - t0
+        session.stop()
+        session.exit_thread(handle)
+        _active.reset(token)
+        try:
+            session.save(seconds)
+        except Exception as e:
+            logger.warning(f"[性能剖析] {name} 结果保存失败: {e}")
+
+
+def bind(func):
+    """包装线程池任务：提交时所在的作用域正在剖析，则任务所在线程一并计入"""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        session = _active.get()
+        if session is None:
+            return func(*args, **kwargs)
+        # 去掉线程池自身的调用栈，任务从 func 开始计
+        handle = session.enter_thread(len(_stack(sys._getframe())))
+        try:
+            return func(*args, **kwargs)
+        finally:
+            session.exit_thread(handle)
+    return wrapper
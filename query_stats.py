@@ -0,0 +1,162 @@
+"""
+SQL 查询统计 (挂在 database.get_db_engine() 创建的 engine 上)
+- track(name)：统计一个作用域 (一次页面渲染、一个流水线步骤) 内的查询次数、数据库耗时与重复语句指纹；
+  作用域可以嵌套，查询同时计入所有外层作用域
+- 同一语句指纹在一个作用域内执行次数达到 N_PLUS_ONE_THRESHOLD 时告警 (疑似 N+1 查询)
+- 单条查询超过 SLOW_QUERY_MS 时记录慢查询日志，SELECT 语句附带执行计划 (每个指纹只取一次计划)
+- query_budget(n)：作用域内查询超过 n 条时抛出 QueryBudgetExceeded，供测试守住查询数量
+作用域通过 contextvars 传递：线程池里执行的任务需要用 contextvars.copy_context().run 提交才会计入
+"""
+import contextvars
+import functools
+import logging
+import os
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+import metrics
+
+logger = logging.getLogger("ArxivMind")
+
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD", "10"))
+
+_scopes = contextvars.ContextVar("query_stats_scopes", default=())
+_explained = set()
+_explained_lock = threading.Lock()
+
+
+class QueryBudgetExceeded(AssertionError):
+    """作用域内的查询数量超出预算"""
+
+
+class QueryStats:
+    """一个作用域内的查询统计 (线程安全：同一作用域可能被多个工作线程共用)"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.queries = 0
+        self.seconds = 0.0
+        self.fingerprints = Counter()
+        self.slow = []
+        self._lock = threading.Lock()
+
+    def record(self, fp: str, seconds: float):
+        with self._lock:
+            self.queries += 1
+            self.seconds += seconds
+            self.fingerprints[fp] += 1
+
+    def repeated(self, threshold: int = None) -> list[tuple[str, int]]:
+        """执行次数达到阈值的语句指纹 (按次数倒序)"""
+        threshold = threshold or N_PLUS_ONE_THRESHOLD
+        with self._lock:
+            return [(fp, n) for fp, n in self.fingerprints.most_common() if n >= threshold]
+
+    def summary(self) -> dict:
+        return {
+            "queries": self.queries,
+            "db_ms": round(self.seconds * 1000, 1),
+            "distinct": len(self.fingerprints),
+            "repeated": self.repeated(),
+        }
+
+
+@functools.lru_cache(maxsize=2048)
+def fingerprint(statement: str) -> str:
+    """语句指纹：去掉字面量与参数占位符的差异，IN 列表与多行 VALUES 折叠为一项"""
+    s = re.sub(r"\s+", " ", statement).strip()
+    s = re.sub(r"'(?:[^']|'')*'", "?", s)
+    s = re.sub(r"%\(\w+\)s|%s|\$\d+", "?", s)
+    s = re.sub(r"\b\d+(?:\.\d+)?\b", "?", s)
+    s = re.sub(r"\bIN \(\s*\?(?:\s*,\s*\?)*\s*\)", "IN (...)", s, flags=re.IGNORECASE)
+    s = re.sub(r"(\(\?(?:, \?)*\))(?:, \1)+", r"\1", s)
+    return s
+
+
+def _explain(conn, statement: str, parameters) -> str:
+    """在同一连接上取执行计划 (直接用 DBAPI 游标，不再触发事件)"""
+    prefix = "EXPLAIN QUERY PLAN " if conn.dialect.name == "sqlite" else "EXPLAIN "
+    try:
+        cursor = conn.connection.cursor()
+        try:
+            cursor.execute(prefix + statement, parameters)
+            return "\n".join(" ".join(str(c) for c in row) for row in cursor.fetchall())
+        finally:
+            cursor.close()
+    except Exception as e:
+        return f"(执行计划获取失败: {e})"
+
+
+def _before_execute(conn, cursor, statement, parameters, context, executemany):
+    # 开始时间记在本条语句的执行上下文上：语句出错时随上下文一起丢弃，不会残留在连接池的连接里
+    if context is not None:
+        context._query_start = time.perf_counter()
+
+
+def _after_execute(conn, cursor, statement, parameters, context, executemany):
+    start = getattr(context, "_query_start", None)
+    if start is None:
+        return
+    seconds = time.perf_counter() - start
+    scopes = _scopes.get()
+    fp = fingerprint(statement) if scopes or seconds * 1000 >= SLOW_QUERY_MS else None
+    for stats in scopes:
+        stats.record(fp, seconds)
+
+    if seconds * 1000 < SLOW_QUERY_MS:
+        return
+    metrics.counter("db_slow_queries_total")
+    plan = None
+    if not executemany and statement.lstrip()[:6].upper() in ("SELECT", "WITH S", "WITH R"):
+        with _explained_lock:
+            first_time = fp not in _explained
+            _explained.add(fp)
+        if first_time:
+            plan = _explain(conn, statement, parameters)
+    entry = {"ms": round(seconds * 1000, 1), "statement": fp, "plan": plan}
+    for stats in scopes:
+        with stats._lock:
+            stats.slow.append(entry)
+    logger.warning(f"[SQL] 慢查询 {entry['ms']}ms: {fp[:500]}" + (f"\n执行计划:\n{plan}" if plan else ""))
+
+
+def install(engine):
+    """在 engine 上注册查询统计钩子 (重复调用无副作用)"""
+    if not event.contains(engine, "before_cursor_execute", _before_execute):
+        event.listen(engine, "before_cursor_execute", _before_execute)
+        event.listen(engine, "after_cursor_execute", _after_execute)
+
+
+def _finish(stats: QueryStats):
+    metrics.counter("db_queries_total", stats.queries, scope=stats.name)
+    metrics.observe("db_scope_seconds", stats.seconds, scope=stats.name)
+    for fp, n in stats.repeated():
+        metrics.counter("db_n_plus_one_total", scope=stats.name)
+        logger.warning(f"[SQL] {stats.name} 疑似 N+1 查询：同一语句执行了 {n} 次: {fp[:300]}")
+    logger.debug(f"[SQL] {stats.name}: {stats.queries} 条查询，数据库耗时 {stats.seconds * 1000:.1f}ms")
+
+
+@contextmanager
+def track(name: str, budget: int = None):
+    """统计作用域内的查询；给出 budget 时，正常结束但查询数超出预算则抛出 QueryBudgetExceeded"""
+    stats = QueryStats(name)
+    token = _scopes.set(_scopes.get() + (stats,))
+    try:
+        yield stats
+    finally:
+        _scopes.reset(token)
+        _finish(stats)
+    if budget is not None and stats.queries > budget:
+        top = "; ".join(f"{n}× {fp[:120]}" for fp, n in stats.fingerprints.most_common(3))
+        raise QueryBudgetExceeded(f"{name}: {stats.queries} 条查询，超出预算 {budget} 条 ({top})")
+
+
+def query_budget(max_queries: int, name: str = "query_budget"):
+    """查询预算：with query_budget(5): ...  超出时抛出 QueryBudgetExceeded"""
+    return track(name, budget=max_queries)
@@ -0,0 +1,222 @@
+"""
+按需重新分析 (提示词、模型或正文提取逻辑变更后)
+每篇论文记录了分析所用的提示词版本、模型、输入哈希与正文提取版本 (见 core_batch.py)，
+据此只挑出受影响的论文，不必把全部论文重置为 pending：
+- prompt：analysis_prompt_version 与当前 ANALYSIS_PROMPT_VERSION 不一致
+- model：analysis_model 与当前 ANALYSIS_MODEL 不一致
+- extraction：extraction_version 与当前 EXTRACTION_VERSION 不一致 (重新分析前先重新下载并提取正文)
+- input：当前标题+正文的哈希与分析时记录的不一致 (历史论文未记录哈希，不计入)
+仅初筛 (analysis_tier=triage) 的论文不参与计划，它们在被收藏时以 favorited 原因排队，升级为深度分析
+(初筛论文不推送，升级时更新完成时间，由下一次每日推送发出)
+按热度分从高到低排队，预估 token 超出预算的论文留待下次；重新分析期间原有结果照常展示，完成时间不变 (不会被再次推送)
+重新分析成功后更新 analyzed_at 并重新向量化，论文目录与相似论文随之刷新
+用法:
+  python reanalysis.py plan [--budget-tokens 2000000] [--reasons prompt,model] [--queue]   预估并 (可选) 排入队列
+  python reanalysis.py run [--limit 100] [--reason favorited]                             分析队列中的论文
+"""
+import argparse
+import contextvars
+import json
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+from sqlalchemy import or_
+
+import metrics
+from database import Session, Paper, PaperScore, logger
+
+REASONS = ("prompt", "model", "extraction", "input")
+
+
+@dataclass
+class PlanItem:
+    paper_id: int
+    reasons: list
+    input_tokens: int
+    output_tokens: int
+    score: float = 0.0
+
+
+@dataclass
+class ReanalysisPlan:
+    """queued 为预算内、按优先级排序的论文；deferred 为超出预算留待下次的论文"""
+    queued: list = field(default_factory=list)
+    deferred: list = field(default_factory=list)
+    affected: Counter = field(default_factory=Counter)
+    scanned: int = 0
+
+    @property
+    def input_tokens(self) -> int:
+        return sum(item.input_tokens for item in self.queued)
+
+    @property
+    def output_tokens(self) -> int:
+        return sum(item.output_tokens for item in self.queued)
+
+    def report(self) -> str:
+        reasons = ", ".join(f"{r} {self.affected[r]}" for r in REASONS if self.affected[r]) or "无"
+        return (f"扫描 {self.scanned} 篇已完成论文，受影响 {len(self.queued) + len(self.deferred)} 篇 ({reasons})；"
+                f"本次排队 {len(self.queued)} 篇，预计输入 {self.input_tokens} / 输出 {self.output_tokens} tokens，"
+                f"超出预算顺延 {len(self.deferred)} 篇")
+
+
+def stale_reasons(paper, input_hash: str = None) -> list[str]:
+    """论文的分析结果因哪些变更而过期 (input_hash 为当前输入哈希，未提供时不比较)"""
+    from core_batch import ANALYSIS_PROMPT_VERSION, ANALYSIS_MODEL, EXTRACTION_VERSION
+
+    reasons = []
+    if paper.analysis_prompt_version != ANALYSIS_PROMPT_VERSION:
+        reasons.append("prompt")
+    if paper.analysis_model != ANALYSIS_MODEL:
+        reasons.append("model")
+    if paper.extraction_version != EXTRACTION_VERSION:
+        reasons.append("extraction")
+    if input_hash and paper.analysis_input_hash and paper.analysis_input_hash != input_hash:
+        reasons.append("input")
+    return reasons
+
+
+def plan(budget_tokens: int = None, limit: int = None, reasons=REASONS) -> ReanalysisPlan:
+    """找出受 reasons 中变更影响的已完成论文，按热度分排序并按 token 预算截断 (不修改数据)"""
+    from core_batch import ANALYSIS_PROMPT, ANALYSIS_OUTPUT_TOKENS, analysis_input, analysis_input_hash, estimate_tokens
+
+    result = ReanalysisPlan()
+    prompt_tokens = estimate_tokens(ANALYSIS_PROMPT)
+    candidates = []
+    session = Session()
+    try:
+        rows = session.query(Paper.id, Paper.title, Paper.full_text_tmp, Paper.analysis_json,
+                             Paper.analysis_prompt_version, Paper.analysis_model, Paper.analysis_input_hash,
+                             Paper.extraction_version, PaperScore.score) \
+            .outerjoin(PaperScore, PaperScore.paper_id == Paper.id) \
+            .filter(Paper.batch_status == "completed", or_(Paper.analysis_tier.is_(None), Paper.analysis_tier != "triage")) \
+            .yield_per(500)
+        for row in rows:
+            result.scanned += 1
+            input_hash = analysis_input_hash(row.title, row.full_text_tmp) if "input" in reasons else None
+            stale = [r for r in stale_reasons(row, input_hash) if r in reasons]
+            if not stale:
+                continue
+            result.affected.update(stale)
+            output = row.analysis_json
+            candidates.append(PlanItem(
+                paper_id=row.id,
+                reasons=stale,
+                input_tokens=prompt_tokens + estimate_tokens(analysis_input(row.title, row.full_text_tmp)),
+                output_tokens=estimate_tokens(json.dumps(output, ensure_ascii=False)) if output else ANALYSIS_OUTPUT_TOKENS,
+                score=row.score or 0.0,
+            ))
+    finally:
+        session.close()
+
+    # 热门论文优先；同等热度下先处理便宜的
+    candidates.sort(key=lambda item: (-item.score, item.input_tokens + item.output_tokens))
+    spent = 0
+    for item in candidates:
+        cost = item.input_tokens + item.output_tokens
+        over_budget = budget_tokens is not None and spent + cost > budget_tokens
+        if over_budget or (limit is not None and len(result.queued) >= limit):
+            result.deferred.append(item)
+            continue
+        result.queued.append(item)
+        spent += cost
+    return result
+
+
+def queue(reanalysis_plan: ReanalysisPlan) -> int:
+    """把计划中预算内的论文排入重新分析队列 (记录原因)，返回排队数量"""
+    session = Session()
+    try:
+        for item in reanalysis_plan.queued:
+            session.query(Paper).filter(Paper.id == item.paper_id) \
+                .update({Paper.reanalysis_reason: ",".join(item.reasons)}, synchronize_session=False)
+        session.commit()
+    finally:
+        session.close()
+    return len(reanalysis_plan.queued)
+
+
+def _load_task(paper_id: int) -> dict | None:
+    """重新分析任务；正文提取逻辑变更的论文先重新下载 PDF 并提取正文"""
+    from core_batch import download_text, EXTRACTION_VERSION
+
+    session = Session()
+    try:
+        paper = session.get(Paper, paper_id)
+        if paper is None or not paper.reanalysis_reason:
+            return None
+        if "extraction" in paper.reanalysis_reason.split(",") or not paper.full_text_tmp:
+            try:
+                paper.full_text_tmp = download_text(paper.url)
+            except Exception as e:
+                logger.error(f"重新提取正文失败 [ID:{paper_id}]: {e}")
+                return None
+            paper.extraction_version = EXTRACTION_VERSION
+            session.commit()
+        return {"id": paper.id, "title": paper.title, "text": paper.full_text_tmp, "reanalysis": True}
+    finally:
+        session.close()
+
+
+def _reanalyze_one(paper_id: int) -> bool:
+    from core_batch import analyze_and_store
+
+    task = _load_task(paper_id)
+    return bool(task) and analyze_and_store(task)
+
+
+@metrics.span("reanalyze")
+def run_queued(limit: int = None, reason: str = None) -> int:
+    """按热度分从高到低分析队列中的论文 (reason 只处理该原因排队的论文)，返回成功数量 (失败的论文保留原结果并留在队列中)"""
+    from cache import bump_version, PAPERS
+    from core_batch import MAX_WORKERS
+
+    session = Session()
+    try:
+        query = session.query(Paper.id) \
+            .outerjoin(PaperScore, PaperScore.paper_id == Paper.id) \
+            .filter(Paper.reanalysis_reason.isnot(None))
+        if reason:
+            query = query.filter(Paper.reanalysis_reason.contains(reason))
+        query = query.order_by(PaperScore.score.desc().nulls_last(), Paper.id)
+        paper_ids = [pid for (pid,) in (query.limit(limit) if limit else query)]
+    finally:
+        session.close()
+    if not paper_ids:
+        logger.info("重新分析队列为空")
+        return 0
+
+    logger.info(f">>> 开始重新分析 {len(paper_ids)} 篇论文")
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        futures = [executor.submit(contextvars.copy_context().run, _reanalyze_one, pid) for pid in paper_ids]
+        success = sum(f.result() for f in futures)
+    logger.info(f">>> 重新分析结束，成功: {success}/{len(paper_ids)}")
+    if success:
+        # 关键词与分析内容已变化：重新向量化 (按 analyzed_at 找出这些论文)
+        from vector_index import build_similarity_index
+        build_similarity_index()
+        bump_version(PAPERS)
+    return success
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="按需重新分析")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_plan = sub.add_parser("plan", help="找出受影响的论文并预估 token 消耗")
+    p_plan.add_argument("--budget-tokens", type=int, help="本次最多消耗的 token 数 (输入+输出)")
+    p_plan.add_argument("--limit", type=int, help="本次最多排队的论文数")
+    p_plan.add_argument("--reasons", default=",".join(REASONS), help=f"计入的变更类型，逗号分隔 ({','.join(REASONS)})")
+    p_plan.add_argument("--queue", action="store_true", help="把预算内的论文排入重新分析队列")
+    p_run = sub.add_parser("run", help="分析队列中的论文")
+    p_run.add_argument("--limit", type=int)
+    p_run.add_argument("--reason", help="只处理该原因排队的论文 (例如 favorited)")
+    args = parser.parse_args()
+
+    if args.command == "plan":
+        result = plan(args.budget_tokens, args.limit, tuple(r.strip() for r in args.reasons.split(",") if r.strip()))
+        logger.info(result.report())
+        if args.queue:
+            logger.info(f"已排入重新分析队列: {queue(result)} 篇")
+    else:
+        run_queued(args.limit, args.reason)
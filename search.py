@@ -0,0 +1,228 @@
+"""
+论文全文检索
+- SQLite: FTS5 虚表 paper_search (rowid = papers.id)，bm25 排序
+- PostgreSQL: paper_search(document tsvector) + GIN 索引，ts_rank_cd 排序
+中文没有空格分词，这里统一把连续汉字切成二元组 (bigram) 后再交给数据库分词器，
+查询时同样切分并按短语匹配，两种数据库的行为保持一致。
+"""
+import html
+import re
+
+from sqlalchemy import text
+
+from database import Paper, logger
+
+_TOKEN_RE = re.compile(r"[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]+|[a-z0-9]+")
+_CJK_RE = re.compile(r"[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]")
+
+# analysis_json 中参与检索的字段
+ANALYSIS_FIELDS = ("motivation", "method", "result", "implementation_example", "popular_science")
+
+# 字段权重：标题 > 关键词 > 正文 (科普与分析)
+TITLE_WEIGHT, KEYWORD_WEIGHT, BODY_WEIGHT = 10.0, 5.0, 1.0
+
+def _is_cjk(token: str) -> bool:
+    return bool(_CJK_RE.match(token))
+
+
+def _cjk_bigrams(run: str) -> list[str]:
+    if len(run) == 1:
+        return [run]
+    return [run[i:i + 2] for i in range(len(run) - 1)]
+
+
+def tokenize(value: str) -> list[str]:
+    """切词：英文/数字按单词小写，连续汉字切成二元组"""
+    tokens = []
+    for m in _TOKEN_RE.finditer((value or "").lower()):
+        term = m.group()
+        tokens.extend(_cjk_bigrams(term) if _is_cjk(term) else [term])
+    return tokens
+
+
+def _query_groups(query: str) -> list[tuple[bool, list[str]]]:
+    """把查询拆成若干组：(是否中文, 该组的词)，中文组需按短语匹配"""
+    groups = []
+    for m in _TOKEN_RE.finditer((query or "").lower()):
+        term = m.group()
+        if _is_cjk(term):
+            groups.append((True, _cjk_bigrams(term)))
+        else:
+            groups.append((False, [term]))
+    return groups
+
+
+def paper_fields(paper: Paper) -> tuple[str, str, str]:
+    """(标题, 关键词, 正文) 三个检索字段的原始文本"""
+    title = " ".join(filter(None, [paper.title, paper.chinese_title]))
+    analysis = paper.analysis_json if isinstance(paper.analysis_json, dict) else {}
+    body_parts = [paper.popular_science] + [analysis.get(k) for k in ANALYSIS_FIELDS if k != "popular_science"]
+    body = " ".join(str(v) for v in body_parts if v)
+    return title, paper.keywords or "", body
+
+
+def ensure_search_index(conn):
+    """按当前数据库类型创建检索表/索引 (由 database.migrate() 调用，不提交)"""
+    if conn.dialect.name == "postgresql":
+        conn.execute(text(
+            "CREATE TABLE IF NOT EXISTS paper_search ("
+            " paper_id INTEGER PRIMARY KEY REFERENCES papers(id) ON DELETE CASCADE,"
+            " document tsvector)"
+        ))
+        conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_paper_search_document ON paper_search USING GIN (document)"
+        ))
+    else:
+        conn.execute(text(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS paper_search USING fts5("
+            "title, keywords, body, tokenize='unicode61 remove_diacritics 2')"
+        ))
+
+
+def _dialect(session) -> str:
+    return session.get_bind().dialect.name
+
+
+def index_paper(session, paper: Paper):
+    """写入/覆盖单篇论文的检索文档 (不提交)"""
+    dialect = _dialect(session)
+    title, keywords, body = (" ".join(tokenize(v)) for v in paper_fields(paper))
+
+    if dialect == "postgresql":
+        session.execute(text(
+            "INSERT INTO paper_search (paper_id, document) VALUES (:id, "
+            " setweight(to_tsvector('simple', :title), 'A') ||"
+            " setweight(to_tsvector('simple', :keywords), 'B') ||"
+            " setweight(to_tsvector('simple', :body), 'D'))"
+            " ON CONFLICT (paper_id) DO UPDATE SET document = EXCLUDED.document"
+        ), {"id": paper.id, "title": title, "keywords": keywords, "body": body})
+    else:
+        session.execute(text("DELETE FROM paper_search WHERE rowid = :id"), {"id": paper.id})
+        session.execute(text(
+            "INSERT INTO paper_search (rowid, title, keywords, body) VALUES (:id, :title, :keywords, :body)"
+        ), {"id": paper.id, "title": title, "keywords": keywords, "body": body})
+
+
+def remove_paper(session, paper_id: int):
+    """从检索库中删除单篇论文 (不提交)"""
+    dialect = _dialect(session)
+    column = "paper_id" if dialect == "postgresql" else "rowid"
+    session.execute(text(f"DELETE FROM paper_search WHERE {column} = :id"), {"id": paper_id})
+
+
+def backfill_search_index(session, rebuild: bool = False, batch_size: int = 1000) -> int:
+    """为已完成分析但尚未入检索库的论文建立索引；rebuild=True 时全部重建。返回处理的论文数"""
+    dialect = _dialect(session)
+    indexed_sql = "SELECT paper_id FROM paper_search" if dialect == "postgresql" else "SELECT rowid FROM paper_search"
+
+    if rebuild:
+        session.execute(text("DELETE FROM paper_search"))
+        session.commit()
+
+    # 先取出全部待索引的 ID，再按块加载、索引并提交：
+    # 不能边流式读取边提交 (SQLite 上读游标未关闭时提交会报 database is locked，Postgres 的服务端游标提交后失效)
+    query = session.query(Paper.id).filter(Paper.batch_status == "completed")
+    if not rebuild:
+        query = query.filter(text(f"papers.id NOT IN ({indexed_sql})"))
+    paper_ids = [pid for (pid,) in query.order_by(Paper.id)]
+
+    count = 0
+    for i in range(0, len(paper_ids), batch_size):
+        for paper in session.query(Paper).filter(Paper.id.in_(paper_ids[i:i + batch_size])):
+            index_paper(session, paper)
+            count += 1
+        session.commit()
+        session.expunge_all()
+
+    if count:
+        logger.info(f"检索索引已更新: {count} 篇论文")
+    return count
+
+
+def _fts5_match(groups: list[tuple[bool, list[str]]]) -> str:
+    parts = []
+    for is_cjk, terms in groups:
+        if is_cjk and len(terms) == 1 and len(terms[0]) == 1:
+            # 单个汉字在索引里只以二元组形式出现，用前缀匹配兜底
+            parts.append(f'"{terms[0]}"*')
+        elif is_cjk:
+            parts.append('"' + " ".join(terms) + '"')
+        else:
+            parts.append(f'"{terms[0]}"*')
+    return " AND ".join(parts)
+
+
+def _tsquery(groups: list[tuple[bool, list[str]]]) -> str:
+    parts = []
+    for is_cjk, terms in groups:
+        if is_cjk and len(terms) == 1 and len(terms[0]) == 1:
+            parts.append(f"{terms[0]}:*")
+        elif is_cjk:
+            parts.append("(" + " <-> ".join(terms) + ")")
+        else:
+            parts.append(f"{terms[0]}:*")
+    return " & ".join(parts)
+
+
+def search_paper_ids(session, query: str, category: str = None, limit: int = 50) -> list[tuple[int, float]]:
+    """
+    全文检索，返回 [(paper_id, 相关度), ...]，相关度越大越靠前
+    category: 领域过滤 (None / "全部" 表示不过滤)
+    """
+    groups = _query_groups(query)
+    if not groups:
+        return []
+
+    dialect = _dialect(session)
+    params = {"limit": limit}
+    category_sql = ""
+    if category and category != "全部":
+        category_sql = " AND p.category = :category"
+        params["category"] = category
+
+    if dialect == "postgresql":
+        params["q"] = _tsquery(groups)
+        sql = (
+            "SELECT s.paper_id, ts_rank_cd(s.document, to_tsquery('simple', :q)) AS rank"
+            " FROM paper_search s JOIN papers p ON p.id = s.paper_id"
+            " WHERE s.document @@ to_tsquery('simple', :q) AND p.batch_status = 'completed'"
+            f"{category_sql} ORDER BY rank DESC LIMIT :limit"
+        )
+    else:
+        params["q"] = _fts5_match(groups)
+        # bm25 越小越相关，取负数统一成"越大越相关"
+        sql = (
+            f"SELECT s.rowid, -bm25(paper_search, {TITLE_WEIGHT}, {KEYWORD_WEIGHT}, {BODY_WEIGHT}) AS rank"
+            " FROM paper_search s JOIN papers p ON p.id = s.rowid"
+            " WHERE paper_search MATCH :q AND p.batch_status = 'completed'"
+            f"{category_sql} ORDER BY rank DESC LIMIT :limit"
+        )
+
+    return [(row[0], float(row[1])) for row in session.execute(text(sql), params)]
+
+
+def make_snippet(paper: Paper, query: str, width: int = 60) -> str:
+    """
+    生成高亮摘要 (HTML，已转义)：在科普/分析/中文标题中找到第一个命中的查询词，截取上下文
+    中文按原文匹配，不受 bigram 切分影响
+    """
+    terms = [m.group() for m in _TOKEN_RE.finditer((query or "").lower())]
+    if not terms:
+        return ""
+
+    title, keywords, body = paper_fields(paper)
+    for source in (body, keywords, title):
+        lowered = source.lower()
+        hits = [(lowered.find(t), t) for t in terms if lowered.find(t) >= 0]
+        if not hits:
+            continue
+
+        pos, term = min(hits)
+        start = max(0, pos - width // 2)
+        end = min(len(source), pos + len(term) + width // 2)
+        fragment = source[start:end]
+
+        pattern = "|".join(re.escape(html.escape(t)) for t in sorted(set(terms), key=len, reverse=True))
+        highlighted = re.sub(pattern, lambda m: f"<mark>{m.group()}</mark>", html.escape(fragment), flags=re.IGNORECASE)
+        return ("…" if start > 0 else "") + highlighted + ("…" if end < len(source) else "")
+    return ""
@@ -1,10 +1,20 @@
 import os
+import re
+import math
 import random
 from collections import defaultdict
 
 import resend
-from database import Session, Paper, User, VerificationCode, Donation, Comment, logger, user_favorites
-from sqlalchemy import func
+from database import (
+    Session, Paper, User, UserCategory, VerificationCode, Donation, Comment, PaperKeyword, PaperScore,
+    DailyCategoryStat, DailyKeywordStat, DailyEngagementStat, DigestDelivery,
+    logger, user_favorites, get_utc_now
+)
+from sqlalchemy import func, or_
+from sqlalchemy.exc import IntegrityError
+import search
+from cache import cached, bump_version, PAPERS, ENGAGEMENT, DONATIONS
+import metrics
 from datetime import datetime, timedelta, date, timezone  # 确保导入了 date
 from dotenv import load_dotenv
 
@@ -22,6 +32,20 @@ AVAILABLE_CATEGORIES = [
     "其他"
 ]
 
+# 每日汇总增量刷新时回看的天数 (覆盖跨天入库、延迟完成分析的论文)
+ROLLUP_LOOKBACK_DAYS = int(os.getenv("ROLLUP_LOOKBACK_DAYS", "3"))
+
+# 从未收到过推送的用户，首封邮件只包含最近这么多小时内完成分析的论文
+DIGEST_FIRST_WINDOW_HOURS = int(os.getenv("DIGEST_FIRST_WINDOW_HOURS", "24"))
+DIGEST_COMMIT_EVERY = 500
+
+# 热度分：收藏权重、评论权重与时间衰减半衰期 (天)
+FAVORITE_WEIGHT = 2.0
+COMMENT_WEIGHT = 1.0
+TRENDING_HALF_LIFE_DAYS = float(os.getenv("TRENDING_HALF_LIFE_DAYS", "7"))
+# 衰减分统一折算到这个固定纪元，旧分数无需随时间重写也能与新分数直接比较
+SCORE_EPOCH = datetime(2024, 1, 1)
+
 
 def send_verification_code(email: str) -> tuple[bool, str]:
     """
@@ -138,6 +162,14 @@ def get_user_by_email(email: str) -> User | None:
         session.close()
 
 
+def sync_user_categories(session, user_id: int, categories: list[str]):
+    """用订阅领域列表覆盖 user_categories 中该用户的记录 (不提交)"""
+    session.query(UserCategory).filter(UserCategory.user_id == user_id).delete(synchronize_session=False)
+    for category in dict.fromkeys(c.strip() for c in categories):
+        if category:
+            session.add(UserCategory(user_id=user_id, category=category))
+
+
 def update_user_subscription(email: str, categories: list[str]) -> tuple[bool, str]:
     """更新用户订阅"""
     session = Session()
@@ -148,6 +180,7 @@ def update_user_subscription(email: str, categories: list[str]) -> tuple[bool, s
 
         user.subscribed_categories = ",".join(categories)
         user.is_subscribed = True
+        sync_user_categories(session, user.id, categories)
         session.commit()
 
         logger.info(f"用户订阅更新: {email} -> {categories}")
@@ -161,29 +194,165 @@ def update_user_subscription(email: str, categories: list[str]) -> tuple[bool, s
         session.close()
 
 
+def _decay_rate() -> float:
+    """每天的衰减系数 λ = ln2 / 半衰期"""
+    return math.log(2) / TRENDING_HALF_LIFE_DAYS
+
+
+def _log_event_weight(weight: float, ts: datetime, rate: float) -> float:
+    """单个事件折算到纪元后的对数分：log(w) + λ·(t - epoch)"""
+    if ts is None:
+        ts = SCORE_EPOCH
+    if ts.tzinfo is not None:
+        ts = ts.replace(tzinfo=None)
+    days = (ts - SCORE_EPOCH).total_seconds() / 86400
+    return math.log(weight) + rate * days
+
+
+def _logsumexp(values: list[float]) -> float:
+    peak = max(values)
+    return peak + math.log(sum(math.exp(v - peak) for v in values))
+
+
+def _write_paper_score(session, paper_id: int, fav_times: list, comment_times: list):
+    """根据论文的全部收藏/评论时间重算并写入 paper_scores (不提交)"""
+    if not fav_times and not comment_times:
+        session.query(PaperScore).filter(PaperScore.paper_id == paper_id).delete(synchronize_session=False)
+        return
+
+    rate = _decay_rate()
+    logs = [_log_event_weight(FAVORITE_WEIGHT, t, rate) for t in fav_times] + \
+           [_log_event_weight(COMMENT_WEIGHT, t, rate) for t in comment_times]
+
+    row = session.get(PaperScore, paper_id) or PaperScore(paper_id=paper_id)
+    row.score = _logsumexp(logs)
+    row.favorite_count = len(fav_times)
+    row.comment_count = len(comment_times)
+    event_times = [t for t in fav_times + comment_times if t is not None]
+    row.last_event_at = max(event_times) if event_times else None
+    row.updated_at = get_utc_now()
+    session.add(row)
+
+
+def refresh_paper_score(session, paper_id: int):
+    """增量更新单篇论文的热度分 (只扫描这一篇论文的收藏与评论，走 paper_id 索引)"""
+    fav_times = [r[0] for r in session.query(user_favorites.c.created_at)
+                 .filter(user_favorites.c.paper_id == paper_id)]
+    comment_times = [r[0] for r in session.query(Comment.created_at)
+                     .filter(Comment.paper_id == paper_id)]
+    _write_paper_score(session, paper_id, fav_times, comment_times)
+    session.commit()
+
+
+def _refresh_score_safely(session, paper_id: int):
+    """写路径上更新热度分：失败只记录日志，不影响收藏/评论本身"""
+    try:
+        refresh_paper_score(session, paper_id)
+    except Exception as e:
+        logger.error(f"热度分更新失败 (Paper {paper_id}): {e}")
+        session.rollback()
+
+
+def rebuild_paper_scores() -> int:
+    """
+    全量重建热度分 (定期压缩任务)
+    修改半衰期或权重后运行一次即可让所有论文按新参数重新计分，返回计分论文数
+    """
+    session = Session()
+    try:
+        fav_times = defaultdict(list)
+        for paper_id, created_at in session.query(user_favorites.c.paper_id, user_favorites.c.created_at).yield_per(5000):
+            fav_times[paper_id].append(created_at)
+
+        comment_times = defaultdict(list)
+        for paper_id, created_at in session.query(Comment.paper_id, Comment.created_at).yield_per(5000):
+            if paper_id is not None:
+                comment_times[paper_id].append(created_at)
+
+        session.query(PaperScore).delete(synchronize_session=False)
+        paper_ids = set(fav_times) | set(comment_times)
+        for paper_id in paper_ids:
+            _write_paper_score(session, paper_id, fav_times.get(paper_id, []), comment_times.get(paper_id, []))
+        session.commit()
+        bump_version(ENGAGEMENT)
+
+        logger.info(f"热度分重建完成: {len(paper_ids)} 篇论文")
+        return len(paper_ids)
+    except Exception as e:
+        logger.error(f"热度分重建失败: {e}")
+        session.rollback()
+        raise
+    finally:
+        session.close()
+
+
+def _get_user_id(session, email: str) -> int | None:
+    """只取用户 ID，避免加载整个 User 及其关系"""
+    return session.query(User.id).filter(User.email == email).scalar()
+
+
+def _favorite_exists(session, user_id: int, paper_id: int) -> bool:
+    """直接在 user_favorites 关联表上判断是否已收藏"""
+    return session.query(
+        session.query(user_favorites.c.paper_id).filter(
+            user_favorites.c.user_id == user_id,
+            user_favorites.c.paper_id == paper_id
+        ).exists()
+    ).scalar()
+
+
 def toggle_favorite(email: str, paper_id: int) -> tuple[bool, bool, str]:
     """
     切换收藏状态
+    直接对 user_favorites 关联表做 DELETE/INSERT，不加载用户的收藏集合
     返回: (操作是否成功, 当前是否已收藏, 消息)
     """
     session = Session()
     try:
-        user = session.query(User).filter_by(email=email).first()
-        paper = session.query(Paper).get(paper_id)
+        user_id = _get_user_id(session, email)
+        paper_exists = session.query(
+            session.query(Paper.id).filter(Paper.id == paper_id).exists()
+        ).scalar()
 
-        if not user or not paper:
+        if not user_id or not paper_exists:
             return False, False, "用户或论文不存在"
 
-        if paper in user.favorite_papers:
-            user.favorite_papers.remove(paper)
+        # 先尝试删除：删掉了说明原来已收藏，本次为取消收藏
+        deleted = session.execute(
+            user_favorites.delete().where(
+                user_favorites.c.user_id == user_id,
+                user_favorites.c.paper_id == paper_id
+            )
+        ).rowcount
+        if deleted:
             session.commit()
+            _refresh_score_safely(session, paper_id)
+            bump_version(ENGAGEMENT)
             logger.info(f"取消收藏: {email} -> Paper {paper_id}")
             return True, False, "已取消收藏"
-        else:
-            user.favorite_papers.append(paper)
+
+        try:
+            session.execute(
+                user_favorites.insert().values(
+                    user_id=user_id,
+                    paper_id=paper_id,
+                    created_at=get_utc_now()
+                )
+            )
+            # 只做过初筛的论文被收藏：排入重新分析队列，由流水线的 escalate 步骤升级为深度分析
+            session.query(Paper).filter(
+                Paper.id == paper_id,
+                Paper.analysis_tier == "triage",
+                Paper.reanalysis_reason.is_(None)
+            ).update({Paper.reanalysis_reason: "favorited"}, synchronize_session=False)
             session.commit()
-            logger.info(f"添加收藏: {email} -> Paper {paper_id}")
-            return True, True, "已添加收藏"
+        except IntegrityError:
+            # 并发点击导致的重复插入：主键冲突即代表已经收藏，保持幂等
+            session.rollback()
+        _refresh_score_safely(session, paper_id)
+        bump_version(ENGAGEMENT)
+        logger.info(f"添加收藏: {email} -> Paper {paper_id}")
+        return True, True, "已添加收藏"
 
     except Exception as e:
         logger.error(f"收藏操作失败: {e}")
@@ -194,14 +363,16 @@ def toggle_favorite(email: str, paper_id: int) -> tuple[bool, bool, str]:
 
 
 def get_user_favorites(email: str) -> list[Paper]:
-    """获取用户收藏的论文"""
+    """获取用户收藏的论文 (按收藏时间倒序)"""
     session = Session()
     try:
-        user = session.query(User).filter_by(email=email).first()
-        if not user:
-            return []
+        papers = session.query(Paper) \
+            .join(user_favorites, user_favorites.c.paper_id == Paper.id) \
+            .join(User, User.id == user_favorites.c.user_id) \
+            .filter(User.email == email) \
+            .order_by(user_favorites.c.created_at.desc()) \
+            .all()
 
-        papers = list(user.favorite_papers)
         for p in papers:
             session.expunge(p)
         return papers
@@ -210,16 +381,26 @@ def get_user_favorites(email: str) -> list[Paper]:
         session.close()
 
 
+def get_user_favorite_count(email: str) -> int:
+    """统计用户收藏数量 (COUNT 查询，不加载论文)"""
+    session = Session()
+    try:
+        return session.query(func.count(user_favorites.c.paper_id)) \
+            .join(User, User.id == user_favorites.c.user_id) \
+            .filter(User.email == email) \
+            .scalar() or 0
+    finally:
+        session.close()
+
+
 def is_paper_favorited(email: str, paper_id: int) -> bool:
     """检查论文是否被用户收藏"""
     session = Session()
     try:
-        user = session.query(User).filter_by(email=email).first()
-        if not user:
+        user_id = _get_user_id(session, email)
+        if not user_id:
             return False
-
-        paper = session.query(Paper).get(paper_id)
-        return paper in user.favorite_papers if paper else False
+        return _favorite_exists(session, user_id, paper_id)
 
     finally:
         session.close()
@@ -248,6 +429,7 @@ def get_papers_by_category(category: str = None) -> list[Paper]:
         session.close()
 
 
+@cached(PAPERS)
 def get_all_categories() -> list[str]:
     """获取所有已有论文的分类"""
     session = Session()
@@ -263,105 +445,449 @@ def get_all_categories() -> list[str]:
         session.close()
 
 
+@cached(PAPERS)
+def get_dashboard_stats() -> dict:
+    """
+    看板统计 (全部在数据库端用 COUNT/SUM/GROUP BY 聚合，不加载论文行)
+    返回: {total_papers, category_count, total_citations, category_distribution}
+    category_distribution 为 [(领域, 论文数), ...]，按论文数降序
+    """
+    session = Session()
+    try:
+        total_papers, total_citations = session.query(
+            func.count(Paper.id),
+            func.coalesce(func.sum(Paper.citation_count), 0)
+        ).filter(Paper.batch_status == "completed").one()
+
+        rows = session.query(
+            Paper.category,
+            func.count(Paper.id).label('cnt')
+        ).filter(Paper.batch_status == "completed") \
+            .group_by(Paper.category) \
+            .order_by(func.count(Paper.id).desc()) \
+            .all()
+
+        # 空分类合并为"未分类"
+        distribution = defaultdict(int)
+        for category, cnt in rows:
+            distribution[category or "未分类"] += cnt
+
+        return {
+            'total_papers': total_papers or 0,
+            'category_count': len([r for r in rows if r[0]]),
+            'total_citations': int(total_citations or 0),
+            'category_distribution': sorted(distribution.items(), key=lambda x: x[1], reverse=True)
+        }
+    finally:
+        session.close()
+
+
+def normalize_keywords(raw) -> list[str]:
+    """
+    规范化关键词：兼容逗号/中文逗号/分号分隔的字符串或列表，
+    统一小写、合并空白并去重 (保持原有顺序)
+    """
+    if not raw:
+        return []
+    parts = raw if isinstance(raw, (list, tuple)) else re.split(r"[,，;；]", str(raw))
+
+    result = []
+    for kw in parts:
+        kw = re.sub(r"\s+", " ", str(kw)).strip().lower()
+        if kw and kw not in result:
+            result.append(kw)
+    return result
+
+
+def sync_paper_keywords(session, paper: Paper):
+    """用论文当前的 keywords 字段重建其在 paper_keywords 中的记录 (不提交)"""
+    session.query(PaperKeyword).filter(PaperKeyword.paper_id == paper.id).delete(synchronize_session=False)
+    for kw in normalize_keywords(paper.keywords):
+        session.add(PaperKeyword(
+            paper_id=paper.id,
+            keyword=kw,
+            category=paper.category,
+            paper_date=paper.created_at
+        ))
+
+
+def backfill_paper_keywords(batch_size: int = 500) -> int:
+    """为已完成但尚未建立关键词索引的论文补建 paper_keywords 记录，返回处理的论文数"""
+    session = Session()
+    try:
+        indexed = session.query(PaperKeyword.paper_id)
+        papers = session.query(Paper).filter(
+            Paper.batch_status == "completed",
+            Paper.keywords.isnot(None),
+            Paper.keywords != "",
+            Paper.id.notin_(indexed)
+        ).all()
+
+        for i, p in enumerate(papers, start=1):
+            sync_paper_keywords(session, p)
+            if i % batch_size == 0:
+                session.commit()
+        session.commit()
+
+        if papers:
+            bump_version(PAPERS)
+            logger.info(f"关键词索引回填完成: {len(papers)} 篇论文")
+        return len(papers)
+    except Exception as e:
+        logger.error(f"关键词索引回填失败: {e}")
+        session.rollback()
+        return 0
+    finally:
+        session.close()
+
+
+@cached(PAPERS)
+def get_top_keywords(limit: int = 12, category: str = None,
+                     start_date: date = None, end_date: date = None) -> list[tuple[str, int]]:
+    """
+    热点关键词 Top-K (单条 GROUP BY 查询，走 paper_keywords 上的索引)
+    category: 领域过滤；start_date / end_date: 按论文入库日期过滤 (闭区间)
+    """
+    session = Session()
+    try:
+        cnt = func.count(PaperKeyword.paper_id)
+        query = session.query(PaperKeyword.keyword, cnt)
+
+        if category and category != "全部":
+            query = query.filter(PaperKeyword.category == category)
+        if start_date:
+            query = query.filter(PaperKeyword.paper_date >= datetime.combine(start_date, datetime.min.time()))
+        if end_date:
+            query = query.filter(PaperKeyword.paper_date <= datetime.combine(end_date, datetime.max.time()))
+
+        rows = query.group_by(PaperKeyword.keyword) \
+            .order_by(cnt.desc(), PaperKeyword.keyword) \
+            .limit(limit) \
+            .all()
+        return [(kw, n) for kw, n in rows]
+    finally:
+        session.close()
+
+
+@cached(PAPERS)
+def get_top_cited_papers(category: str, limit: int = 20) -> list[dict]:
+    """获取指定领域引用量最高的论文 (仅标题与引用量，供趋势分析使用)"""
+    session = Session()
+    try:
+        rows = session.query(Paper.title, Paper.citation_count) \
+            .filter(Paper.batch_status == "completed", Paper.category == category) \
+            .order_by(Paper.citation_count.desc()) \
+            .limit(limit) \
+            .all()
+        return [{'title': title, 'citation_count': citation_count or 0} for title, citation_count in rows]
+    finally:
+        session.close()
+
+
+def _as_date(value) -> date:
+    """func.date() 在 SQLite 返回字符串、在 PostgreSQL 返回 date，这里统一成 date"""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+
+def refresh_daily_rollups(since: date = None) -> date | None:
+    """
+    增量刷新每日汇总表 (领域论文数 / 关键词次数 / 收藏与评论数)
+    since: 从哪一天开始重算；为空时从已有汇总的最后一天往前回看 ROLLUP_LOOKBACK_DAYS 天，
+           并提前到该窗口内完成分析的论文中最早的创建日期 (分析较晚完成的论文计入其创建当天)，
+           汇总表为空时全量重建
+    返回实际重算的起始日期 (全量重建时为 None)
+    """
+    session = Session()
+    try:
+        if since is None:
+            last_day = session.query(func.max(DailyCategoryStat.day)).scalar()
+            if last_day:
+                since = _as_date(last_day) - timedelta(days=ROLLUP_LOOKBACK_DAYS)
+                window_start = datetime.combine(since, datetime.min.time())
+                earliest = session.query(func.min(Paper.created_at)) \
+                    .filter(Paper.batch_status == "completed", Paper.completed_at >= window_start).scalar()
+                if earliest and earliest.date() < since:
+                    since = earliest.date()
+
+        since_dt = datetime.combine(since, datetime.min.time()) if since else None
+
+        # 1. 清掉需要重算的日期
+        for model in (DailyCategoryStat, DailyKeywordStat, DailyEngagementStat):
+            q = session.query(model)
+            if since:
+                q = q.filter(model.day >= since)
+            q.delete(synchronize_session=False)
+
+        # 2. 领域 × 天
+        paper_day = func.date(Paper.created_at)
+        q = session.query(paper_day, Paper.category, func.count(Paper.id)) \
+            .filter(Paper.batch_status == "completed", Paper.created_at.isnot(None))
+        if since_dt:
+            q = q.filter(Paper.created_at >= since_dt)
+        category_counts = defaultdict(int)
+        for day, category, cnt in q.group_by(paper_day, Paper.category):
+            category_counts[(_as_date(day), category or "未分类")] += cnt
+        session.add_all([
+            DailyCategoryStat(day=day, category=category, paper_count=cnt)
+            for (day, category), cnt in category_counts.items()
+        ])
+
+        # 3. 关键词 × 天 (基于已规范化的 paper_keywords)
+        kw_day = func.date(PaperKeyword.paper_date)
+        q = session.query(kw_day, PaperKeyword.keyword, func.count(PaperKeyword.paper_id)) \
+            .filter(PaperKeyword.paper_date.isnot(None))
+        if since_dt:
+            q = q.filter(PaperKeyword.paper_date >= since_dt)
+        session.add_all([
+            DailyKeywordStat(day=_as_date(day), keyword=keyword, count=cnt)
+            for day, keyword, cnt in q.group_by(kw_day, PaperKeyword.keyword)
+        ])
+
+        # 4. 收藏 / 评论 × 天
+        engagement = defaultdict(lambda: [0, 0])
+        fav_day = func.date(user_favorites.c.created_at)
+        q = session.query(fav_day, func.count()).select_from(user_favorites) \
+            .filter(user_favorites.c.created_at.isnot(None))
+        if since_dt:
+            q = q.filter(user_favorites.c.created_at >= since_dt)
+        for day, cnt in q.group_by(fav_day):
+            engagement[_as_date(day)][0] += cnt
+
+        comment_day = func.date(Comment.created_at)
+        q = session.query(comment_day, func.count(Comment.id)).filter(Comment.created_at.isnot(None))
+        if since_dt:
+            q = q.filter(Comment.created_at >= since_dt)
+        for day, cnt in q.group_by(comment_day):
+            engagement[_as_date(day)][1] += cnt
+
+        session.add_all([
+            DailyEngagementStat(day=day, favorites=favs, comments=comments)
+            for day, (favs, comments) in engagement.items()
+        ])
+
+        session.commit()
+        bump_version(PAPERS)
+        logger.info(f"每日汇总刷新完成 (起始日期: {since or '全量'})")
+        return since
+    except Exception as e:
+        logger.error(f"每日汇总刷新失败: {e}")
+        session.rollback()
+        raise
+    finally:
+        session.close()
+
+
+@cached(PAPERS)
+def get_daily_category_series(start_date: date, end_date: date) -> list[tuple[date, str, int]]:
+    """按天返回各领域新增论文数 [(日期, 领域, 论文数), ...]"""
+    session = Session()
+    try:
+        rows = session.query(DailyCategoryStat.day, DailyCategoryStat.category, DailyCategoryStat.paper_count) \
+            .filter(DailyCategoryStat.day >= start_date, DailyCategoryStat.day <= end_date) \
+            .order_by(DailyCategoryStat.day) \
+            .all()
+        return [(day, category, cnt) for day, category, cnt in rows]
+    finally:
+        session.close()
+
+
+@cached(PAPERS)
+def get_daily_keyword_series(start_date: date, end_date: date, top_n: int = 8) -> list[tuple[date, str, int]]:
+    """按天返回时间窗口内 Top-N 关键词的出现次数 [(日期, 关键词, 次数), ...]"""
+    session = Session()
+    try:
+        in_range = (DailyKeywordStat.day >= start_date, DailyKeywordStat.day <= end_date)
+        total = func.sum(DailyKeywordStat.count)
+        top_keywords = [kw for kw, _ in session.query(DailyKeywordStat.keyword, total)
+                        .filter(*in_range)
+                        .group_by(DailyKeywordStat.keyword)
+                        .order_by(total.desc())
+                        .limit(top_n)]
+        if not top_keywords:
+            return []
+
+        rows = session.query(DailyKeywordStat.day, DailyKeywordStat.keyword, DailyKeywordStat.count) \
+            .filter(*in_range, DailyKeywordStat.keyword.in_(top_keywords)) \
+            .order_by(DailyKeywordStat.day) \
+            .all()
+        return [(day, kw, cnt) for day, kw, cnt in rows]
+    finally:
+        session.close()
+
+
+@cached(PAPERS)
+def get_daily_engagement_series(start_date: date, end_date: date) -> list[tuple[date, int, int]]:
+    """按天返回新增收藏数与评论数 [(日期, 收藏数, 评论数), ...]"""
+    session = Session()
+    try:
+        rows = session.query(DailyEngagementStat.day, DailyEngagementStat.favorites, DailyEngagementStat.comments) \
+            .filter(DailyEngagementStat.day >= start_date, DailyEngagementStat.day <= end_date) \
+            .order_by(DailyEngagementStat.day) \
+            .all()
+        return [(day, favs, comments) for day, favs, comments in rows]
+    finally:
+        session.close()
+
+
+def _record_digest_delivery(session, deliveries: dict, user_id: int, last_completed_at: datetime, papers_sent: int):
+    """更新用户的推送水位线 (不提交，与该用户的发件箱记录在同一事务中提交)"""
+    delivery = deliveries.get(user_id)
+    if delivery is None:
+        delivery = deliveries[user_id] = DigestDelivery(user_id=user_id)
+        session.add(delivery)
+    delivery.last_completed_at = last_completed_at
+    delivery.last_sent_at = get_utc_now()
+    delivery.papers_sent = papers_sent
+
+
+@metrics.span("send_daily_emails")
 def send_daily_emails():
     """
-    发送每日订阅邮件
+    发送每日订阅邮件：先构建并写入发件箱，再投递发件箱
+    (投递也会捎带之前运行中未发完、到期重试的邮件)
+    """
+    import mailer
+
+    with metrics.span("enqueue_daily_digests"):
+        queued = enqueue_daily_digests()
+    metrics.counter("digests_queued_total", queued)
+    result = mailer.deliver_outbox()
+    return {"queued": queued, **result}
+
+
+def enqueue_daily_digests() -> int:
+    """
+    构建每日订阅邮件并写入发件箱，返回入队数量
     修改点：按Category分类发送，展示中文名，移除引用量
+    增量推送：每位用户只收到上次推送水位线 (DigestDelivery.last_completed_at) 之后完成分析的论文
+    仅初筛的论文没有深度解读，不推送 (升级为深度分析后更新完成时间，随之后的推送发出)
     """
+    # 排序/渲染/发件箱依赖 numpy 与 resend，只在每日任务中按需导入，网页端不加载
+    import digest
+    import mailer
+    import ranking
+    import vector_index
+
+    queued = 0
     session = Session()
     try:
-        users = session.query(User).filter(User.is_subscribed == True).all()
-        new_papers = session.query(Paper).filter(Paper.batch_status == "completed").all()
+        # 只取推送需要的列，不构造完整的 User 对象
+        users = session.query(User.id, User.email).filter(User.is_subscribed == True).order_by(User.id).all()
+        if not users:
+            logger.info("没有订阅用户，跳过邮件发送。")
+            return 0
+
+        # 1. 每位用户的推送水位线：从未推送过的用户只看最近 DIGEST_FIRST_WINDOW_HOURS 小时
+        default_watermark = get_utc_now().replace(tzinfo=None) - timedelta(hours=DIGEST_FIRST_WINDOW_HOURS)
+        # 水位线表每位用户一行，直接全表读取，避免超长的 IN 列表
+        deliveries = {d.user_id: d for d in session.query(DigestDelivery)}
+        watermarks = {
+            u.id: (deliveries[u.id].last_completed_at if u.id in deliveries and deliveries[u.id].last_completed_at
+                   else default_watermark)
+            for u in users
+        }
+
+        # 候选论文：只取比最早水位线更新的已完成论文 (走 batch_status + completed_at 索引)
+        new_papers = session.query(Paper).filter(
+            Paper.batch_status == "completed",
+            Paper.completed_at > min(watermarks.values()),
+            or_(Paper.analysis_tier.is_(None), Paper.analysis_tier != "triage")
+        ).order_by(Paper.completed_at).all()
 
         if not new_papers:
             logger.info("无新完成论文，跳过邮件发送。")
-            return
-
-        logger.info(f"准备为 {len(users)} 位用户发送订阅邮件...")
-
+            return 0
+
+        logger.info(f"准备为 {len(users)} 位用户发送订阅邮件 (候选论文 {len(new_papers)} 篇)...")
+
+        # 2. 个性化排序：水位线相同的用户一起打分 (通常所有用户处于同一水位)，每个订阅领域保留 Top-N
+        index = vector_index.get_index()
+        papers_by_id = {p.id: p for p in new_papers}
+        subscriptions = ranking.load_subscriptions(session, {p.category or "其他" for p in new_papers})
+        users_by_watermark = defaultdict(list)
+        for u in users:
+            users_by_watermark[watermarks[u.id]].append(u.id)
+
+        ranked_by_user = {}
+        latest_by_user = {}
+        profiles_all = ranking.build_user_profiles(session, [u.id for u in users], index)
+        profile_row = {u.id: row for row, u in enumerate(users)}
+        for watermark, group in users_by_watermark.items():
+            eligible = [p for p in new_papers if p.completed_at > watermark]
+            if not eligible:
+                continue
+            candidates = [
+                ranking.Candidate(
+                    id=p.id,
+                    category=p.category or "其他",
+                    citation_count=p.citation_count or 0,
+                    timestamp=p.created_at.timestamp() if p.created_at else 0.0
+                )
+                for p in eligible
+            ]
+            ranked = ranking.rank_digest(
+                group,
+                subscriptions,
+                candidates,
+                profiles_all[[profile_row[uid] for uid in group]],
+                index
+            )
+            ranked_by_user.update(ranked.by_user)
+            for uid in group:
+                latest_by_user[uid] = eligible[-1].completed_at
+
+        renderer = digest.DigestRenderer(papers_by_id)
+        outgoing = []
         for user in users:
-            # 1. 筛选用户感兴趣的论文
-            interest_list = [c.strip() for c in user.subscribed_categories.split(",") if c.strip()]
+            if user.id not in latest_by_user:
+                continue
 
-            if interest_list:
-                target_papers = [p for p in new_papers if p.category in interest_list]
-            else:
-                target_papers = new_papers
+            # 3. 取出该用户按领域分组、已排序的论文，从共享片段拼装邮件 HTML
+            selection = ranked_by_user.get(user.id, {})
+            paper_total = sum(len(pids) for pids in selection.values())
 
-            if not target_papers:
+            if not paper_total:
                 logger.info(f"用户 {user.email} 无匹配论文，跳过")
+                _record_digest_delivery(session, deliveries, user.id, latest_by_user[user.id], 0)
                 continue
 
-            # 2. 按分类对论文进行分组 (Group by Category)
-            papers_by_category = defaultdict(list)
-            for p in target_papers:
-                cat = p.category if p.category else "其他"
-                papers_by_category[cat].append(p)
-
-            # 3. 构建邮件 HTML
-            html = """
-            <div style='background:#fdfcf0; padding:20px; font-family:serif;'>
-                <h1 style='text-align:center; color:#1a1a1a; border-bottom:2px solid #D4A373; padding-bottom:15px;'>
-                    ArxivMind 每日精选
-                </h1>
-                <p style='text-align:center; color:#666; font-size:14px;'>今天为您精选了以下论文</p>
-            """
-
-            # 遍历分类字典生成内容
-            for category, papers in papers_by_category.items():
-                html += f"""
-                <div style='margin-top: 30px;'>
-                    <h2 style='color:#D4A373; font-size:18px; border-bottom:1px dashed #D4A373; padding-bottom:5px; margin-bottom:15px;'>
-                        📂 {category}
-                    </h2>
-                """
-
-                for p in papers:
-                    # 处理标题显示：优先中文，其次英文
-                    display_title = p.chinese_title if p.chinese_title else p.title
-                    subtitle = p.title if p.chinese_title else ""
-
-                    html += f"""
-                    <div style='padding: 15px; margin: 15px 0; background: rgba(255,255,255,0.8); border-radius: 8px; box-shadow: 0 2px 4px rgba(0,0,0,0.05);'>
-                        <h3 style='margin:0 0 5px 0; color:#1a1a1a; font-size: 16px;'>{display_title}</h3>
-                        """
-
-                    if subtitle:
-                        html += f"<p style='margin:0 0 10px 0; color:#888; font-size:12px; font-style:italic;'>{subtitle}</p>"
-
-                    html += f"""
-                        <p style='color:#333; line-height:1.6; font-size:14px; margin-bottom:10px;'>{p.popular_science}</p>
-                        <div style='text-align:right;'>
-                            <a href='{p.url}' style='color:#fff; background:#D4A373; text-decoration:none; padding:4px 12px; border-radius:4px; font-size:12px;'>阅读原文 →</a>
-                        </div>
-                    </div>
-                    """
-
-                html += "</div>"  # 结束分类div
-
-            html += """
-                <div style='text-align:center; margin-top:40px; border-top:1px solid #ddd; padding-top:20px;'>
-                    <p style='color:#999; font-size:12px;'>ArxivMind AI Daily</p>
-                </div>
-            </div>
-            """
-
-            try:
-                resend.Emails.send({
-                    "from": "ArxivMind <onboarding@resend.dev>",
-                    "to": user.email,
-                    "subject": f"【ArxivMind】每日精选 - {len(target_papers)}篇新论文",
-                    "html": html
-                })
-                logger.info(f"邮件已发送至: {user.email}")
-            except Exception as e:
-                logger.error(f"邮件发送失败 ({user.email}): {e}")
+            html = renderer.render(selection)
+
+            # 4. 写入发件箱并推进水位线 (同一事务提交)，实际发送由 mailer 的投递线程池完成
+            latest = latest_by_user[user.id]
+            outgoing.append({
+                "user_id": user.id,
+                "to_email": user.email,
+                "subject": f"【ArxivMind】每日精选 - {paper_total}篇新论文",
+                "html": html,
+                "idempotency_key": f"digest:{user.id}:{latest.isoformat()}",
+            })
+            _record_digest_delivery(session, deliveries, user.id, latest, paper_total)
+            # 分批提交：发件箱记录与水位线始终一起落盘，中途失败只会回滚最后一批
+            if len(outgoing) >= DIGEST_COMMIT_EVERY:
+                queued += mailer.enqueue_emails(session, outgoing)
+                session.commit()
+                outgoing = []
+
+        queued += mailer.enqueue_emails(session, outgoing)
+        session.commit()
+
+        stats = renderer.stats()
+        logger.info(f"邮件片段渲染: 论文卡片 {stats['cards']} 个，领域区块 {stats['sections']} 个，正文 {stats['bodies']} 份")
+        logger.info(f"已写入发件箱 {queued} 封邮件")
 
     except Exception as e:
-        logger.error(f"发送每日邮件异常: {e}")
+        session.rollback()
+        logger.error(f"构建每日邮件异常: {e}")
     finally:
         session.close()
+    return queued
 
+@cached(PAPERS, maxsize=32)
 def get_papers_by_category(category: str = None, target_date: date = None) -> list[Paper]:
     """
     根据分类和日期获取论文
@@ -396,6 +922,97 @@ def get_papers_by_category(category: str = None, target_date: date = None) -> li
         session.close()
 
 
+def search_papers(query: str, category: str = None, limit: int = 50) -> list[tuple[Paper, str]]:
+    """
+    全文检索论文 (标题/中文标题/关键词/科普/深度分析)
+    返回按相关度排序的 [(论文, 高亮摘要HTML), ...]
+    """
+    session = Session()
+    try:
+        ranked = search.search_paper_ids(session, query, category=category, limit=limit)
+        if not ranked:
+            return []
+
+        papers = {p.id: p for p in session.query(Paper).filter(Paper.id.in_([pid for pid, _ in ranked]))}
+        results = []
+        for pid, _ in ranked:
+            p = papers.get(pid)
+            if p:
+                snippet = search.make_snippet(p, query)
+                session.expunge(p)
+                results.append((p, snippet))
+        return results
+    except Exception as e:
+        logger.error(f"全文检索失败 ({query}): {e}")
+        return []
+    finally:
+        session.close()
+
+
+def backfill_search_index(rebuild: bool = False) -> int:
+    """为尚未入检索库的已完成论文建立全文索引 (rebuild=True 时全部重建)"""
+    session = Session()
+    try:
+        return search.backfill_search_index(session, rebuild=rebuild)
+    except Exception as e:
+        # 不吞掉异常：索引只建了一部分时调用方 (流水线步骤、基准语料) 必须知道
+        logger.error(f"检索索引回填失败: {e}")
+        session.rollback()
+        raise
+    finally:
+        session.close()
+
+
+def get_similar_papers(paper_id: int, limit: int = 5) -> list[dict]:
+    """
+    相似论文推荐：读取离线构建的向量索引做 Top-K 余弦检索，不调用大模型
+    返回 [{'id', 'title', 'chinese_title', 'url', 'score'}, ...]
+    """
+    return get_similar_papers_for((paper_id,), limit)[paper_id]
+
+
+@cached(PAPERS, maxsize=64)
+def get_similar_papers_for(paper_ids: tuple[int, ...], limit: int = 5) -> dict[int, list[dict]]:
+    """
+    批量获取多篇论文的相似论文，返回 {paper_id: 相似论文列表}
+    向量检索是一次矩阵乘法 (只传入当前页的论文)，邻居的标题等信息一次 IN 查询，避免列表页逐篇查询
+    """
+    import vector_index
+
+    try:
+        neighbors = vector_index.get_index().similar_many(paper_ids, k=limit)
+    except Exception as e:
+        logger.error(f"相似论文检索失败 (Paper {list(paper_ids)}): {e}")
+        return {pid: [] for pid in paper_ids}
+
+    neighbor_ids = list({nid for found in neighbors.values() for nid, _ in found})
+    by_id = {}
+    session = Session()
+    try:
+        for i in range(0, len(neighbor_ids), 500):
+            rows = session.query(Paper.id, Paper.title, Paper.chinese_title, Paper.url) \
+                .filter(Paper.id.in_(neighbor_ids[i:i + 500]), Paper.batch_status == "completed")
+            by_id.update({r.id: r for r in rows})
+    finally:
+        session.close()
+    return {
+        pid: [{'id': nid, 'title': by_id[nid].title, 'chinese_title': by_id[nid].chinese_title,
+               'url': by_id[nid].url, 'score': score}
+              for nid, score in found if nid in by_id]
+        for pid, found in neighbors.items()
+    }
+
+
+def get_paper_full_text(paper_id: int) -> str:
+    """按需读取论文全文 (只在 AI 问答时使用，论文目录不缓存全文)"""
+    session = Session()
+    try:
+        return session.query(Paper.full_text_tmp).filter(Paper.id == paper_id).scalar() or ""
+    finally:
+        session.close()
+
+
+@cached(PAPERS)
 def get_earliest_paper_date() -> date:
     """获取数据库中最早的一篇论文日期"""
     session = Session()
@@ -410,6 +1027,7 @@ def get_earliest_paper_date() -> date:
         session.close()
 
 
+@cached(DONATIONS)
 def get_recent_donations(limit: int = 50) -> list[Donation]:
     """获取最近的打赏记录"""
     session = Session()
@@ -440,6 +1058,7 @@ def add_donation_record(email: str, amount: str, message: str = None, date_time:
         )
         session.add(new_donation)
         session.commit()
+        bump_version(DONATIONS)
         logger.info(f"新增打赏记录: {email} - {amount}")
         return True
     except Exception as e:
@@ -468,6 +1087,8 @@ def add_comment(user_email: str, paper_id: int, content: str) -> tuple[bool, str
         )
         session.add(new_comment)
         session.commit()
+        _refresh_score_safely(session, paper_id)
+        bump_version(ENGAGEMENT)
         logger.info(f"用户 {user_email} 评论了论文 {paper_id}")
         return True, "评论发布成功"
     except Exception as e:
@@ -478,6 +1099,7 @@ def add_comment(user_email: str, paper_id: int, content: str) -> tuple[bool, str
         session.close()
 
 
+@cached(ENGAGEMENT, maxsize=4096)
 def get_paper_comments(paper_id: int) -> list[dict]:
     """获取指定论文的评论列表 (按时间倒序)"""
     session = Session()
@@ -503,32 +1125,43 @@ def get_paper_comments(paper_id: int) -> list[dict]:
         session.close()
 
 
+@cached(ENGAGEMENT, maxsize=64)
+def get_comments_for_papers(paper_ids: tuple[int, ...]) -> dict[int, list[dict]]:
+    """批量获取多篇论文的评论 (一次 IN 查询，避免列表页逐篇查询)，返回 {paper_id: 评论列表}"""
+    from sqlalchemy.orm import joinedload
+    result = {pid: [] for pid in paper_ids}
+    session = Session()
+    try:
+        for i in range(0, len(paper_ids), 500):
+            comments = session.query(Comment) \
+                .options(joinedload(Comment.user)) \
+                .filter(Comment.paper_id.in_(paper_ids[i:i + 500])) \
+                .order_by(Comment.created_at.desc()) \
+                .all()
+            for c in comments:
+                result[c.paper_id].append({
+                    'user_email': c.user.email if c.user else 'Unknown',
+                    'content': c.content,
+                    'created_at': c.created_at
+                })
+        return result
+    finally:
+        session.close()
+
+
+@cached(PAPERS, ENGAGEMENT)
 def get_trending_papers(limit: int = 5) -> list[Paper]:
     """
     获取热门论文排行榜
-    算法：热度 = 收藏数 * 2 + 评论数 * 1
+    算法：热度 = Σ 权重 × 时间衰减 (收藏权重 2，评论权重 1，半衰期 TRENDING_HALF_LIFE_DAYS 天)
+    直接读取物化的 paper_scores 取 Top-K；没有热度分 (无收藏与评论) 的论文按 0 分排在后面
     """
     session = Session()
     try:
-        # 子查询：统计评论数
-        comment_counts = session.query(
-            Comment.paper_id,
-            func.count(Comment.id).label('c_count')
-        ).group_by(Comment.paper_id).subquery()
-
-        # 子查询：统计收藏数
-        fav_counts = session.query(
-            user_favorites.c.paper_id,
-            func.count(user_favorites.c.user_id).label('f_count')
-        ).group_by(user_favorites.c.paper_id).subquery()
-
-        # 关联查询并排序
-        # 注意：这里使用 outerjoin 因为有的论文可能没有评论或收藏
         papers = session.query(Paper) \
-            .outerjoin(comment_counts, Paper.id == comment_counts.c.paper_id) \
-            .outerjoin(fav_counts, Paper.id == fav_counts.c.paper_id) \
+            .outerjoin(PaperScore, PaperScore.paper_id == Paper.id) \
             .filter(Paper.batch_status == 'completed') \
-            .order_by((func.coalesce(fav_counts.c.f_count, 0) * 2 + func.coalesce(comment_counts.c.c_count, 0)).desc()) \
+            .order_by(func.coalesce(PaperScore.score, 0).desc()) \
             .limit(limit) \
             .all()
 
@@ -539,12 +1172,13 @@ def get_trending_papers(limit: int = 5) -> list[Paper]:
         session.close()
 
 def get_user_favorite_ids(email: str) -> set[int]:
-    """一次性获取用户收藏的所有论文 ID"""
+    """一次性获取用户收藏的所有论文 ID (只查询关联表的 paper_id 列)"""
     session = Session()
     try:
-        user = session.query(User).filter_by(email=email).first()
-        if user:
-            return {p.id for p in user.favorite_papers} # 返回 ID 集合
-        return set()
+        rows = session.query(user_favorites.c.paper_id) \
+            .join(User, User.id == user_favorites.c.user_id) \
+            .filter(User.email == email) \
+            .all()
+        return {r[0] for r in rows}
     finally:
         session.close()
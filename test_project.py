@@ -12,21 +12,42 @@ logging.basicConfig(
 )
 logger = logging.getLogger("ArxivMind-Test")
 
-from database import Session, Paper, User, VerificationCode
+from database import Session, Paper, User, VerificationCode, PaperKeyword, PaperScore, PipelineCheckpoint, get_utc_now, migrate
 from core_batch import get_semantic_scholar_free, call_qwen_ai_sync
+from search import remove_paper as remove_from_search_index
+from cache import bump_version, cache_stats, PAPERS
+from catalog import PaperCatalog
+from pipeline import PipelineRunner, Stage, StageQueue
+from query_stats import track, query_budget, QueryBudgetExceeded
 from services import (
     send_verification_code,
     verify_code,
     toggle_favorite,
     get_user_favorites,
+    get_user_favorite_count,
+    get_user_favorite_ids,
+    is_paper_favorited,
+    get_dashboard_stats,
+    get_all_categories,
+    get_papers_by_category,
+    get_trending_papers,
+    get_top_keywords,
+    backfill_paper_keywords,
+    refresh_daily_rollups,
+    get_daily_category_series,
+    search_papers,
+    backfill_search_index,
     send_daily_emails
 )
 
+# 测试前先显式建表/升级 (导入 database 不再自动执行 DDL)
+migrate()
+
 
 def test_database_robustness():
     """测试数据库：验证用户重复注册时的健壮性"""
     logger.info("=" * 50)
-    logger.info("[1/6] 测试数据库健壮性")
+    logger.info("[1/18] 测试数据库健壮性")
     logger.info("=" * 50)
 
     session = Session()
@@ -68,7 +89,7 @@ def test_database_robustness():
 def test_verification_code():
     """测试验证码功能"""
     logger.info("=" * 50)
-    logger.info("[2/6] 测试验证码系统")
+    logger.info("[2/18] 测试验证码系统")
     logger.info("=" * 50)
 
     session = Session()
@@ -115,7 +136,7 @@ def test_verification_code():
 def test_semantic_scholar_free():
     """测试免费版 Semantic Scholar API"""
     logger.info("=" * 50)
-    logger.info("[3/6] 测试 Semantic Scholar API")
+    logger.info("[3/18] 测试 Semantic Scholar API")
     logger.info("=" * 50)
 
     test_arxiv_id = "2305.16300"
@@ -132,7 +153,7 @@ def test_semantic_scholar_free():
 def test_expert_ai_prompt():
     """测试专家级提示词与 JSON 格式解析"""
     logger.info("=" * 50)
-    logger.info("[4/6] 测试 AI 分析功能")
+    logger.info("[4/18] 测试 AI 分析功能")
     logger.info("=" * 50)
 
     test_text = "This paper introduces a new method for scaling Large Language Models using MoE architecture..."
@@ -159,7 +180,7 @@ def test_expert_ai_prompt():
 def test_favorites():
     """测试收藏功能"""
     logger.info("=" * 50)
-    logger.info("[5/6] 测试收藏功能")
+    logger.info("[5/18] 测试收藏功能")
     logger.info("=" * 50)
 
     session = Session()
@@ -193,6 +214,21 @@ def test_favorites():
         if len(favorites) == 1:
             logger.info("✓ 获取收藏列表成功")
 
+        # 测试关联表直查接口 (数量 / ID 集合 / 是否收藏)
+        if get_user_favorite_count(test_email) == 1 \
+                and get_user_favorite_ids(test_email) == {paper_id} \
+                and is_paper_favorited(test_email, paper_id):
+            logger.info("✓ 收藏数量与 ID 集合查询成功")
+        else:
+            logger.error("❌ 收藏数量或 ID 集合与预期不符")
+
+        # 测试热度分：收藏后应增量写入 paper_scores
+        score = session.get(PaperScore, paper_id)
+        if score and score.favorite_count == 1:
+            logger.info("✓ 热度分增量更新成功")
+        else:
+            logger.error("❌ 收藏后未写入热度分")
+
         # 测试取消收藏
         success, is_fav, msg = toggle_favorite(test_email, paper_id)
         if success and not is_fav:
@@ -212,10 +248,830 @@ def test_favorites():
         session.close()
 
 
+def test_dashboard_stats():
+    """测试看板聚合统计 (数据库端 COUNT/SUM/GROUP BY)"""
+    logger.info("=" * 50)
+    logger.info("[6/18] 测试看板统计")
+    logger.info("=" * 50)
+
+    session = Session()
+    test_category = "测试领域-看板"
+
+    try:
+        before = get_dashboard_stats()
+
+        papers = [
+            Paper(title=f"看板测试论文 {i}", url=f"https://arxiv.org/test/dashboard/{i}",
+                  category=test_category, citation_count=10, batch_status="completed",
+                  keywords=" LLM ,Agent" if i == 0 else "llm")
+            for i in range(2)
+        ]
+        session.add_all(papers)
+        session.commit()
+        # 直接写库后需递增数据版本 (与流水线一致)，否则会读到缓存的旧统计
+        bump_version(PAPERS)
+
+        after = get_dashboard_stats()
+        distribution = dict(after['category_distribution'])
+
+        if after['total_papers'] - before['total_papers'] == 2 \
+                and after['total_citations'] - before['total_citations'] == 20 \
+                and distribution.get(test_category) == 2:
+            logger.info("✅ 看板统计测试通过")
+        else:
+            logger.error(f"❌ 看板统计与预期不符: {after}")
+
+        # 关键词倒排表：回填后按领域统计，大小写与空白应被统一
+        backfill_paper_keywords()
+        if get_top_keywords(category=test_category) == [("llm", 2), ("agent", 1)]:
+            logger.info("✅ 关键词索引统计测试通过")
+        else:
+            logger.error(f"❌ 关键词统计与预期不符: {get_top_keywords(category=test_category)}")
+
+        # 每日汇总：只重算今天，今天的该领域论文数应为 2
+        today = papers[0].created_at.date()
+        refresh_daily_rollups(since=today)
+        daily = {c: n for d, c, n in get_daily_category_series(today, today)}
+        if daily.get(test_category) == 2:
+            logger.info("✅ 每日汇总测试通过")
+        else:
+            logger.error(f"❌ 每日汇总与预期不符: {daily}")
+
+        # 创建十天后才完成分析的论文：增量刷新 (默认回看窗口) 也应计入其创建当天
+        from datetime import timedelta
+        late = Paper(title="看板测试论文 (延迟分析)", url="https://arxiv.org/test/dashboard/late",
+                     category=test_category, batch_status="completed",
+                     created_at=get_utc_now() - timedelta(days=10), completed_at=get_utc_now())
+        session.add(late)
+        session.commit()
+        papers.append(late)
+        late_day = late.created_at.date()
+        refresh_daily_rollups()
+        daily = {c: n for d, c, n in get_daily_category_series(late_day, late_day)}
+        if daily.get(test_category) == 1:
+            logger.info("✅ 延迟完成论文的每日汇总测试通过")
+        else:
+            logger.error(f"❌ 延迟完成论文未计入每日汇总: {daily}")
+
+        # 清理
+        session.query(PaperKeyword).filter(PaperKeyword.category == test_category).delete()
+        for p in papers:
+            session.delete(p)
+        session.commit()
+        refresh_daily_rollups(since=late_day)
+
+    except Exception as e:
+        logger.error(f"❌ 看板统计测试失败: {e}")
+        session.rollback()
+    finally:
+        session.close()
+
+
+def test_full_text_search():
+    """测试全文检索 (中文二元组切分 + 英文前缀匹配)"""
+    logger.info("=" * 50)
+    logger.info("[7/18] 测试全文检索")
+    logger.info("=" * 50)
+
+    session = Session()
+
+    try:
+        import search
+        papers = [Paper(
+            title=f"Zyxwv Retrieval For Testing {i}",
+            chinese_title="全文检索测试论文",
+            url=f"https://arxiv.org/test/search-{i}",
+            category="测试",
+            keywords="zyxwv, search",
+            popular_science="这是一篇用来验证龘靐检索的模拟论文。",
+            batch_status="completed"
+        ) for i in range(3)]
+        session.add_all(papers)
+        session.commit()
+
+        # 每块 1 篇：回填跨越多次提交时不能中断 (读游标与提交交错会导致 database is locked)
+        backfill_session = Session()
+        try:
+            indexed = search.backfill_search_index(backfill_session, batch_size=1)
+        finally:
+            backfill_session.close()
+        backfill_search_index()
+
+        cn_hits = [p.id for p, _ in search_papers("龘靐检索")]
+        en_hits = [p.id for p, _ in search_papers("zyxw")]
+        if indexed >= 3 and all(p.id in cn_hits and p.id in en_hits for p in papers):
+            logger.info("✅ 全文检索测试通过")
+        else:
+            logger.error(f"❌ 全文检索未命中测试论文: {indexed}, {cn_hits}, {en_hits}")
+
+        # 清理
+        for p in papers:
+            remove_from_search_index(session, p.id)
+            session.delete(p)
+        session.commit()
+
+    except Exception as e:
+        logger.error(f"❌ 全文检索测试失败: {e}")
+        session.rollback()
+    finally:
+        session.close()
+
+
+def test_vector_index():
+    """测试相似论文向量索引 (临时目录，哈希 TF-IDF，不访问数据库和大模型)"""
+    logger.info("=" * 50)
+    logger.info("[8/18] 测试向量索引")
+    logger.info("=" * 50)
+
+    import tempfile
+    from vector_index import VectorIndex, embed_papers
+
+    try:
+        papers = [
+            Paper(id=1, title="Sparse Mixture of Experts for LLM", keywords="moe, llm"),
+            Paper(id=2, title="Scaling Mixture of Experts Language Models", keywords="moe, scaling"),
+            Paper(id=3, title="Lane Detection for Autonomous Driving", keywords="driving, vision"),
+        ]
+        with tempfile.TemporaryDirectory() as tmp:
+            index = VectorIndex(path=tmp, backend="hash")
+            vectors, df_delta = embed_papers(papers[:2], index)
+            index.append([1, 2], vectors, df_delta)
+            # 增量追加
+            vectors, df_delta = embed_papers(papers[2:], index)
+            index.append([3], vectors, df_delta)
+
+            reloaded = VectorIndex(path=tmp, backend="hash")
+            top = reloaded.similar(1, k=2)
+            batch = reloaded.similar_many([1, 3, 99], k=2)
+            if reloaded.count == 3 and top and top[0][0] == 2 and batch[1] == top and len(batch[3]) == 2 \
+                    and batch[99] == []:
+                logger.info("✅ 向量索引测试通过")
+            else:
+                logger.error(f"❌ 相似论文结果与预期不符: {top}")
+
+    except Exception as e:
+        logger.error(f"❌ 向量索引测试失败: {e}")
+
+
+def test_email_outbox():
+    """测试发件箱投递 (本地 HTTP 服务模拟 Resend 批量发送接口)"""
+    logger.info("=" * 50)
+    logger.info("[9/18] 测试发件箱投递")
+    logger.info("=" * 50)
+
+    import threading
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    import resend
+    import mailer
+    from database import EmailOutbox, EmailBody
+
+    requests_seen = []
+
+    class FakeResend(BaseHTTPRequestHandler):
+        def do_POST(self):
+            payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            emails = payload if isinstance(payload, list) else [payload]
+            requests_seen.append((self.headers.get("Idempotency-Key"), len(emails)))
+            recipients = " ".join(to for e in emails for to in e["to"])
+            limited = {"name": "rate_limit_exceeded", "message": "Too many requests", "statusCode": 429}
+            if "invalid" in recipients:
+                # 无效地址：整个批次被拒绝
+                body, code = {"name": "validation_error", "message": "Invalid `to` field", "statusCode": 422}, 422
+            elif "throttled" in recipients:
+                body, code = limited, 429
+            elif len(requests_seen) == 1:
+                # 第一次请求模拟限流，验证重试
+                body, code = limited, 429
+            elif isinstance(payload, list):
+                body, code = {"data": [{"id": f"msg_{i}"} for i in range(len(payload))]}, 200
+            else:
+                body, code = {"id": "msg_single"}, 200
+            data = json.dumps(body).encode()
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    server = HTTPServer(("127.0.0.1", 0), FakeResend)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    old_url, old_key, old_backoff = resend.api_url, resend.api_key, mailer.MAILER_BACKOFF_SECONDS
+    resend.api_url, resend.api_key = f"http://127.0.0.1:{server.server_port}", "re_test"
+    # 缩短退避时间：同一次投递应等到重试时间后把限流的邮件重新发出
+    mailer.MAILER_BACKOFF_SECONDS = 0.2
+
+    session = Session()
+    keys = [f"test-outbox:{i}" for i in range(3)]
+    mixed_keys = ["test-outbox:ok-0", "test-outbox:invalid", "test-outbox:ok-1"]
+    all_keys = keys + mixed_keys + ["test-outbox:throttled"]
+    try:
+        for i, key in enumerate(keys):
+            mailer.enqueue_email(session, None, f"outbox_{i}@example.com", "测试", "<p>同一份正文</p>", key)
+        duplicated = mailer.enqueue_email(session, None, "outbox_0@example.com", "测试", "<p>同一份正文</p>", keys[0])
+        session.commit()
+
+        result = mailer.deliver_outbox(workers=2, rate_limit=100)
+
+        rows = session.query(EmailOutbox).filter(EmailOutbox.idempotency_key.in_(keys)).all()
+        if (not duplicated and result["sent"] == 3 and result["failed"] == 0 and len(requests_seen) == 2
+                and all(r.status == "sent" and r.attempts == 2 and r.provider_id for r in rows)
+                and all(key for key, _ in requests_seen)):
+            logger.info("✅ 发件箱投递测试通过")
+        else:
+            logger.error(f"❌ 发件箱状态与预期不符: {[(r.status, r.attempts) for r in rows]}, 请求: {requests_seen}")
+
+        # 批次中有一个无效地址：整批被拒绝后逐封重发，只有无效地址失败
+        for key in mixed_keys:
+            mailer.enqueue_email(session, None, f"outbox_{key.rsplit(':', 1)[1]}@example.com", "测试", "<p>同一份正文</p>", key)
+        session.commit()
+        mixed = mailer.deliver_outbox(workers=2, rate_limit=100)
+        statuses = dict(session.query(EmailOutbox.idempotency_key, EmailOutbox.status)
+                        .filter(EmailOutbox.idempotency_key.in_(mixed_keys)))
+        if mixed["sent"] == 2 and mixed["failed"] == 1 \
+                and statuses == {"test-outbox:ok-0": "sent", "test-outbox:invalid": "failed", "test-outbox:ok-1": "sent"}:
+            logger.info("✓ 无效地址只影响自身")
+        else:
+            logger.error(f"❌ 无效地址的批次处理不符合预期: {mixed} / {statuses}")
+
+        # 退避时间超出投递截止时间：不再等待，邮件留待下次投递
+        mailer.MAILER_BACKOFF_SECONDS = 30
+        mailer.enqueue_email(session, None, "outbox_throttled@example.com", "测试", "<p>同一份正文</p>",
+                             "test-outbox:throttled")
+        session.commit()
+        throttled = mailer.deliver_outbox(workers=2, rate_limit=100, retry_deadline=1)
+        row = session.query(EmailOutbox).filter(EmailOutbox.idempotency_key == "test-outbox:throttled").one()
+        if throttled["sent"] == throttled["failed"] == 0 and throttled["seconds"] < 5 \
+                and row.status == "pending" and row.attempts == 1:
+            logger.info("✓ 超过投递截止时间后不再等待重试")
+        else:
+            logger.error(f"❌ 投递截止时间未生效: {throttled} / {row.status}")
+
+        for r in session.query(EmailOutbox).filter(EmailOutbox.idempotency_key.in_(all_keys)):
+            session.delete(r)
+        session.query(EmailBody).filter(
+            ~EmailBody.body_hash.in_(session.query(EmailOutbox.body_hash))).delete(synchronize_session=False)
+        session.commit()
+
+    except Exception as e:
+        logger.error(f"❌ 发件箱投递测试失败: {e}")
+        session.rollback()
+    finally:
+        session.close()
+        server.shutdown()
+        resend.api_url, resend.api_key = old_url, old_key
+        mailer.MAILER_BACKOFF_SECONDS = old_backoff
+
+
+def test_read_cache():
+    """测试读缓存：重复读取命中缓存，数据版本递增或写路径操作后失效"""
+    logger.info("=" * 50)
+    logger.info("[10/18] 测试读缓存")
+    logger.info("=" * 50)
+
+    session = Session()
+    test_email = "test_cache@example.com"
+    test_category = "测试领域-缓存"
+
+    try:
+        get_all_categories()
+        hits = cache_stats()["get_all_categories"]["hits"]
+        categories = get_all_categories()
+        if cache_stats()["get_all_categories"]["hits"] == hits + 1 and test_category not in categories:
+            logger.info("✓ 重复读取命中缓存")
+        else:
+            logger.error(f"❌ 缓存未命中: {cache_stats()['get_all_categories']}")
+
+        user = User(email=test_email)
+        paper = Paper(title="缓存测试论文", url="https://arxiv.org/test/cache",
+                      category=test_category, batch_status="completed")
+        session.add_all([user, paper])
+        session.commit()
+
+        if test_category not in get_all_categories():
+            logger.info("✓ 版本未变时返回缓存结果")
+        bump_version(PAPERS)
+        if test_category in get_all_categories():
+            logger.info("✓ 数据版本递增后缓存失效")
+        else:
+            logger.error("❌ 数据版本递增后仍返回旧结果")
+
+        # 收藏写路径会递增版本，热门榜单应立即反映
+        get_trending_papers(limit=50)
+        toggle_favorite(test_email, paper.id)
+        if paper.id in [p.id for p in get_trending_papers(limit=50)]:
+            logger.info("✅ 读缓存测试通过")
+        else:
+            logger.error("❌ 收藏后热门榜单仍为旧结果")
+
+        # 清理
+        toggle_favorite(test_email, paper.id)
+        session.query(PaperScore).filter(PaperScore.paper_id == paper.id).delete()
+        session.delete(paper)
+        session.delete(user)
+        session.commit()
+        bump_version(PAPERS)
+
+    except Exception as e:
+        logger.error(f"❌ 读缓存测试失败: {e}")
+        session.rollback()
+    finally:
+        session.close()
+
+
+def test_paper_catalog():
+    """测试论文目录：内存筛选与按数据版本增量刷新"""
+    logger.info("=" * 50)
+    logger.info("[11/18] 测试论文目录")
+    logger.info("=" * 50)
+
+    session = Session()
+    test_category = "测试领域-目录"
+
+    try:
+        catalog = PaperCatalog()
+        before = len(catalog)
+
+        paper = Paper(title="目录测试论文", url="https://arxiv.org/test/catalog", category=test_category,
+                      batch_status="completed", completed_at=get_utc_now())
+        session.add(paper)
+        session.commit()
+        bump_version(PAPERS)
+
+        day = paper.created_at.date()
+        records = catalog.papers(category=test_category, target_date=day)
+        if len(catalog) == before + 1 and [r.id for r in records] == [paper.id] \
+                and catalog.count(category=test_category) == 1 and test_category in catalog.categories():
+            logger.info("✓ 增量刷新与内存筛选成功")
+        else:
+            logger.error(f"❌ 论文目录与预期不符: {len(catalog)} / {[r.id for r in records]}")
+
+        # 引用数更新 (不重新分析) 也应被增量刷新读到
+        paper.citation_count = 42
+        session.commit()
+        bump_version(PAPERS)
+        if catalog.get(paper.id).citation_count == 42:
+            logger.info("✓ 引用数更新后增量刷新成功")
+        else:
+            logger.error("❌ 引用数更新后目录仍为旧数据")
+
+        # 同一版本窗口内删除一篇、新增一篇 (数量不变)：删除无法增量感知，应触发全量重建
+        replacement = Paper(title="目录测试论文 (新)", url="https://arxiv.org/test/catalog-new", category=test_category,
+                            batch_status="completed", completed_at=get_utc_now())
+        session.delete(paper)
+        session.add(replacement)
+        session.commit()
+        bump_version(PAPERS)
+        if len(catalog) == before + 1 and catalog.get(paper.id) is None \
+                and [r.id for r in catalog.papers(category=test_category)] == [replacement.id]:
+            logger.info("✓ 删除与新增同时发生时目录已重建")
+        else:
+            logger.error("❌ 删除论文后目录未重建")
+
+        session.delete(replacement)
+        session.commit()
+        bump_version(PAPERS)
+        if len(catalog) == before and catalog.count(category=test_category) == 0:
+            logger.info("✅ 论文目录测试通过")
+        else:
+            logger.error("❌ 删除论文后目录未重建")
+
+    except Exception as e:
+        logger.error(f"❌ 论文目录测试失败: {e}")
+        session.rollback()
+    finally:
+        session.close()
+
+
+def test_pipeline_runner():
+    """测试流水线编排：流式衔接、失败只阻断下游、同批次重跑跳过已完成步骤"""
+    logger.info("=" * 50)
+    logger.info("[12/18] 测试流水线编排")
+    logger.info("=" * 50)
+
+    run_key = f"test-{time.time()}"
+    calls = {"produce": 0, "consume": 0, "broken": 0}
+
+    def make_stages(fail: bool):
+        items = StageQueue("测试队列")
+
+        def produce():
+            calls["produce"] += 1
+            for i in range(5):
+                items.put(i)
+            return 5
+
+        def consume():
+            calls["consume"] += 1
+            return sum(1 for _ in items)
+
+        def broken():
+            calls["broken"] += 1
+            if fail:
+                raise RuntimeError("模拟故障")
+            return 1
+
+        return [
+            Stage("produce", produce, output=items),
+            Stage("consume", consume, upstream=("produce",)),
+            Stage("broken", broken, after=("consume",)),
+            Stage("after_broken", lambda: 1, after=("broken",)),
+            Stage("independent", lambda: 1, after=("produce",)),
+        ]
+
+    session = Session()
+    try:
+        first = PipelineRunner(make_stages(fail=True), run_key=run_key).run()
+        statuses = {name: r["status"] for name, r in first.items()}
+        if first["consume"]["items"] == 5 and statuses["broken"] == "failed" \
+                and statuses["after_broken"] == "blocked" and statuses["independent"] == "done":
+            logger.info("✓ 流式衔接与失败隔离成功")
+        else:
+            logger.error(f"❌ 流水线首次运行结果与预期不符: {first}")
+
+        second = PipelineRunner(make_stages(fail=False), run_key=run_key).run()
+        statuses = {name: r["status"] for name, r in second.items()}
+        if statuses["produce"] == "resumed" and statuses["broken"] == "done" \
+                and statuses["after_broken"] == "done" and calls["produce"] == 1 and calls["broken"] == 2:
+            logger.info("✅ 流水线编排测试通过")
+        else:
+            logger.error(f"❌ 重跑未按检查点恢复: {second}")
+
+        session.query(PipelineCheckpoint).filter(PipelineCheckpoint.run_key == run_key).delete()
+        session.commit()
+
+    except Exception as e:
+        logger.error(f"❌ 流水线编排测试失败: {e}")
+        session.rollback()
+    finally:
+        session.close()
+
+
+def test_daily_pipeline_sqlite():
+    """测试完整的每日流水线：子进程中对一个非空的临时 SQLite 库 (不抓取新论文) 运行全部步骤，写库步骤不能重叠"""
+    logger.info("=" * 50)
+    logger.info("[13/18] 测试每日流水线 (SQLite)")
+    logger.info("=" * 50)
+
+    import subprocess
+    import sys
+    import tempfile
+
+    script = """
+import json, os, tempfile
+from benchmarks.synthetic import use_temp_database, build_corpus
+use_temp_database("pipeline_test")
+os.environ["METRICS_DIR"] = tempfile.mkdtemp()
+build_corpus(1500, 50, indexes=False)
+import core_batch
+core_batch.iter_new_papers = lambda: iter(())
+from sqlalchemy import func, text
+from database import Session, Paper, PaperKeyword, PipelineCheckpoint
+from pipeline import run_daily_pipeline
+results = run_daily_pipeline(run_key="test", force=True)
+session = Session()
+print(json.dumps({
+    "statuses": {name: r["status"] for name, r in results.items()},
+    "completed": session.query(func.count(Paper.id)).filter(Paper.batch_status == "completed").scalar(),
+    "search": session.execute(text("SELECT count(*) FROM paper_search")).scalar(),
+    "keywords": session.query(func.count(func.distinct(PaperKeyword.paper_id))).scalar(),
+    "windows": {c.stage: [c.started_at.timestamp(), c.finished_at.timestamp()] for c in session.query(PipelineCheckpoint)},
+}))
+"""
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            env = {**os.environ, "RESEND_API_KEY": "", "PYTHONPATH": os.path.dirname(os.path.abspath(__file__))}
+            proc = subprocess.run([sys.executable, "-c", script], cwd=tmp, env=env, capture_output=True,
+                                  text=True, timeout=300)
+        if proc.returncode != 0:
+            logger.error(f"❌ 每日流水线运行失败: {proc.stderr[-2000:]}")
+            return
+        result = json.loads(proc.stdout.strip().splitlines()[-1])
+        writers = sorted(result["windows"][s] for s in ("escalate", "backfill", "digest", "rollups"))
+        overlapping = any(later[0] < earlier[1] for earlier, later in zip(writers, writers[1:]))
+        if all(s == "done" for s in result["statuses"].values()) \
+                and result["search"] == result["keywords"] == result["completed"] == 1500 and not overlapping:
+            logger.info("✅ 每日流水线测试通过")
+        else:
+            logger.error(f"❌ 每日流水线结果不符合预期: {result}")
+    except Exception as e:
+        logger.error(f"❌ 每日流水线测试失败: {e}")
+
+
+def test_query_stats():
+    """测试 SQL 查询统计：重复语句告警 (N+1)、慢查询执行计划与查询预算"""
+    logger.info("=" * 50)
+    logger.info("[14/18] 测试 SQL 查询统计")
+    logger.info("=" * 50)
+
+    import query_stats
+    session = Session()
+    papers = []
+    try:
+        papers = [Paper(title=f"查询统计测试 {i}", category="测试领域", batch_status="completed") for i in range(12)]
+        session.add_all(papers)
+        session.commit()
+        ids = [p.id for p in papers]
+        session.expunge_all()
+
+        # 逐篇查询：同一语句指纹执行 12 次，应被识别为 N+1
+        with track("test_n_plus_one") as stats:
+            for paper_id in ids:
+                session.query(Paper).filter(Paper.id == paper_id).first()
+        if stats.queries == 12 and stats.repeated() and stats.repeated()[0][1] == 12:
+            logger.info("✓ 重复语句指纹识别成功")
+        else:
+            logger.error(f"❌ 重复语句统计不符合预期: {stats.summary()}")
+
+        try:
+            with query_budget(3):
+                for paper_id in ids:
+                    session.query(Paper).filter(Paper.id == paper_id).first()
+            logger.error("❌ 超出查询预算未报错")
+        except QueryBudgetExceeded:
+            logger.info("✓ 查询预算生效")
+
+        # 列表页读取必须是常数条查询
+        bump_version(PAPERS)
+        with query_budget(2, "get_papers_by_category"):
+            get_papers_by_category()
+
+        # 列表页的相似论文：整页一次取回 (临时向量索引)
+        import tempfile
+        import vector_index
+        from services import get_similar_papers_for
+        shared_index = vector_index._index
+        try:
+            with tempfile.TemporaryDirectory() as tmp:
+                vector_index._index = vector_index.VectorIndex(path=tmp, backend="hash")
+                vectors, df_delta = vector_index.embed_papers(papers, vector_index._index)
+                vector_index._index.append(ids, vectors, df_delta)
+                bump_version(PAPERS)
+                with query_budget(2, "get_similar_papers_for"):
+                    similar = get_similar_papers_for(tuple(ids), limit=3)
+        finally:
+            vector_index._index = shared_index
+        if not all(len(similar[pid]) == 3 for pid in ids):
+            logger.error(f"❌ 批量相似论文结果不符合预期: {similar}")
+
+        threshold = query_stats.SLOW_QUERY_MS
+        query_stats.SLOW_QUERY_MS = 0
+        try:
+            with track("test_slow") as stats:
+                session.query(Paper).filter(Paper.category == "测试领域", Paper.title.like("查询统计%")).count()
+        finally:
+            query_stats.SLOW_QUERY_MS = threshold
+        if stats.slow and stats.slow[0]["plan"]:
+            logger.info("✅ SQL 查询统计测试通过")
+        else:
+            logger.error(f"❌ 慢查询未记录执行计划: {stats.slow}")
+
+    except QueryBudgetExceeded:
+        # 列表页回退为 N+1 查询时测试必须失败
+        raise
+    except Exception as e:
+        logger.error(f"❌ SQL 查询统计测试失败: {e}")
+        session.rollback()
+    finally:
+        session.query(Paper).filter(Paper.id.in_([p.id for p in papers if p.id])).delete()
+        session.commit()
+        session.close()
+
+
+def test_profiling():
+    """测试性能剖析：采样模式输出折叠栈，cProfile 模式输出 pstats，未开启的作用域不剖析"""
+    logger.info("=" * 50)
+    logger.info("[15/18] 测试性能剖析")
+    logger.info("=" * 50)
+
+    import pstats
+    import tempfile
+    import profiling
+
+    def busy_loop():
+        deadline = time.perf_counter() + 0.2
+        while time.perf_counter() < deadline:
+            sum(range(1000))
+
+    saved = profiling.PROFILE, profiling.PROFILE_MODE, profiling.PROFILE_DIR
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            profiling.PROFILE, profiling.PROFILE_DIR = ["stage"], tmp
+
+            profiling.PROFILE_MODE = "sample"
+            with profiling.profile("stage:test") as sampled:
+                busy_loop()
+            with open(sampled.path, encoding="utf-8") as f:
+                folded = f.read()
+
+            profiling.PROFILE_MODE = "cprofile"
+            with profiling.profile("stage:test") as traced:
+                busy_loop()
+            functions = {func[2] for func in pstats.Stats(traced.path).stats}
+
+            with profiling.profile("page:test") as skipped:
+                pass
+
+        if "busy_loop" in folded and "busy_loop" in functions and skipped is None:
+            logger.info("✅ 性能剖析测试通过")
+        else:
+            logger.error(f"❌ 性能剖析结果不符合预期: {folded[:200]} / {skipped}")
+    except Exception as e:
+        logger.error(f"❌ 性能剖析测试失败: {e}")
+    finally:
+        profiling.PROFILE, profiling.PROFILE_MODE, profiling.PROFILE_DIR = saved
+
+
+def test_reanalysis():
+    """测试重新分析计划：只挑出提示词版本或输入变化的论文，按热度排序并受 token 预算约束"""
+    logger.info("=" * 50)
+    logger.info("[16/18] 测试重新分析计划")
+    logger.info("=" * 50)
+
+    import reanalysis
+    from core_batch import ANALYSIS_PROMPT_VERSION, ANALYSIS_MODEL, EXTRACTION_VERSION, analysis_input_hash
+
+    session = Session()
+    ts = int(time.time())
+    papers = []
+    try:
+        for i, (version, text, stored_text) in enumerate([
+            (ANALYSIS_PROMPT_VERSION, "unchanged body", "unchanged body"),
+            ("v0", "old prompt body", "old prompt body"),
+            (ANALYSIS_PROMPT_VERSION, "re-extracted body", "original body"),
+        ]):
+            title = f"Reanalysis Test {i} {ts}"
+            papers.append(Paper(
+                title=title, url=f"https://arxiv.org/abs/reanalysis-{ts}-{i}", batch_status="completed",
+                completed_at=get_utc_now(), full_text_tmp=text, analysis_json={"category": "其他"},
+                analysis_prompt_version=version, analysis_model=ANALYSIS_MODEL, extraction_version=EXTRACTION_VERSION,
+                analysis_input_hash=analysis_input_hash(title, stored_text),
+            ))
+        session.add_all(papers)
+        session.flush()
+        # 过期的两篇排在最前：热度更高的优先
+        session.add_all([PaperScore(paper_id=papers[1].id, score=1e9), PaperScore(paper_id=papers[2].id, score=1e9 + 1)])
+        session.commit()
+        ids = [p.id for p in papers]
+
+        full = reanalysis.plan()
+        planned = {item.paper_id: item.reasons for item in full.queued if item.paper_id in ids}
+        first = full.queued[0]
+        budgeted = reanalysis.plan(budget_tokens=first.input_tokens + first.output_tokens)
+        queued = reanalysis.queue(budgeted)
+        session.expire_all()
+        reasons = {p.id: p.reanalysis_reason for p in session.query(Paper).filter(Paper.id.in_(ids))}
+
+        if (planned == {ids[1]: ["prompt"], ids[2]: ["input"]} and first.paper_id == ids[2]
+                and [item.paper_id for item in budgeted.queued] == [ids[2]] and queued == 1
+                and reasons == {ids[0]: None, ids[1]: None, ids[2]: "input"}):
+            logger.info(f"✅ 重新分析计划测试通过 ({budgeted.report()})")
+        else:
+            logger.error(f"❌ 重新分析计划不符合预期: {planned} / {reasons}")
+    except Exception as e:
+        logger.error(f"❌ 重新分析计划测试失败: {e}")
+        session.rollback()
+    finally:
+        ids = [p.id for p in papers if p.id]
+        session.query(PaperScore).filter(PaperScore.paper_id.in_(ids)).delete(synchronize_session=False)
+        session.query(Paper).filter(Paper.id.in_(ids)).delete(synchronize_session=False)
+        session.commit()
+        session.close()
+
+
+def test_triage_cascade():
+    """
+    测试两级分析：低相关度论文只做初筛，被收藏后排队并升级为深度分析 (深度分析用桩函数代替大模型)；
+    初筛论文不进入每日推送，升级后才推送一次；升级后论文浏览页 (AppTest) 不再显示初筛提示，
+    向量索引 (临时目录) 重新向量化该论文
+    """
+    logger.info("=" * 50)
+    logger.info("[17/18] 测试两级分析")
+    logger.info("=" * 50)
+
+    import tempfile
+    import numpy as np
+    from streamlit.testing.v1 import AppTest
+    import core_batch
+    import reanalysis
+    import vector_index
+    from database import EmailOutbox, EmailBody, DigestDelivery
+    from services import enqueue_daily_digests
+
+    def fake_full_analysis(paper_id, title, text):
+        return {"category": "AI Agent/智能体", "popular_science": "深度分析结果", "keywords": "agent, planning"}
+
+    def digest_html(user_id: int) -> str:
+        """构建每日推送，返回该用户本次入队邮件的正文"""
+        before = {i for (i,) in session.query(EmailOutbox.id).filter(EmailOutbox.user_id == user_id)}
+        enqueue_daily_digests()
+        rows = session.query(EmailOutbox.id, EmailBody.html) \
+            .join(EmailBody, EmailBody.body_hash == EmailOutbox.body_hash).filter(EmailOutbox.user_id == user_id)
+        return "".join(html for i, html in rows if i not in before)
+
+    def triage_notices(page) -> int:
+        page.run()
+        return sum("只完成了初筛" in info.value for info in page.info)
+
+    saved = core_batch.TRIAGE_MODEL, core_batch.TRIAGE_THRESHOLD, core_batch.analyze_single_paper
+    core_batch.TRIAGE_MODEL, core_batch.TRIAGE_THRESHOLD = "local", 0.5
+    core_batch.analyze_single_paper = fake_full_analysis
+    shared_index, index_dir = vector_index._index, tempfile.TemporaryDirectory()
+    vector_index._index = vector_index.VectorIndex(path=index_dir.name, backend="hash")
+
+    session = Session()
+    ts = int(time.time())
+    test_email = f"test_triage_{ts}@example.com"
+    papers = [
+        Paper(title=f"Planning Agents with Tool Use {ts}", url=f"https://arxiv.org/abs/triage-{ts}-0",
+              abstract="A multi-agent planning framework where a language model agent learns tool use.",
+              full_text_tmp="full text", batch_status="pending"),
+        Paper(title=f"Soil Moisture Survey {ts}", url=f"https://arxiv.org/abs/triage-{ts}-1",
+              abstract="We survey soil moisture measurements in farmland.",
+              full_text_tmp="full text", batch_status="pending"),
+    ]
+    try:
+        user = User(email=test_email, is_subscribed=True)
+        session.add(user)
+        session.add_all(papers)
+        session.commit()
+        relevant, offtopic = [p.id for p in papers]
+        user_id = user.id
+
+        stored = [core_batch.analyze_and_store(core_batch.load_analysis_task(session, p)) for p in papers]
+        session.expire_all()
+        tiers = [(p.analysis_tier, p.batch_status) for p in papers]
+        completed_at = papers[1].completed_at
+        bump_version(PAPERS)
+        vector_index.build_similarity_index()
+        triage_vector = vector_index._index.vector_of(offtopic).copy()
+        first_digest = digest_html(user_id)
+
+        page = AppTest.from_string(
+            "from views.papers import show_paper_list\nshow_paper_list()", default_timeout=60)
+        page.session_state["user_email"] = test_email
+        notices_before = triage_notices(page)
+
+        toggle_favorite(test_email, offtopic)
+        session.expire_all()
+        queued_reason = papers[1].reanalysis_reason
+        escalated = reanalysis.run_queued(reason="favorited")
+        session.expire_all()
+        notices_after = triage_notices(page)
+        neighbors = [pid for pid, _ in vector_index._index.similar(relevant, k=50)]
+        second_digest = digest_html(user_id)
+
+        if (stored == [True, True] and tiers == [("full", "completed"), ("triage", "completed")]
+                and queued_reason == "favorited" and escalated == 1
+                and papers[1].analysis_tier == "full" and papers[1].reanalysis_reason is None
+                and papers[1].popular_science == "深度分析结果" and papers[1].completed_at > completed_at):
+            logger.info("✓ 初筛论文被收藏后升级为深度分析")
+        else:
+            logger.error(f"❌ 两级分析结果不符合预期: {tiers} / {queued_reason} / {papers[1].analysis_tier}")
+        if (papers[0].url in first_digest and papers[1].url not in first_digest
+                and papers[1].url in second_digest and papers[0].url not in second_digest):
+            logger.info("✓ 初筛论文不推送，升级后推送一次")
+        else:
+            logger.error("❌ 初筛论文的推送不符合预期")
+        if (notices_before == 1 and notices_after == 0
+                and not np.allclose(triage_vector, vector_index._index.vector_of(offtopic))
+                and neighbors.count(offtopic) == 1 and not page.exception):
+            logger.info("✅ 两级分析测试通过")
+        else:
+            logger.error(f"❌ 升级后页面或向量未刷新: 初筛提示 {notices_before} -> {notices_after}, "
+                         f"相似论文 {neighbors}, 异常 {page.exception}")
+    except Exception as e:
+        logger.error(f"❌ 两级分析测试失败: {e}")
+        session.rollback()
+    finally:
+        core_batch.TRIAGE_MODEL, core_batch.TRIAGE_THRESHOLD, core_batch.analyze_single_paper = saved
+        vector_index._index = shared_index
+        index_dir.cleanup()
+        ids = [p.id for p in papers if p.id]
+        if papers[1].id:
+            toggle_favorite(test_email, papers[1].id)
+        for pid in ids:
+            remove_from_search_index(session, pid)
+        session.query(PaperKeyword).filter(PaperKeyword.paper_id.in_(ids)).delete(synchronize_session=False)
+        session.query(PaperScore).filter(PaperScore.paper_id.in_(ids)).delete(synchronize_session=False)
+        session.query(Paper).filter(Paper.id.in_(ids)).delete(synchronize_session=False)
+        session.query(EmailOutbox).filter(EmailOutbox.to_email == test_email).delete(synchronize_session=False)
+        session.query(EmailBody).filter(
+            ~EmailBody.body_hash.in_(session.query(EmailOutbox.body_hash))).delete(synchronize_session=False)
+        session.query(DigestDelivery).filter(
+            DigestDelivery.user_id.in_(session.query(User.id).filter(User.email == test_email))
+        ).delete(synchronize_session=False)
+        session.query(User).filter(User.email == test_email).delete(synchronize_session=False)
+        session.commit()
+        session.close()
+
+
 def test_email_service():
     """测试邮件发送功能"""
     logger.info("=" * 50)
-    logger.info("[6/6] 测试邮件服务")
+    logger.info("[18/18] 测试邮件服务")
     logger.info("=" * 50)
 
     if not os.getenv("RESEND_API_KEY"):
@@ -237,6 +1093,7 @@ def test_email_service():
             category="测试领域",
             popular_science="这是一篇 AI 生成的模拟科普，用于验证邮件渲染。",
             batch_status="completed",
+            completed_at=get_utc_now(),
             url="https://arxiv.org/abs/test"
         )
         session.add(mock_paper)
@@ -277,6 +1134,18 @@ def run_all_tests():
     test_semantic_scholar_free()
     test_expert_ai_prompt()
     test_favorites()
+    test_dashboard_stats()
+    test_full_text_search()
+    test_vector_index()
+    test_email_outbox()
+    test_read_cache()
+    test_paper_catalog()
+    test_pipeline_runner()
+    test_daily_pipeline_sqlite()
+    test_query_stats()
+    test_profiling()
+    test_reanalysis()
+    test_triage_cascade()
     test_email_service()
 
     logger.info("")
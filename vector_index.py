@@ -0,0 +1,303 @@
+"""
+论文向量索引 ("相似论文"推荐)
+- 离线阶段：分析完成后为论文生成向量，增量追加到内存映射矩阵 (vectors.f32) 与 ID 表 (ids.i64)；
+  重新分析 (含初筛升级) 过的论文按 papers.analyzed_at 找出并重新向量化
+- 在线查询：读取映射矩阵做一次矩阵乘法 + argpartition 取 Top-K 余弦相似度，不调用大模型
+向量来源 (EMBEDDING_BACKEND)：
+- hash (默认)：特征哈希 TF-IDF，纯 NumPy，本地即可运行
+- openai：复用 DashScope 的 OpenAI 兼容客户端调用 embedding 模型
+"""
+import json
+import os
+import threading
+import zlib
+from datetime import datetime
+
+import numpy as np
+
+from database import logger
+from search import tokenize, paper_fields
+
+VECTOR_DIM = int(os.getenv("VECTOR_DIM", "512"))
+VECTOR_INDEX_DIR = os.getenv("VECTOR_INDEX_DIR", "vector_index")
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "hash")
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "text-embedding-v3")
+
+# 标题与关键词比正文更能代表论文主题，构建向量时重复计入
+TITLE_REPEAT, KEYWORD_REPEAT = 2, 3
+
+
+def paper_tokens(paper) -> list[str]:
+    """论文参与向量化的词序列 (复用全文检索的中英文切词)"""
+    title, keywords, body = paper_fields(paper)
+    return tokenize(title) * TITLE_REPEAT + tokenize(keywords) * KEYWORD_REPEAT + tokenize(body)
+
+
+def _bucket(token: str, dim: int) -> tuple[int, float]:
+    """稳定哈希 (跨进程一致)：返回 (维度下标, 符号)"""
+    h = zlib.crc32(token.encode("utf-8"))
+    return h % dim, (1.0 if (h >> 31) & 1 else -1.0)
+
+
+def hashed_term_counts(token_lists: list[list[str]], dim: int = VECTOR_DIM) -> np.ndarray:
+    """把每篇文档的词序列哈希成 (n, dim) 的带符号词频矩阵"""
+    counts = np.zeros((len(token_lists), dim), dtype=np.float32)
+    for row, tokens in enumerate(token_lists):
+        for token in tokens:
+            idx, sign = _bucket(token, dim)
+            counts[row, idx] += sign
+    return counts
+
+
+def hashed_tfidf(counts: np.ndarray, df: np.ndarray, n_docs: int) -> np.ndarray:
+    """对数词频 × 平滑 IDF，再按行 L2 归一化"""
+    tf = np.sign(counts) * np.log1p(np.abs(counts))
+    idf = np.log((1 + n_docs) / (1 + df)) + 1.0
+    vectors = tf * idf.astype(np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (vectors / norms).astype(np.float32)
+
+
+def embed_with_client(texts: list[str], dim: int = VECTOR_DIM, batch_size: int = 10) -> np.ndarray:
+    """调用 OpenAI 兼容的 embedding 接口 (DashScope 单次最多 10 条)"""
+    from core_batch import get_llm_client
+
+    client = get_llm_client()
+    vectors = []
+    for i in range(0, len(texts), batch_size):
+        resp = client.embeddings.create(
+            model=EMBEDDING_MODEL,
+            input=[t[:8000] for t in texts[i:i + batch_size]],
+            dimensions=dim
+        )
+        vectors.extend(item.embedding for item in resp.data)
+    matrix = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+class VectorIndex:
+    """
+    只追加的向量索引：
+    vectors.f32 (count × dim, float32 行主序) / ids.i64 / df.f64 (哈希桶文档频次) / meta.json
+    meta.json 最后写入 (原子替换)，其中的 count 是唯一可信的行数，
+    因此追加到一半崩溃的残留数据会在下次追加前被截断。
+    重新向量化的论文追加新行，同一 ID 以最后一行为准，旧行不再参与检索；
+    meta.json 中的 analyzed_at 记录已向量化到的分析时间。
+    """
+
+    def __init__(self, path: str = VECTOR_INDEX_DIR, dim: int = VECTOR_DIM, backend: str = EMBEDDING_BACKEND):
+        self.path = path
+        self.dim = dim
+        self.backend = backend
+        self.count = 0
+        self.n_docs = 0
+        self.df = np.zeros(dim, dtype=np.float64)
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.vectors = np.zeros((0, dim), dtype=np.float32)
+        self.analyzed_at = None
+        self._positions = {}
+        self._live = np.zeros(0, dtype=bool)
+        self._mtime = None
+        self._lock = threading.Lock()
+        self.load()
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def load(self):
+        meta_path = self._file("meta.json")
+        if not os.path.exists(meta_path):
+            return self
+
+        with open(meta_path, encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta["dim"] != self.dim or meta.get("backend") != self.backend:
+            logger.warning(f"向量索引参数不一致 (dim={meta['dim']}, backend={meta.get('backend')})，将忽略已有索引")
+            return self
+
+        self.count = meta["count"]
+        self.n_docs = meta.get("n_docs", self.count)
+        self.analyzed_at = datetime.fromisoformat(meta["analyzed_at"]) if meta.get("analyzed_at") else None
+        self._mtime = os.path.getmtime(meta_path)
+        if os.path.exists(self._file("df.f64")):
+            self.df = np.fromfile(self._file("df.f64"), dtype=np.float64)
+        if self.count:
+            self.ids = np.fromfile(self._file("ids.i64"), dtype=np.int64, count=self.count)
+            self.vectors = np.memmap(self._file("vectors.f32"), dtype=np.float32, mode="r",
+                                     shape=(self.count, self.dim))
+        self._positions = {int(pid): pos for pos, pid in enumerate(self.ids)}
+        # 被重新向量化取代的旧行
+        self._live = np.zeros(self.count, dtype=bool)
+        self._live[list(self._positions.values())] = True
+        return self
+
+    def is_stale(self) -> bool:
+        """其他进程 (流水线) 追加过数据时返回 True"""
+        meta_path = self._file("meta.json")
+        return os.path.exists(meta_path) and os.path.getmtime(meta_path) != self._mtime
+
+    def __contains__(self, paper_id: int) -> bool:
+        return int(paper_id) in self._positions
+
+    def append(self, ids: list[int], vectors: np.ndarray, df_delta: np.ndarray = None):
+        """追加向量 (ids 与 vectors 行一一对应)"""
+        if not len(ids):
+            return
+        with self._lock:
+            os.makedirs(self.path, exist_ok=True)
+            row_bytes = self.dim * 4
+            for name, size in (("vectors.f32", self.count * row_bytes), ("ids.i64", self.count * 8)):
+                with open(self._file(name), "ab") as f:
+                    f.truncate(size)
+
+            with open(self._file("vectors.f32"), "ab") as f:
+                f.write(np.ascontiguousarray(vectors, dtype=np.float32).tobytes())
+            with open(self._file("ids.i64"), "ab") as f:
+                f.write(np.asarray(ids, dtype=np.int64).tobytes())
+
+            if df_delta is not None:
+                self.df = self.df + df_delta
+                self.df.tofile(self._file("df.f64"))
+            # 重新向量化的论文同样计入文档频次 (近似：旧行的词频不扣除)
+            self.n_docs += len(ids)
+            self._write_meta(self.count + len(ids), self.analyzed_at)
+
+        self.load()
+
+    def mark_analyzed(self, analyzed_at: datetime):
+        """记录已向量化到的分析时间 (之后 analyzed_at 更晚的论文需要重新向量化)"""
+        with self._lock:
+            self._write_meta(self.count, analyzed_at)
+        self.load()
+
+    def _write_meta(self, count: int, analyzed_at: datetime | None):
+        meta = {"dim": self.dim, "backend": self.backend, "count": count, "n_docs": self.n_docs,
+                "analyzed_at": analyzed_at.isoformat() if analyzed_at else None}
+        os.makedirs(self.path, exist_ok=True)
+        tmp = self._file("meta.json.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(tmp, self._file("meta.json"))
+
+    def positions(self, paper_ids) -> np.ndarray:
+        """批量查找论文在矩阵中的行号，不在索引中的为 -1"""
+        return np.asarray([self._positions.get(int(pid), -1) for pid in paper_ids], dtype=np.int64)
+
+    def vector_of(self, paper_id: int) -> np.ndarray | None:
+        pos = self._positions.get(int(paper_id))
+        return None if pos is None else np.asarray(self.vectors[pos])
+
+    def top_k(self, query: np.ndarray, k: int = 5, exclude: set = None) -> list[tuple[int, float]]:
+        """余弦相似度 Top-K (向量均已归一化，点积即余弦)"""
+        if not self.count:
+            return []
+        scores = self.vectors @ query.astype(np.float32)
+        scores[~self._live] = -np.inf
+        want = min(self.count, k + len(exclude or ()) + self.count - len(self._positions))
+        top = np.argpartition(-scores, want - 1)[:want]
+        top = top[np.argsort(-scores[top])]
+        result = []
+        for pos in top:
+            if not self._live[pos]:
+                continue
+            pid = int(self.ids[pos])
+            if exclude and pid in exclude:
+                continue
+            result.append((pid, float(scores[pos])))
+            if len(result) >= k:
+                break
+        return result
+
+    def similar(self, paper_id: int, k: int = 5) -> list[tuple[int, float]]:
+        return self.similar_many([paper_id], k)[int(paper_id)]
+
+    def similar_many(self, paper_ids, k: int = 5) -> dict[int, list[tuple[int, float]]]:
+        """多篇论文各自的 Top-K 相似论文：一次矩阵乘法 (m × count) 算出全部得分，不在索引中的论文返回空列表"""
+        result = {int(pid): [] for pid in paper_ids}
+        pos = self.positions(result)
+        hit = pos >= 0
+        if not hit.any():
+            return result
+        rows = pos[hit]
+        scores = np.asarray(self.vectors[rows]) @ np.asarray(self.vectors).T
+        scores[:, ~self._live] = -np.inf
+        scores[np.arange(len(rows)), rows] = -np.inf
+        want = min(self.count, k)
+        top = np.argpartition(-scores, want - 1, axis=1)[:, :want]
+        for row, pid in enumerate(np.asarray(list(result), dtype=np.int64)[hit]):
+            order = top[row][np.argsort(-scores[row, top[row]])]
+            result[int(pid)] = [(int(self.ids[p]), float(scores[row, p])) for p in order if np.isfinite(scores[row, p])]
+        return result
+
+
+_index = None
+_index_lock = threading.Lock()
+_build_lock = threading.Lock()
+
+
+def get_index() -> VectorIndex:
+    """进程内共享的索引实例，文件被流水线更新后自动重新映射"""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = VectorIndex()
+        elif _index.is_stale():
+            _index.load()
+        return _index
+
+
+def embed_papers(papers: list, index: VectorIndex) -> tuple[np.ndarray, np.ndarray | None]:
+    """为一批论文生成向量，返回 (向量矩阵, 哈希桶文档频次增量)"""
+    if index.backend == "openai":
+        texts = [" ".join(paper_fields(p)) for p in papers]
+        return embed_with_client(texts, dim=index.dim), None
+
+    counts = hashed_term_counts([paper_tokens(p) for p in papers], dim=index.dim)
+    df_delta = (counts != 0).sum(axis=0).astype(np.float64)
+    # 先把本批文档计入文档频次，再计算 IDF
+    vectors = hashed_tfidf(counts, index.df + df_delta, index.n_docs + len(papers))
+    return vectors, df_delta
+
+
+def build_similarity_index(batch_size: int = 500) -> int:
+    """
+    离线阶段：为尚未入索引的已完成论文生成向量并追加，
+    并重新向量化上次构建后重新分析过 (analyzed_at 更晚) 的论文，返回新增与更新的数量
+    """
+    from sqlalchemy import func
+    from database import Session, Paper
+
+    # 流水线的向量化与升级步骤可能同时构建，串行执行以免同一篇论文重复追加
+    with _build_lock:
+        index = get_index()
+        session = Session()
+        try:
+            latest = session.query(func.max(Paper.analyzed_at)).filter(Paper.batch_status == "completed").scalar()
+            completed_ids = [pid for (pid,) in session.query(Paper.id)
+                             .filter(Paper.batch_status == "completed")
+                             .order_by(Paper.id)]
+            pending = [pid for pid in completed_ids if pid not in index]
+            updated = []
+            if index.analyzed_at is not None:
+                updated = [pid for (pid,) in session.query(Paper.id)
+                           .filter(Paper.batch_status == "completed", Paper.analyzed_at > index.analyzed_at)
+                           .order_by(Paper.id) if pid in index]
+
+            todo = sorted(pending + updated)
+            for i in range(0, len(todo), batch_size):
+                chunk = todo[i:i + batch_size]
+                papers = session.query(Paper).filter(Paper.id.in_(chunk)).order_by(Paper.id).all()
+                vectors, df_delta = embed_papers(papers, index)
+                index.append([p.id for p in papers], vectors, df_delta)
+                session.expunge_all()
+            if latest is not None and latest != index.analyzed_at:
+                index.mark_analyzed(latest)
+
+            if todo:
+                logger.info(f"向量索引已追加 {len(pending)} 篇、重新向量化 {len(updated)} 篇论文 (共 {index.count} 行)")
+            return len(todo)
+        finally:
+            session.close()
@@ -0,0 +1,32 @@
+"""
+页面模块 (按需导入)
+app.py 每次运行只导入当前页面对应的模块，plotly、core_batch (openai/arxiv/pymupdf) 等重依赖
+只在用到它们的页面里加载；样式也只注入全局部分与当前页面需要的部分。
+"""
+import importlib
+
+import profiling
+import query_stats
+
+from views.styles import inject_css
+
+# 导航名称 -> (模块, 页面函数)
+PAGES = {
+    "📊 论文看板": ("views.dashboard", "show_dashboard"),
+    "🔥 热门榜单": ("views.trending", "show_trending"),
+    "📑 论文浏览": ("views.papers", "show_paper_list"),
+    "⭐ 我的收藏": ("views.favorites", "show_favorites"),
+    "📬 订阅设置": ("views.subscription", "show_subscription"),
+    "💰 打赏支持": ("views.donate", "show_donate_page"),
+}
+LOGIN_PAGE = ("views.login", "show_login_page")
+
+
+def render_page(target: tuple[str, str]):
+    """导入页面模块 (已导入过的直接复用)，注入样式后渲染；统计本次渲染的 SQL 查询，按配置做性能剖析"""
+    module_name, func_name = target
+    module = importlib.import_module(module_name)
+    inject_css(*getattr(module, "PAGE_CSS", ()))
+    scope = f"page:{module_name.rsplit('.', 1)[-1]}"
+    with query_stats.track(scope), profiling.profile(scope):
+        getattr(module, func_name)()
@@ -0,0 +1,45 @@
+"""
+页面共用的辅助函数
+"""
+import streamlit as st
+
+from catalog import PaperCatalog
+from services import get_user_favorite_ids, toggle_favorite
+
+
+@st.cache_resource
+def get_paper_catalog() -> PaperCatalog:
+    """所有会话共享的论文目录 (每次读取时按数据版本自动增量刷新)"""
+    return PaperCatalog()
+
+
+def get_favorite_ids() -> set[int]:
+    """当前用户收藏的论文 ID：每个会话只查询一次，之后随收藏操作同步更新"""
+    if "favorite_ids" not in st.session_state:
+        st.session_state.favorite_ids = get_user_favorite_ids(st.session_state.user_email)
+    return st.session_state.favorite_ids
+
+
+def toggle_user_favorite(paper_id: int) -> tuple[bool, str]:
+    """切换收藏 (写穿：先写库，成功后更新会话内的收藏集合)，返回 (是否成功, 消息)"""
+    success, is_fav, msg = toggle_favorite(st.session_state.user_email, paper_id)
+    if success:
+        favorite_ids = get_favorite_ids()
+        if is_fav:
+            favorite_ids.add(paper_id)
+        else:
+            favorite_ids.discard(paper_id)
+    return success, msg
+
+
+def mask_email(email: str) -> str:
+    """邮箱加密脱敏处理"""
+    if not email or "@" not in email:
+        return "***"
+    try:
+        username, domain = email.split('@')
+        if len(username) <= 2:
+            return f"{username[0]}***@{domain}"
+        return f"{username[:2]}****@{domain}"
+    except:
+        return email
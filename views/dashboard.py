@@ -0,0 +1,161 @@
+"""
+论文看板 (plotly 只在本页导入)
+"""
+from datetime import datetime, timezone, timedelta
+
+import plotly.express as px
+import streamlit as st
+
+from services import (
+    get_dashboard_stats,
+    get_top_keywords,
+    get_top_cited_papers,
+    get_daily_category_series,
+    get_daily_keyword_series,
+    get_daily_engagement_series
+)
+from views.common import get_favorite_ids
+
+PAGE_CSS = ()
+
+
+def show_dashboard():
+    """显示论文看板"""
+    st.markdown("## 📊 智能监控看板")
+
+    # 所有统计都在数据库端聚合完成，看板耗时不随论文总量增长
+    stats = get_dashboard_stats()
+
+    if not stats['total_papers']:
+        st.info("目前没有已完成分析的论文数据。")
+        return
+
+    # 统计卡片
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("论文总数", stats['total_papers'], delta=None)
+    with col2:
+        st.metric("覆盖领域", stats['category_count'])
+    with col3:
+        st.metric("总引用影响力", stats['total_citations'])
+    with col4:
+        st.metric("我的收藏", len(get_favorite_ids()))
+
+    st.markdown("---")
+
+    # 可视化图表
+    col1, col2 = st.columns(2)
+
+    with col1:
+        distribution = stats['category_distribution']
+        fig_pie = px.pie(
+            names=[c for c, _ in distribution],
+            values=[n for _, n in distribution],
+            title="📈 论文领域分布",
+            color_discrete_sequence=px.colors.sequential.RdBu
+        )
+        fig_pie.update_layout(paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)')
+        st.plotly_chart(fig_pie, width='stretch')
+
+    with col2:
+        kw_counts = get_top_keywords(limit=12)
+        if kw_counts:
+            fig_bar = px.bar(
+                x=[n for _, n in kw_counts],
+                y=[k for k, _ in kw_counts],
+                orientation='h',
+                title="🔥 热点技术关键词",
+                labels={'x': '频次', 'y': '关键词'},
+                color=[n for _, n in kw_counts],
+                color_continuous_scale='RdBu'
+            )
+            fig_bar.update_layout(showlegend=False, paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)')
+            st.plotly_chart(fig_bar, width='stretch')
+
+    # 时间趋势 (读取流水线维护的每日汇总表，只涉及几百行预聚合数据)
+    st.divider()
+    c_head, c_range = st.columns([3, 1.5])
+    with c_head:
+        st.markdown("### 📅 近期趋势")
+    with c_range:
+        today = datetime.now(timezone.utc).date()
+        date_range = st.date_input(
+            "时间范围",
+            value=(today - timedelta(days=30), today),
+            max_value=today,
+            label_visibility="collapsed"
+        )
+
+    if isinstance(date_range, (list, tuple)) and len(date_range) == 2:
+        start_date, end_date = date_range
+        category_series = get_daily_category_series(start_date, end_date)
+
+        if not category_series:
+            st.caption("所选时间范围内暂无汇总数据。")
+        else:
+            fig_daily = px.bar(
+                x=[d for d, _, _ in category_series],
+                y=[n for _, _, n in category_series],
+                color=[c for _, c, _ in category_series],
+                title="📆 每日新增论文 (按领域)",
+                labels={'x': '日期', 'y': '论文数', 'color': '领域'},
+                color_discrete_sequence=px.colors.sequential.RdBu
+            )
+            fig_daily.update_layout(paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)')
+            st.plotly_chart(fig_daily, width='stretch')
+
+            col1, col2 = st.columns(2)
+            with col1:
+                keyword_series = get_daily_keyword_series(start_date, end_date, top_n=6)
+                if keyword_series:
+                    fig_kw = px.line(
+                        x=[d for d, _, _ in keyword_series],
+                        y=[n for _, _, n in keyword_series],
+                        color=[k for _, k, _ in keyword_series],
+                        markers=True,
+                        title="🏷️ 关键词热度走势",
+                        labels={'x': '日期', 'y': '次数', 'color': '关键词'}
+                    )
+                    fig_kw.update_layout(paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)')
+                    st.plotly_chart(fig_kw, width='stretch')
+            with col2:
+                engagement_series = get_daily_engagement_series(start_date, end_date)
+                if engagement_series:
+                    fig_eng = px.line(
+                        x=[d for d, _, _ in engagement_series] * 2,
+                        y=[f for _, f, _ in engagement_series] + [c for _, _, c in engagement_series],
+                        color=["收藏"] * len(engagement_series) + ["评论"] * len(engagement_series),
+                        markers=True,
+                        title="💬 社区互动走势",
+                        labels={'x': '日期', 'y': '数量', 'color': '类型'}
+                    )
+                    fig_eng.update_layout(paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)')
+                    st.plotly_chart(fig_eng, width='stretch')
+
+    # 趋势分析
+    st.divider()
+    st.markdown("### 🔥 领域趋势 AI 解读")
+
+    categories_list = [c for c, _ in stats['category_distribution']]
+    if categories_list:
+        c1, c2 = st.columns([3, 1])
+        with c1:
+            sel_cat = st.selectbox("选择要分析的领域", categories_list, label_visibility="collapsed")
+        with c2:
+            analyze_btn = st.button("生成深度报告", type="primary", width='stretch')
+
+        if analyze_btn:
+            # core_batch 依赖 openai/arxiv/pymupdf，只在真正生成报告时才导入
+            from core_batch import call_qwen_ai_sync
+
+            top_20 = get_top_cited_papers(sel_cat, limit=20)
+            if top_20:
+                paper_list = "\n".join([f"- {p['title']} (引用: {p['citation_count']})" for p in top_20])
+                with st.spinner(f"AI 正在深度阅读 {len(top_20)} 篇论文并总结趋势..."):
+                    trend_summary = call_qwen_ai_sync(
+                        f"分析以下{sel_cat}领域的Top论文标题，给出三个该领域最近的研究风向，并简要说明每个趋势的意义：\n{paper_list}"
+                    )
+                    st.success(f"**{sel_cat} 趋势分析报告**")
+                    st.markdown(trend_summary)
+            else:
+                st.warning("该领域数据不足，无法分析")
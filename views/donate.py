@@ -0,0 +1,68 @@
+"""
+打赏与致谢
+"""
+import streamlit as st
+
+from services import get_recent_donations
+from views.common import mask_email
+from views.styles import DONATE_CSS
+
+PAGE_CSS = (DONATE_CSS,)
+
+
+def show_donate_page():
+    """显示打赏与致谢页面"""
+    st.markdown("## ☕ 赞助与支持")
+    st.markdown("ArxivMind 是一个开源项目。如果您觉得它对您的研究有帮助，欢迎请开发者喝杯咖啡，支持服务器与 API 开销！")
+    st.divider()
+
+    col1, col2 = st.columns([1, 1.2])
+
+    with col1:
+        st.markdown("### ❤️ 打赏方式")
+        st.markdown("<div class='qr-container'>", unsafe_allow_html=True)
+
+        tab_wx, tab_ali = st.tabs(["微信支付", "支付宝"])
+
+        with tab_wx:
+            # 这里的图片请替换为你自己的
+            st.image("https://via.placeholder.com/300x300.png?text=WeChat+Pay", caption="微信扫码支持")
+
+        with tab_ali:
+            st.image("https://via.placeholder.com/300x300.png?text=Alipay", caption="支付宝扫码支持")
+
+        st.markdown("</div>", unsafe_allow_html=True)
+
+    with col2:
+        st.markdown("### 🏆 致谢名单 (Sponsors)")
+
+        # --- 从数据库读取数据 ---
+        donors = get_recent_donations(limit=100)
+
+        if not donors:
+            st.info("暂无打赏记录，期待您的支持！")
+        else:
+            st.markdown(f"感谢这 **{len(donors)}** 位朋友的慷慨资助：")
+            st.markdown("<div class='donor-wall'>", unsafe_allow_html=True)
+
+            for d in donors:
+                masked = mask_email(d.email)
+                # 格式化日期
+                date_str = d.created_at.strftime("%Y-%m-%d")
+
+                # 如果有留言，显示留言；否则只显示金额
+                msg_html = f"<div style='font-size:12px; color:#999; margin-top:2px;'>“{d.message}”</div>" if d.message else ""
+
+                st.markdown(f"""
+                    <div class='donor-item' style='display:block;'>
+                        <div style='display:flex; justify-content:space-between;'>
+                            <span>👤 {masked} <span style='font-size:12px; color:#ccc; margin-left:5px;'>{date_str}</span></span>
+                            <span style='color:#D4A373; font-weight:bold;'>❤️ {d.amount}</span>
+                        </div>
+                        {msg_html}
+                    </div>
+                """, unsafe_allow_html=True)
+
+            st.markdown("</div>", unsafe_allow_html=True)
+
+        st.caption("注：打赏时备注邮箱即可上榜，数据将定期录入。")
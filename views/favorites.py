@@ -0,0 +1,52 @@
+"""
+我的收藏
+"""
+import streamlit as st
+
+from services import get_user_favorites
+from views.common import toggle_user_favorite
+from views.styles import PAPER_CSS
+
+PAGE_CSS = (PAPER_CSS,)
+
+
+def _on_remove_click(paper_id: int):
+    # 回调在本次重跑之前执行，下面读取的收藏列表已不含该论文，无需再 st.rerun()
+    success, msg = toggle_user_favorite(paper_id)
+    if success:
+        st.toast(msg)
+
+
+def show_favorites():
+    """显示收藏页面"""
+    st.markdown("## ⭐ 我的收藏")
+
+    favorites = get_user_favorites(st.session_state.user_email)
+
+    if not favorites:
+        st.info("您还没有收藏任何论文，去论文浏览页面看看吧！")
+        return
+
+    st.markdown(f"共收藏 **{len(favorites)}** 篇论文")
+    st.divider()
+
+    for p in favorites:
+        # === 核心修改：处理标题显示逻辑 ===
+        display_title = p.chinese_title if p.chinese_title else p.title
+        subtitle_html = f"<div class='paper-subtitle' style='margin-bottom:8px;'>{p.title}</div>" if p.chinese_title else ""
+        with st.container():
+            st.markdown(f"""
+                            <div class='paper-card' style='border-left-color: #e74c3c;'>
+                                <div class='paper-title'>{display_title}</div>
+                                {subtitle_html}
+                                <div class='paper-meta'>
+                                    <span class='category-tag'>{p.category or '未分类'}</span>
+                                </div>
+                            </div>
+                        """, unsafe_allow_html=True)
+
+            c1, c2 = st.columns([1, 8])
+            with c1:
+                st.button("💔 移除", key=f"unfav_{p.id}", on_click=_on_remove_click, args=(p.id,))
+            with c2:
+                st.link_button("📄 原文", p.url)
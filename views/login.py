@@ -0,0 +1,69 @@
+"""
+登录页
+"""
+import streamlit as st
+
+from services import send_verification_code, verify_code
+from views.styles import LOGIN_CSS
+
+PAGE_CSS = (LOGIN_CSS,)
+
+
+def show_login_page():
+    """显示登录页面 - 布局优化版"""
+    st.markdown("<br>", unsafe_allow_html=True)
+    st.markdown("<h1 class='main-title'>ARXIVMIND</h1>", unsafe_allow_html=True)
+    st.markdown("<p class='sub-title'>INTELLIGENT PAPER MONITORING SYSTEM</p>", unsafe_allow_html=True)
+
+    # 1:1.2:1 的比例让中间卡片宽度适中且居中
+    col1, col2, col3 = st.columns([1, 1.2, 1])
+
+    with col2:
+        # st.markdown("<div class='login-wrapper'><div class='login-card'>", unsafe_allow_html=True)
+        st.markdown("""
+            <div class='blob-container'>
+                <div class='blob'></div>
+            </div>
+        """, unsafe_allow_html=True)
+
+        st.markdown("### 欢迎回来")
+        st.markdown("<p style='color:#999; font-size:14px;'>请使用邮箱验证码登录</p>", unsafe_allow_html=True)
+        st.markdown("<br>", unsafe_allow_html=True)
+
+        email = st.text_input("📧 邮箱地址", placeholder="name@example.com")
+
+        # 验证码行
+        col_btn, col_input = st.columns([1, 2])
+        with col_btn:
+            # 这里的 vertical-align 是为了对齐
+            st.markdown("<br>", unsafe_allow_html=True)
+            if st.button("📨 获取验证码", width='stretch'):
+                if not email or "@" not in email:
+                    st.error("邮箱格式错误")
+                else:
+                    with st.spinner("发送中..."):
+                        success, msg = send_verification_code(email)
+                        if success:
+                            st.session_state.pending_email = email
+                            st.success("已发送")
+                        else:
+                            st.error(msg)
+        with col_input:
+            code = st.text_input("🔐 验证码", placeholder="6位数字", label_visibility="visible")
+
+        st.markdown("<br>", unsafe_allow_html=True)
+
+        if st.button("立即进入系统", type="primary", width='stretch'):
+            if not email or not code:
+                st.error("请填写完整信息")
+            else:
+                with st.spinner("验证身份中..."):
+                    success, msg = verify_code(email, code)
+                    if success:
+                        st.session_state.authenticated = True
+                        st.session_state.user_email = email
+                        st.rerun()
+                    else:
+                        st.error(msg)
+
+        st.markdown("</div></div>", unsafe_allow_html=True)
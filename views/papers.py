@@ -0,0 +1,305 @@
+"""
+论文浏览：检索、收藏、评论、AI 助手与相似论文
+"""
+from datetime import datetime, timezone
+
+import streamlit as st
+
+from services import (
+    get_earliest_paper_date,
+    search_papers,
+    get_paper_full_text,
+    get_comments_for_papers,
+    add_comment,
+    get_similar_papers_for
+)
+from views.common import mask_email, get_paper_catalog, get_favorite_ids, toggle_user_favorite
+from views.styles import PAPER_CSS
+
+PAGE_CSS = (PAPER_CSS,)
+# 每页渲染的论文数 (评论与相似论文只取当前页)
+PAGE_SIZE = 20
+
+
+def _on_favorite_click(paper_id: int):
+    success, msg = toggle_user_favorite(paper_id)
+    if success:
+        # 片段重跑的回调里不能直接显示元素，交给片段本身弹出提示
+        st.session_state.favorite_toast = msg
+
+
+@st.fragment
+def _favorite_button(paper_id: int):
+    """收藏按钮：点击时只重跑本片段 (回调中已写库并更新会话状态)，不重算整页"""
+    if msg := st.session_state.pop("favorite_toast", None):
+        st.toast(msg)
+    is_fav = paper_id in get_favorite_ids()
+    st.button("⭐" if is_fav else "☆", key=f"fav_{paper_id}", help="收藏",
+              on_click=_on_favorite_click, args=(paper_id,))
+
+
+def show_paper_list():
+    """显示论文列表 - 修复HTML渲染问题"""
+
+    # --- 顶部筛选栏 ---
+    c_title, c_date = st.columns([3, 1.5])
+    with c_title:
+        st.markdown("## 📑 论文浏览")
+    with c_date:
+        min_date = get_earliest_paper_date()
+        today = datetime.now(timezone.utc).date()
+
+        target_date = st.date_input(
+            "📅 按日期查看",
+            value=None,
+            min_value=min_date,
+            max_value=today,
+            help="选择查看特定日期的论文，留空查看全部"
+        )
+
+    selected_category = st.session_state.get('selected_category', '全部')
+
+    search_query = st.text_input(
+        "🔍 搜索论文",
+        placeholder="标题、中文标题、关键词或 AI 解读内容，例如：多模态 agent",
+        label_visibility="collapsed"
+    ).strip()
+
+    # 获取数据：有搜索词时走全文检索 (按相关度排序)，否则按领域/日期浏览
+    snippets = {}
+    if search_query:
+        results = search_papers(
+            search_query,
+            category=None if selected_category == '全部' else selected_category
+        )
+        if target_date:
+            results = [(p, s) for p, s in results if p.created_at and p.created_at.date() == target_date]
+        papers = [p for p, _ in results]
+        snippets = {p.id: s for p, s in results if s}
+    else:
+        # 共享论文目录：筛选与计数都在内存中完成
+        papers = get_paper_catalog().papers(
+            category=None if selected_category == '全部' else selected_category,
+            target_date=target_date
+        )
+
+    filters = []
+    if search_query: filters.append(f"搜索：{search_query}")
+    if selected_category != '全部': filters.append(f"领域：{selected_category}")
+    if target_date: filters.append(f"日期：{target_date}")
+    info_str = f" · {' | '.join(filters)}" if filters else ""
+
+    if not papers:
+        st.warning(f"🔍 未找到符合条件的论文 {info_str}")
+        return
+
+    st.markdown(f"共找到 **{len(papers)}** 篇论文{info_str}")
+    pages = (len(papers) - 1) // PAGE_SIZE + 1
+    page = 1
+    if pages > 1:
+        # 筛选条件变化时回到第一页
+        page = st.number_input(f"页码 (共 {pages} 页)", min_value=1, max_value=pages, value=1, step=1,
+                               key=f"page:{selected_category}:{target_date}:{search_query}")
+    papers = papers[(page - 1) * PAGE_SIZE:page * PAGE_SIZE]
+    st.divider()
+
+    # --- 渲染列表 ---
+    # <span>🔗 引用: {p.citation_count or 0}</span>
+    # 当前页所有论文的评论与相似论文一次取回
+    comments_by_paper = get_comments_for_papers(tuple(p.id for p in papers))
+    similar_by_paper = get_similar_papers_for(tuple(p.id for p in papers), limit=5)
+    for p in papers:
+        comments = comments_by_paper[p.id]
+        comment_count = len(comments)
+
+        # === 核心修改：处理标题显示逻辑 ===
+        display_title = p.chinese_title if p.chinese_title else p.title
+        # 如果有中文名，英文名作为副标题；否则副标题为空
+        subtitle_html = f"<div class='paper-subtitle'>{p.title}</div>" if p.chinese_title else ""
+
+        with st.container():
+            col1, col2 = st.columns([20, 1.5])
+
+            with col1:
+                # 1. 准备科普内容 (注意：去掉了多行字符串的缩进，防止被识别为代码块)
+                pop_science_html = ""
+                if p.popular_science:
+                    # 使用紧凑的 HTML 字符串，避免 Markdown 解析错误
+                    pop_science_html = f"""<div style='background:#f9f9f9;padding:12px 15px;border-radius:8px;margin:12px 0;border-left:3px solid #8e44ad;font-size:14px;color:#444;line-height:1.6;'><strong>💡 AI 科普：</strong>{p.popular_science}</div>"""
+
+                # 搜索命中的上下文摘要
+                snippet_html = ""
+                if p.id in snippets:
+                    snippet_html = f"""<div style='margin-top:8px;font-size:13px;color:#666;'>🔍 {snippets[p.id]}</div>"""
+
+                # 2. 准备关键词
+                keywords_html = ""
+                if p.keywords:
+                    keywords_html = f"""<div style='margin-top:8px;font-size:13px;color:#888;'>🏷️ {p.keywords}</div>"""
+
+                # 3. 组合卡片 (确保所有 HTML 都在一行或者顶格写，避免缩进)
+                # 注意：这里使用 f-string 拼接，但为了安全，外层用 div 包裹
+                card_html = f"""
+                <div class='paper-card'>
+                    <div class='paper-title'>{display_title}</div>
+                    {subtitle_html}
+                    <div class='paper-meta'>
+                        <span class='category-tag'>{p.category or '未分类'}</span>
+                        <span>📅 {p.created_at.strftime('%Y-%m-%d')}</span>
+                    </div>
+                    {snippet_html}
+                    {pop_science_html}
+                    {keywords_html}
+                </div>
+                """
+                # 关键：unsafe_allow_html=True 必须开启
+                st.markdown(card_html, unsafe_allow_html=True)
+
+            with col2:
+                # 收藏按钮垂直居中微调
+                st.markdown("<br>", unsafe_allow_html=True)
+                _favorite_button(p.id)
+
+            # --- 新增：评论交互区 (放在 expander 里) ---
+            # 标题显示评论数量
+            with st.expander(f"💬 讨论与评论 ({comment_count})"):
+
+                # 1. 显示历史评论
+                if comments:
+                    for c in comments:
+                        # 简单的头像占位符和脱敏邮箱
+                        c_email = mask_email(c['user_email'])
+                        c_time = c['created_at'].strftime('%Y-%m-%d %H:%M')
+
+                        st.markdown(f"""
+                        <div style='background:#f1f1f1; padding:10px; border-radius:8px; margin-bottom:8px; font-size:14px;'>
+                            <div style='color:#D4A373; font-weight:bold; font-size:12px;'>
+                                👤 {c_email} <span style='color:#aaa; font-weight:normal; margin-left:8px;'>{c_time}</span>
+                            </div>
+                            <div style='margin-top:4px; color:#333;'>{c['content']}</div>
+                        </div>
+                        """, unsafe_allow_html=True)
+                else:
+                    st.caption("暂无评论，快来抢沙发吧~")
+
+                # 2. 发送新评论
+                # 使用 form 可以让用户按回车发送，且避免每个字符输入都刷新页面
+                with st.form(key=f"comment_form_{p.id}", clear_on_submit=True):
+                    new_comment_text = st.text_area("发表你的观点...", height=60, placeholder="这篇论文的方法很有趣...")
+                    submit_col1, submit_col2 = st.columns([5, 1])
+                    with submit_col2:
+                        submitted = st.form_submit_button("发送 🚀")
+
+                    if submitted:
+                        if new_comment_text:
+                            success, msg = add_comment(st.session_state.user_email, p.id, new_comment_text)
+                            if success:
+                                st.toast("评论已发布！")
+                                st.rerun()  # 刷新页面显示新评论
+                            else:
+                                st.error(msg)
+                        else:
+                            st.warning("写点什么再发送吧")
+
+                # --- 新增功能：学术工具栏 ---
+                with st.expander("🤖 AI 论文助手 & 工具"):
+                    # 工具 1: BibTeX
+                    # st.markdown("#### 📝 引用工具")
+                    # bib_code = generate_bibtex(p)
+                    # st.code(bib_code, language="latex")
+                    #
+                    # st.divider()
+
+                    # 工具 2: Paper Chat
+                    st.markdown("#### 💬 向 AI 提问")
+                    st.caption("基于 AI 对本文的深度分析记录进行回答")
+
+                    # 为每篇论文维护独立的聊天记录
+                    chat_key = f"chat_history_{p.id}"
+                    if chat_key not in st.session_state:
+                        st.session_state[chat_key] = []
+
+                    # 显示历史消息
+                    for msg in st.session_state[chat_key]:
+                        with st.chat_message(msg["role"]):
+                            st.markdown(msg["content"])
+
+                    # 输入框
+                    if prompt := st.chat_input(f"关于《{p.title[:10]}...》的问题", key=f"input_{p.id}"):
+                        # 1. 显示用户提问
+                        st.session_state[chat_key].append({"role": "user", "content": prompt})
+                        with st.chat_message("user"):
+                            st.markdown(prompt)
+
+                        # 2. 构建上下文并调用 AI
+                        with st.chat_message("assistant"):
+                            with st.spinner("AI 正在思考..."):
+                                # 构建上下文：将论文的已有分析结果喂给 AI
+                                context = f"""
+                                你是一个学术助手。用户正在阅读论文《{p.title}》。
+                                以下是该论文的核心信息：
+                                - 领域：{p.category}
+                                - 动机：{p.analysis_json.get('motivation', '未知')}
+                                - 方法：{p.analysis_json.get('method', '未知')}
+                                - 结果：{p.analysis_json.get('result', '未知')}
+                                -- 全文内容：{get_paper_full_text(p.id)[:20000]}
+
+                                请基于以上信息回答用户的问题：{prompt}
+                                如果问题超出了上述信息范围，请礼貌告知需要阅读原文。
+                                """
+
+                                # 调用 core_batch 里的同步调用函数
+                                # 注意：call_qwen_ai_sync 原本返回 JSON，我们这里需要它返回普通文本
+                                # 建议修改 core_batch.py 或者在这里做一个简单的临时处理
+                                # 这里假设我们复用 call_qwen_ai_sync 但它返回的是 JSON 字符串
+                                # 为了更自然，建议在 core_batch.py 加一个简单的 call_qwen_chat
+
+                                from core_batch import get_llm_client  # 直接调用 OpenAI 客户端更灵活
+
+                                try:
+                                    resp = get_llm_client().chat.completions.create(
+                                        model="qwen-plus",
+                                        messages=[{"role": "user", "content": context}],
+                                        # 不强制 JSON，普通对话模式
+                                    )
+                                    answer = resp.choices[0].message.content
+                                    st.markdown(answer)
+                                    st.session_state[chat_key].append({"role": "assistant", "content": answer})
+                                except Exception as e:
+                                    st.error(f"AI 服务繁忙: {e}")
+
+            # 详情折叠栏
+            with st.expander("🧐 查看 AI 深度技术分析"):
+                if p.analysis_tier == "triage":
+                    st.info("这篇论文目前只完成了初筛，收藏后会安排全文深度分析")
+                elif p.analysis_json:
+                    analysis = p.analysis_json
+                    cc1, cc2 = st.columns(2)
+                    with cc1:
+                        if analysis.get('motivation'):
+                            st.markdown("#### 🎯 痛点与动机")
+                            st.write(analysis['motivation'])
+                        if analysis.get('method'):
+                            st.markdown("#### 🔬 核心方法")
+                            st.write(analysis['method'])
+                    with cc2:
+                        if analysis.get('result'):
+                            st.markdown("#### 📊 关键结果")
+                            st.write(analysis['result'])
+                        if analysis.get('implementation_example'):
+                            st.markdown("#### 💻 实现思路")
+                            st.write(analysis['implementation_example'])
+                else:
+                    st.info("暂无深度分析数据")
+
+                st.markdown("<br>", unsafe_allow_html=True)
+                st.link_button("📄 阅读 Arxiv 原文 PDF", p.url)
+
+            # 相似论文 (离线向量索引，毫秒级)
+            similar = similar_by_paper[p.id]
+            if similar:
+                with st.expander(f"🔗 相似论文 ({len(similar)})"):
+                    for s in similar:
+                        s_title = s['chinese_title'] or s['title']
+                        st.markdown(f"- [{s_title}]({s['url']}) <span style='color:#aaa;font-size:12px;'>相似度 {s['score']:.2f}</span>",
+                                    unsafe_allow_html=True)
@@ -0,0 +1,214 @@
+"""
+页面样式：按页面拆分，每次运行只注入当前页面用到的部分
+"""
+import streamlit as st
+
+# 全局：背景、动画、侧边栏与按钮 (所有页面都需要)
+BASE_CSS = """
+    /* 全局字体与背景 */
+    .stApp { 
+        background-color: #fdfcf0; 
+        color: #1a1a1a; 
+    }
+
+    /* 动画定义 */
+    @keyframes fadeIn { 
+        from { opacity: 0; transform: translateY(10px); } 
+        to { opacity: 1; transform: translateY(0); } 
+    }
+
+    /* --- 通用组件 --- */
+    section[data-testid="stSidebar"] { 
+        background-color: #f7f3e3 !important; 
+        border-right: 1px solid #e0dbcd;
+    }
+    .stButton>button { 
+        border-radius: 8px; 
+        border: 1px solid #1a1a1a; 
+        background: transparent; 
+        transition: all 0.3s; 
+        font-weight: 500;
+    }
+    .stButton>button:hover { 
+        background: #1a1a1a; 
+        color: #fdfcf0; 
+        border-color: #1a1a1a;
+        transform: translateY(-1px);
+    }
+    .block-container { padding-top: 2rem; }
+"""
+
+LOGIN_CSS = """
+    /* --- 登录页组件 --- */
+    /* 呼吸球容器 */
+    .blob-container {
+        display: flex;
+        justify-content: center;
+        align-items: center;
+        margin-bottom: 20px;
+    }
+
+    /* 呼吸球本体 */
+    .blob {
+        width: 100px;
+        height: 100px;
+        /* 渐变色：使用你的主题色 #D4A373 搭配浅一点的颜色 */
+        background: linear-gradient(135deg, #D4A373 0%, #E6C29F 100%);
+        /* 初始形状 */
+        border-radius: 30% 70% 70% 30% / 30% 30% 70% 70%;
+        /* 阴影让它更有立体感 */
+        box-shadow: 0 10px 20px rgba(212, 163, 115, 0.4);
+        /* 动画定义：名称 时长 循环 缓动 */
+        animation: blob-anim 6s linear infinite; 
+        transition: all 0.5s ease;
+    }
+
+    /* 鼠标悬停时的互动效果 */
+    .blob:hover {
+        transform: scale(1.1);
+        box-shadow: 0 15px 25px rgba(212, 163, 115, 0.6);
+    }
+
+    /* 关键帧动画：控制形状变换和位置微调 */
+    @keyframes blob-anim {
+        0% {
+            border-radius: 30% 70% 70% 30% / 30% 30% 70% 70%;
+            transform: translateY(0);
+        }
+        25% {
+            border-radius: 58% 42% 75% 25% / 76% 46% 54% 24%;
+            transform: translateY(-5px);
+        }
+        50% {
+            border-radius: 50% 50% 33% 67% / 55% 27% 73% 45%;
+            transform: translateY(0);
+        }
+        75% {
+            border-radius: 33% 67% 58% 42% / 63% 68% 32% 37%;
+            transform: translateY(5px);
+        }
+        100% {
+            border-radius: 30% 70% 70% 30% / 30% 30% 70% 70%;
+            transform: translateY(0);
+        }
+    }
+    .login-wrapper {
+        display: flex;
+        justify-content: center;
+        align-items: center;
+        padding-top: 40px;
+    }
+    .login-card {
+        background: #ffffff;
+        padding: 40px 40px;
+        border-radius: 16px;
+        box-shadow: 0 10px 30px rgba(0,0,0,0.06);
+        border: 1px solid #f0f0f0;
+        text-align: center;
+        animation: fadeIn 0.8s ease-out;
+    }
+    .main-title {
+        text-align: center;
+        font-size: 52px;
+        font-weight: 200;
+        letter-spacing: 10px;
+        color: #1a1a1a;
+        margin-bottom: 5px;
+        font-family: 'Garamond', serif;
+    }
+    .sub-title {
+        text-align: center;
+        color: #888;
+        font-size: 14px;
+        margin-bottom: 40px;
+        letter-spacing: 3px;
+        text-transform: uppercase;
+    }
+
+"""
+
+PAPER_CSS = """
+    /* --- 论文卡片组件 --- */
+    .paper-card { 
+        border-left: 4px solid #D4A373; 
+        padding: 24px; 
+        margin-bottom: 20px; 
+        background: #ffffff; 
+        box-shadow: 0 4px 12px rgba(0,0,0,0.03);
+        border-radius: 0 12px 12px 0;
+        animation: fadeIn 0.5s ease-out;
+        transition: transform 0.2s;
+    }
+    .paper-card:hover {
+        transform: translateX(5px);
+        box-shadow: 0 6px 16px rgba(0,0,0,0.06);
+    }
+.paper-title {
+        font-size: 18px;
+        font-weight: 700;
+        color: #2c3e50;
+        margin-bottom: 5px; /* 减小间距，为副标题腾出空间 */
+        line-height: 1.4;
+    }
+    /* 新增：英文副标题样式 */
+    .paper-subtitle {
+        font-size: 14px;
+        color: #7f8c8d;
+        font-weight: 400;
+        margin-bottom: 12px;
+        font-style: italic;
+    }
+    .paper-meta {
+        color: #7f8c8d;
+        font-size: 13px;
+        margin-bottom: 10px;
+        display: flex;
+        align-items: center;
+        gap: 12px;
+    }
+    .category-tag {
+        background: #D4A373;
+        color: #fff;
+        padding: 3px 10px;
+        border-radius: 4px;
+        font-size: 12px;
+        font-weight: 500;
+    }
+
+"""
+
+DONATE_CSS = """
+    /* --- 打赏页组件 --- */
+    .donor-wall {
+        background: #fff;
+        padding: 20px;
+        border-radius: 12px;
+        border: 1px solid #eee;
+        height: 400px;
+        overflow-y: auto;
+        box-shadow: inset 0 0 10px rgba(0,0,0,0.02);
+    }
+    .donor-item {
+        display: flex;
+        justify-content: space-between;
+        padding: 12px;
+        border-bottom: 1px solid #f9f9f9;
+        color: #555;
+        font-size: 14px;
+    }
+    .donor-item:last-child { border-bottom: none; }
+    .qr-container {
+        text-align: center;
+        background: #fff;
+        padding: 30px;
+        border-radius: 12px;
+        border: 2px dashed #D4A373;
+        margin-bottom: 20px;
+    }
+
+"""
+
+
+def inject_css(*parts: str):
+    """注入全局样式与指定页面的样式"""
+    st.markdown("<style>" + BASE_CSS + "".join(parts) + "</style>", unsafe_allow_html=True)
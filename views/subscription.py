@@ -0,0 +1,45 @@
+"""
+订阅设置
+"""
+import streamlit as st
+
+from services import get_user_by_email, update_user_subscription, AVAILABLE_CATEGORIES
+
+PAGE_CSS = ()
+
+
+def show_subscription():
+    """显示订阅设置页面"""
+    st.markdown("## 📬 订阅设置")
+
+    user = get_user_by_email(st.session_state.user_email)
+    if not user:
+        return
+
+    st.info("📧 我们将每日为您推送以下领域的最新高分论文摘要。")
+
+    current_subs = [c.strip() for c in user.subscribed_categories.split(",") if c.strip()]
+
+    selected_cats = st.multiselect(
+        "定制您的兴趣领域：",
+        AVAILABLE_CATEGORIES,
+        default=current_subs
+    )
+
+    st.markdown("<br>", unsafe_allow_html=True)
+
+    if st.button("💾 保存订阅设置", type="primary"):
+        success, msg = update_user_subscription(
+            st.session_state.user_email,
+            selected_cats
+        )
+        if success:
+            st.success("✅ 设置已保存！")
+        else:
+            st.error(msg)
+
+    st.divider()
+    if selected_cats:
+        st.write(f"当前已订阅：{', '.join(selected_cats)}")
+    else:
+        st.write("当前状态：接收全领域推送")
@@ -0,0 +1,39 @@
+"""
+热门榜单
+"""
+import streamlit as st
+
+from services import get_trending_papers
+
+PAGE_CSS = ()
+
+
+def show_trending():
+    """显示热门榜单"""
+    st.markdown("## 🔥 本周热门论文 Top 5")
+    st.markdown("基于社区收藏量与讨论热度生成，越新的互动权重越高。")
+    st.divider()
+
+    papers = get_trending_papers(limit=5)
+
+    if not papers:
+        st.info("数据积累中，暂无榜单。")
+        return
+
+    for idx, p in enumerate(papers):
+        col_rank, col_content = st.columns([1, 10])
+        with col_rank:
+            st.markdown(f"<h1 style='color:#D4A373; text-align:center;'>{idx + 1}</h1>", unsafe_allow_html=True)
+
+        with col_content:
+            # === 核心修改：处理标题显示逻辑 ===
+            cn_title = p.chinese_title if p.chinese_title else p.title
+            st.markdown(f"### {cn_title}")
+            # 如果有中文名，这里额外展示英文原名
+            if p.chinese_title:
+                st.caption(f"Original: {p.title}")
+            st.caption(f"发布日期: {p.created_at.strftime('%Y-%m-%d')} | 领域: {p.category}")
+            st.markdown(f"_{p.popular_science[:100]}..._")
+            st.link_button("👉 前往阅读", p.url)
+
+        st.markdown("---")